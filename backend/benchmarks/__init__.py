@@ -0,0 +1,7 @@
+"""
+Performance benchmarks of the SharkServers API.
+
+The benchmarks run the application in process over the httpx ASGI transport, with the test
+settings they use the SQLite test database and fakeredis. Run them from the backend directory,
+e.g. `python -m benchmarks.middleware`.
+"""
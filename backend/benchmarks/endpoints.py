@@ -0,0 +1,522 @@
+"""
+Latency and throughput of the hot endpoints.
+
+Seeds the database with forum-sized volumes, see `benchmarks.seed`, and sends the requests
+of every scenario to the application in process, over the httpx ASGI transport. Reports the
+p50/p95/p99 latency and the throughput of each scenario and writes them to a JSON file, so
+the runs of two commits can be compared. With `--baseline` the run fails when a scenario is
+slower than in the baseline file by more than the tolerance.
+
+Scenarios:
+- login: POST /v1/auth/token
+- threads: GET /v1/forum/threads
+- thread: GET /v1/forum/threads/{thread_id}
+- create_post: POST /v1/forum/posts
+- like: POST /v1/forum/posts/{post_id}/like, every request likes another post
+- online: GET /v1/users/online
+
+The test settings use the SQLite test database and fakeredis. For PostgreSQL set the
+POSTGRES_* settings and FAKE_REDIS=True. The seeded data is reused by the next runs with the
+same volumes, otherwise the tables are dropped and seeded again, so point it at a dedicated
+database. The rate limiters are disabled.
+
+Usage:
+    TESTING=True python -m benchmarks.endpoints --output bench.json
+    TESTING=True python -m benchmarks.endpoints --users 1000 --threads 10000 \
+        --posts 100000 --baseline bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import math
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import sqlalchemy
+from fastapi_limiter.depends import RateLimiter
+from httpx import AsyncClient
+from uuidbase62.types import to_uuidbase62
+
+from benchmarks.seed import BENCH_PASSWORD, Volumes, seed
+from sharkservers.db import database
+from sharkservers.forum.models import Post, Thread
+from sharkservers.generator import get_sync_engine
+from sharkservers.logger import logger
+from sharkservers.main import create_app
+from sharkservers.settings import get_settings
+from sharkservers.users.dependencies import get_presence_service
+from sharkservers.users.models import User
+from sharkservers.utils import connect_db, disconnect_db
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+    from fastapi.dependencies.models import Dependant
+
+Request = tuple[str, str, dict[str, Any]]
+
+SCENARIOS = ("login", "threads", "thread", "create_post", "like", "online")
+PERCENTILES = (50, 95, 99)
+# the number of ids of the seeded threads, posts and users the requests pick from
+SAMPLE_SIZE = 1000
+
+
+def percentile(ordered: list[float], rank: float) -> float:
+    """
+    Get a percentile with the nearest-rank method.
+
+    Args:
+    ----
+        ordered (list[float]): The sorted values.
+        rank (float): The percentile, from 0 to 100.
+
+    Returns:
+    -------
+        float: The smallest value greater than or equal to `rank` percent of the values.
+    """
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies: list[float], duration: float, statuses: Counter) -> dict:
+    """
+    Summarize the requests of a scenario.
+
+    Args:
+    ----
+        latencies (list[float]): The latency of every request, in seconds.
+        duration (float): The seconds it took to send all of them.
+        statuses (Counter): The number of responses by status code.
+
+    Returns:
+    -------
+        dict: The latencies in milliseconds and the requests per second.
+    """
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),  # noqa: PLR2004
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput": len(ordered) / duration,
+        "mean": sum(ordered) / len(ordered) * 1000,
+        **{f"p{rank}": percentile(ordered, rank) * 1000 for rank in PERCENTILES},
+        "max": ordered[-1] * 1000,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compare the scenarios of two runs.
+
+    Args:
+    ----
+        results (dict): The results of this run.
+        baseline (dict): The results of the baseline run.
+        tolerance (float): The allowed relative slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+    -------
+        list[str]: The regressions, empty when there are none.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        regressions.extend(
+            f"{name}: {metric} {previous[metric]:.2f} ms -> {current[metric]:.2f} ms"
+            for metric in (f"p{rank}" for rank in PERCENTILES)
+            if current[metric] > previous[metric] * (1 + tolerance)
+        )
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput']:.1f} req/s -> "
+                f"{current['throughput']:.1f} req/s",
+            )
+    return regressions
+
+
+def get_rate_limiters(dependant: Dependant) -> set[RateLimiter]:
+    """Get the rate limiters among the dependencies of an endpoint."""
+    limiters = set()
+    for dependency in dependant.dependencies:
+        if isinstance(dependency.call, RateLimiter):
+            limiters.add(dependency.call)
+        limiters |= get_rate_limiters(dependency)
+    return limiters
+
+
+async def no_rate_limit() -> None:
+    """Let every request through."""
+
+
+async def build_app() -> FastAPI:
+    """
+    Create and connect the application, without the rate limiters.
+
+    Returns
+    -------
+        FastAPI: The application.
+    """
+    _app = create_app()
+    for route in _app.routes:
+        dependant = getattr(route, "dependant", None)
+        for limiter in get_rate_limiters(dependant) if dependant else ():
+            _app.dependency_overrides[limiter] = no_rate_limit
+    return await connect_db(_app)
+
+
+def sample_ids(model: type, size: int, rng: random.Random) -> list:
+    """Sample the primary keys of the rows of a table."""
+    table = model.Meta.table
+    engine = get_sync_engine()
+    with engine.connect() as connection:
+        ids = connection.execute(sqlalchemy.select(table.c.id)).scalars().all()
+    engine.dispose()
+    return rng.sample(ids, min(size, len(ids)))
+
+
+async def log_in(client: AsyncClient, username: str) -> dict[str, str]:
+    """
+    Log in a seeded user.
+
+    Args:
+    ----
+        client (AsyncClient): The client of the application.
+        username (str): The username.
+
+    Returns:
+    -------
+        dict[str, str]: The authorization header.
+    """
+    response = await client.post(
+        "/v1/auth/token",
+        data={"username": username, "password": BENCH_PASSWORD},
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']['token']}"}
+
+
+class Scenarios:
+    """
+    Request builders of the scenarios.
+
+    Every scenario method builds the `index`-th request of the scenario. The requests of
+    the authenticated scenarios are spread over `--clients` users, logged in again before
+    every such scenario so their access tokens do not expire during the run.
+
+    Attributes
+    ----------
+        usernames (list[str]): The users sending the authenticated requests.
+        headers (list[dict[str, str]]): Their authorization headers.
+        thread_ids (list[str]): The threads read and posted in.
+        post_ids (list[str]): The posts liked, every like request likes another post.
+        online_ids (list[uuid.UUID]): The users put in the presence service.
+    """
+
+    authenticated = ("create_post", "like")
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        """Sample the seeded rows the requests use."""
+        rng = random.Random(args.seed)
+        self.usernames = [
+            f"bench_user_{i}" for i in rng.sample(range(args.users), args.clients)
+        ]
+        self.headers: list[dict[str, str]] = []
+        # the public IDs, as the API returns them
+        self.thread_ids = [
+            str(to_uuidbase62(_id, "thread"))
+            for _id in sample_ids(Thread, SAMPLE_SIZE, rng)
+        ]
+        self.post_ids = [
+            str(to_uuidbase62(_id, "post"))
+            for _id in sample_ids(Post, args.requests + args.warmup, rng)
+        ]
+        self.online_ids = sample_ids(User, args.online, rng)
+
+    async def prepare(self, _app: FastAPI, client: AsyncClient, name: str) -> None:
+        """
+        Prepare the application for a scenario.
+
+        Args:
+        ----
+            _app (FastAPI): The application.
+            client (AsyncClient): The client of the application.
+            name (str): The scenario.
+        """
+        if name in self.authenticated:
+            self.headers = [
+                await log_in(client, username) for username in self.usernames
+            ]
+        elif name == "online":
+            presence_service = await get_presence_service(
+                _app.state.redis,
+                get_settings(),
+            )
+            for user_id in self.online_ids:
+                await presence_service.touch(user_id)
+
+    def login(self, index: int) -> Request:
+        """Log in."""
+        return (
+            "POST",
+            "/v1/auth/token",
+            {
+                "data": {
+                    "username": self.usernames[index % len(self.usernames)],
+                    "password": BENCH_PASSWORD,
+                },
+            },
+        )
+
+    def threads(self, index: int) -> Request:
+        """List the threads, on one of the first pages."""
+        return "GET", f"/v1/forum/threads?page={index % 5 + 1}", {}
+
+    def thread(self, index: int) -> Request:
+        """Get a thread."""
+        thread_id = self.thread_ids[index % len(self.thread_ids)]
+        return "GET", f"/v1/forum/threads/{thread_id}", {}
+
+    def create_post(self, index: int) -> Request:
+        """Post in a thread."""
+        return (
+            "POST",
+            "/v1/forum/posts",
+            {
+                "json": {
+                    "thread_id": self.thread_ids[index % len(self.thread_ids)],
+                    "content": f"Bench post {index}",
+                },
+                "headers": self.headers[index % len(self.headers)],
+            },
+        )
+
+    def like(self, index: int) -> Request:
+        """Like a post."""
+        return (
+            "POST",
+            f"/v1/forum/posts/{self.post_ids[index % len(self.post_ids)]}/like",
+            {"headers": self.headers[index % len(self.headers)]},
+        )
+
+    def online(self, index: int) -> Request:
+        """List the online users."""
+        return "GET", f"/v1/users/online?page={index % 2 + 1}", {}
+
+
+async def measure(
+    client: AsyncClient,
+    build_request: Callable[[int], Request],
+    requests: int,
+    concurrency: int,
+    start_index: int = 0,
+) -> dict:
+    """
+    Send the requests of a scenario with the given concurrency.
+
+    Args:
+    ----
+        client (AsyncClient): The client of the application.
+        build_request (Callable[[int], Request]): The request builder of the scenario.
+        requests (int): The number of requests.
+        concurrency (int): The number of concurrent clients.
+        start_index (int): The index of the first request.
+
+    Returns:
+    -------
+        dict: The summary of the requests.
+    """
+    indexes = iter(range(start_index, start_index + requests))
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def run_client() -> None:
+        for index in indexes:
+            method, url, kwargs = build_request(index)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[run_client() for _ in range(concurrency)])
+    return summarize(latencies, time.perf_counter() - start, statuses)
+
+
+def get_commit() -> str | None:
+    """Get the checked out commit, None outside of a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],  # noqa: S603, S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenarios(
+    _app: FastAPI,
+    args: argparse.Namespace,
+    metadata: dict[str, Any],
+) -> dict:
+    """
+    Measure the scenarios.
+
+    Args:
+    ----
+        _app (FastAPI): The connected application.
+        args (argparse.Namespace): The command line arguments.
+        metadata (dict[str, Any]): The description of the run.
+
+    Returns:
+    -------
+        dict: The results, the metadata with the summary of every scenario.
+    """
+    results = {**metadata, "scenarios": {}}
+    scenarios = Scenarios(args)
+    async with AsyncClient(app=_app, base_url="http://bench") as client:
+        for name in args.scenarios:
+            await scenarios.prepare(_app, client, name)
+            build_request = getattr(scenarios, name)
+            requests = args.login_requests if name == "login" else args.requests
+            await measure(client, build_request, args.warmup, args.concurrency)
+            results["scenarios"][name] = await measure(
+                client,
+                build_request,
+                requests,
+                args.concurrency,
+                start_index=args.warmup,
+            )
+    return results
+
+
+async def main(args: argparse.Namespace) -> dict:
+    """
+    Run the benchmark.
+
+    Args:
+    ----
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+    -------
+        dict: The results, with the summary of every scenario.
+    """
+    # the request log would measure the terminal instead of the application
+    logger.setLevel(logging.WARNING)
+    volumes = Volumes(args.users, args.threads, args.posts, seed=args.seed)
+    seed_start = time.perf_counter()
+    seeded = await seed(volumes)
+    metadata = {
+        "commit": get_commit(),
+        "created_at": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+        "database": database.url.dialect,
+        "python": sys.version.split()[0],
+        "volumes": volumes.to_dict(),
+        "seeded": seeded,
+        "seed_duration": time.perf_counter() - seed_start,
+        "concurrency": args.concurrency,
+    }
+    _app = await build_app()
+    try:
+        return await run_scenarios(_app, args, metadata)
+    finally:
+        await disconnect_db(_app)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+
+    Args:
+    ----
+        argv (list[str] | None): The command line arguments, `sys.argv` by default.
+
+    Returns:
+    -------
+        argparse.Namespace: The arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=100_000)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument(
+        "--login-requests",
+        type=int,
+        default=100,
+        help="Logins hash the password, they get fewer requests.",
+    )
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=20,
+        help="The number of logged in users sending the authenticated requests.",
+    )
+    parser.add_argument(
+        "--online",
+        type=int,
+        default=200,
+        help="The number of users in the presence service.",
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    args.clients = min(args.clients, args.users)
+    args.online = min(args.online, args.users)
+    return args
+
+
+def render(results: dict) -> str:
+    """Render the results as a table."""
+    lines = [
+        f"{'scenario':>12} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>6}",
+    ]
+    lines.extend(
+        f"{name:>12} {summary['throughput']:8.1f} {summary['p50']:6.2f}ms "
+        f"{summary['p95']:6.2f}ms {summary['p99']:6.2f}ms {summary['errors']:6}"
+        for name, summary in results["scenarios"].items()
+    )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    run = asyncio.run(main(arguments))
+    print(render(run))  # noqa: T201
+    if arguments.output is not None:
+        arguments.output.write_text(json.dumps(run, indent=2))
+    exit_code = 0
+    if any(summary["errors"] for summary in run["scenarios"].values()):
+        print("Some requests failed, see the statuses")  # noqa: T201
+        exit_code = 1
+    if arguments.baseline is not None:
+        regressions = compare(
+            run,
+            json.loads(arguments.baseline.read_text()),
+            arguments.tolerance,
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}")  # noqa: T201
+        exit_code = exit_code or int(bool(regressions))
+    sys.exit(exit_code)
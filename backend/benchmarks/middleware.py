@@ -0,0 +1,248 @@
+"""
+Requests per second of the middleware stack.
+
+Compares the pure ASGI middlewares of the application with the same middlewares each behind
+a pass-through BaseHTTPMiddleware, i.e. the cost of the former `@app.middleware("http")`
+registration, on a trivial endpoint and on the thread list.
+
+The thread list spends most of its time in the database and serialization, so it gets
+fewer requests by default.
+
+Usage:
+    TESTING=True python -m benchmarks.middleware --requests 2000 --db-requests 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import sqlalchemy
+from fastapi_limiter import FastAPILimiter
+from httpx import AsyncClient
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from sharkservers.db import create_redis_pool, database, metadata
+from sharkservers.forum.dependencies import get_categories_service, get_threads_service
+from sharkservers.logger import logger
+from sharkservers.main import create_app
+from sharkservers.middleware import (
+    LogRequestMiddleware,
+    MetricsMiddleware,
+    QueryInstrumentationMiddleware,
+    UserLastOnlineMiddleware,
+)
+from sharkservers.roles.dependencies import get_roles_service
+from sharkservers.roles.enums import ProtectedDefaultRolesTagEnum
+from sharkservers.scopes.dependencies import get_scopes_service
+from sharkservers.users.dependencies import get_users_service
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI, Request, Response
+
+APP_MIDDLEWARES = (
+    LogRequestMiddleware,
+    MetricsMiddleware,
+    QueryInstrumentationMiddleware,
+    UserLastOnlineMiddleware,
+)
+ENDPOINTS = {"ping": ("/bench/ping", False), "threads": ("/v1/forum/threads", True)}
+
+
+async def pass_through(request: Request, call_next) -> Response:  # noqa: ANN001
+    """Return the response of the wrapped application unchanged."""
+    return await call_next(request)
+
+
+def use_base_http_middleware(_app: FastAPI) -> FastAPI:
+    """
+    Put every middleware of the application behind a BaseHTTPMiddleware.
+
+    Args:
+    ----
+        _app (FastAPI): The application, before its first request.
+
+    Returns:
+    -------
+        FastAPI: The same application.
+    """
+    _app.user_middleware = [
+        wrapped
+        for middleware in _app.user_middleware
+        for wrapped in (
+            (Middleware(BaseHTTPMiddleware, dispatch=pass_through), middleware)
+            if middleware.cls in APP_MIDDLEWARES
+            else (middleware,)
+        )
+    ]
+    return _app
+
+
+async def build_app(*, legacy: bool) -> FastAPI:
+    """
+    Create the application with the benchmark endpoint.
+
+    Args:
+    ----
+        legacy (bool): Whether to put the middlewares behind BaseHTTPMiddleware.
+
+    Returns:
+    -------
+        FastAPI: The application.
+    """
+    _app = create_app()
+
+    @_app.get(ENDPOINTS["ping"][0], tags=["bench"])
+    async def ping() -> dict:
+        return {"ping": "pong"}
+
+    if legacy:
+        use_base_http_middleware(_app)
+    _app.state.redis = await create_redis_pool()
+    return _app
+
+
+async def seed(threads: int) -> None:
+    """
+    Create the threads listed by the benchmark unless they exist.
+
+    Args:
+    ----
+        threads (int): The number of threads.
+    """
+    metadata.create_all(sqlalchemy.create_engine(str(database.url.replace(driver=""))))
+    roles_service = await get_roles_service()
+    await roles_service.create_default_roles(await get_scopes_service())
+    role = await roles_service.get_one(tag=ProtectedDefaultRolesTagEnum.USER.value)
+    users_service = await get_users_service()
+    author, _ = await users_service.Meta.model.objects.get_or_create(
+        username="bench_author",
+        _defaults={
+            "email": "bench_author@bench.pl",
+            "password": "!",
+            "secret_salt": "bench_author",
+            "display_role": role,
+        },
+    )
+    if author.display_role is None:
+        await author.update(display_role=role)
+    threads_service = await get_threads_service()
+    if await threads_service.Meta.model.objects.count() >= threads:
+        return
+    categories_service = await get_categories_service()
+    category, _ = await categories_service.Meta.model.objects.get_or_create(
+        name="Bench category",
+    )
+    await threads_service.bulk_create(
+        [
+            {
+                "title": f"Bench thread {i}",
+                "content": f"Bench content {i}",
+                "category": category.id,
+                "author": author.id,
+            }
+            for i in range(threads)
+        ],
+    )
+
+
+async def measure(
+    _app: FastAPI,
+    url: str,
+    requests: int,
+    concurrency: int,
+) -> float:
+    """
+    Send the requests with the given concurrency.
+
+    Args:
+    ----
+        _app (FastAPI): The application.
+        url (str): The URL to request.
+        requests (int): The number of requests.
+        concurrency (int): The number of concurrent clients.
+
+    Returns:
+    -------
+        float: The requests per second.
+    """
+    async with AsyncClient(app=_app, base_url="http://bench") as client:
+
+        async def run_client(count: int) -> None:
+            for _ in range(count):
+                response = await client.get(url)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[
+                run_client(requests // concurrency + (i < requests % concurrency))
+                for i in range(concurrency)
+            ],
+        )
+        return requests / (time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    """
+    Run the benchmark.
+
+    Args:
+    ----
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+    -------
+        dict[str, dict[str, float]]: The best requests per second by endpoint and stack.
+    """
+    # the request log would measure the terminal instead of the middlewares
+    logger.setLevel(logging.WARNING)
+    await database.connect()
+    await seed(args.threads)
+    apps = {
+        "asgi": await build_app(legacy=False),
+        "base_http": await build_app(legacy=True),
+    }
+    await FastAPILimiter.init(apps["asgi"].state.redis)
+    results: dict[str, dict[str, float]] = {}
+    for endpoint, (url, uses_db) in ENDPOINTS.items():
+        requests = args.db_requests if uses_db else args.requests
+        results[endpoint] = {stack: 0.0 for stack in apps}
+        for _app in apps.values():
+            await measure(_app, url, max(requests // 10, 1), args.concurrency)
+        # alternate the stacks so a drift of the machine affects both
+        for _ in range(args.repeat):
+            for stack, _app in apps.items():
+                rps = await measure(_app, url, requests, args.concurrency)
+                results[endpoint][stack] = max(results[endpoint][stack], rps)
+    await database.disconnect()
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+
+    Returns
+    -------
+        argparse.Namespace: The arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--db-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=50)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    for endpoint, stacks in asyncio.run(main(parse_args())).items():
+        gain = stacks["asgi"] / stacks["base_http"] - 1
+        print(  # noqa: T201
+            f"{endpoint:>8}: asgi {stacks['asgi']:8.1f} req/s, "
+            f"base_http {stacks['base_http']:8.1f} req/s ({gain:+.1%})",
+        )
@@ -0,0 +1,140 @@
+"""
+Seed the database of the benchmarks with forum-sized volumes.
+
+The users, categories, threads and posts are generated by `sharkservers.generator`, which
+writes them in batches, with the skewed activity of a real forum. Every seeded user gets
+the user role and the same password.
+
+The volumes are recorded in the description of the first category, so the next runs with
+the same volumes reuse the seeded data.
+"""
+from __future__ import annotations
+
+import sqlalchemy
+
+from sharkservers.db import database
+from sharkservers.forum.models import Category
+from sharkservers.generator import (
+    DatasetOptions,
+    generate_dataset,
+    get_sync_engine,
+    reset_database,
+)
+
+BENCH_PASSWORD = "bench_password"  # noqa: S105
+BENCH_PREFIX = "bench"
+
+
+class Volumes:
+    """
+    Numbers of seeded rows.
+
+    Attributes
+    ----------
+        users (int): The number of users.
+        threads (int): The number of threads.
+        posts (int): The number of posts.
+        categories (int): The number of categories.
+        seed (int): The seed of the random generator.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        users: int,
+        threads: int,
+        posts: int,
+        categories: int = 10,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the Volumes."""
+        self.users = users
+        self.threads = threads
+        self.posts = posts
+        self.categories = categories
+        self.seed = seed
+
+    def to_dict(self) -> dict[str, int]:
+        """Return the volumes by name."""
+        return {
+            "users": self.users,
+            "threads": self.threads,
+            "posts": self.posts,
+            "categories": self.categories,
+            "seed": self.seed,
+        }
+
+    def to_options(self) -> DatasetOptions:
+        """Return the options of the generated dataset, without likes and chat messages."""
+        return DatasetOptions(
+            **self.to_dict(),
+            likes=0,
+            chats=0,
+            prefix=BENCH_PREFIX,
+            password=BENCH_PASSWORD,
+        )
+
+    @property
+    def marker(self) -> str:
+        """Return the description of the first category, which records the seeded volumes."""
+        return " ".join(f"{name}={value}" for name, value in self.to_dict().items())
+
+
+def is_seeded(engine: sqlalchemy.engine.Engine, volumes: Volumes) -> bool:
+    """
+    Check whether the database already holds the given volumes.
+
+    Args:
+    ----
+        engine (sqlalchemy.engine.Engine): The synchronous engine.
+        volumes (Volumes): The volumes.
+
+    Returns:
+    -------
+        bool: Whether the seeded data can be reused.
+    """
+    table = Category.Meta.table
+    if not sqlalchemy.inspect(engine).has_table(table.name):
+        return False
+    with engine.connect() as connection:
+        description = connection.execute(
+            sqlalchemy.select(table.c.description).where(
+                table.c.name == f"{BENCH_PREFIX}_category_0",
+            ),
+        ).scalar()
+    return description == volumes.marker
+
+
+async def seed(volumes: Volumes) -> bool:
+    """
+    Recreate the tables and seed them unless the database already holds the volumes.
+
+    Call it before connecting to the database.
+
+    Args:
+    ----
+        volumes (Volumes): The volumes.
+
+    Returns:
+    -------
+        bool: Whether the database was seeded, False when it was reused.
+    """
+    engine = get_sync_engine()
+    try:
+        if is_seeded(engine, volumes):
+            return False
+        reset_database(engine)
+        await database.connect()
+        try:
+            await generate_dataset(volumes.to_options())
+        finally:
+            await database.disconnect()
+        table = Category.Meta.table
+        with engine.begin() as connection:
+            connection.execute(
+                table.update()
+                .where(table.c.name == f"{BENCH_PREFIX}_category_0")
+                .values(description=volumes.marker),
+            )
+    finally:
+        engine.dispose()
+    return True
@@ -0,0 +1,26 @@
+"""Chat rooms
+
+Revision ID: 9c1e4b7d2a61
+Revises: 3700a8acf4b0
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1e4b7d2a61'
+down_revision = '3700a8acf4b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column('room', sa.String(length=64), nullable=False, server_default='global'))
+    op.create_index(op.f('ix_chats_room'), 'chats', ['room'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chats_room'), table_name='chats')
+    op.drop_column('chats', 'room')
@@ -0,0 +1,74 @@
+"""UUIDv7 primary keys
+
+Re-key the existing rows of the insert-heavy tables with time-ordered UUIDv7 keys derived
+from their created_at, so the old rows sort before the new ones. The many-to-many tables
+referencing them are updated explicitly because SQLite does not cascade by default.
+
+Revision ID: b4f2d8e61c3a
+Revises: 9c1e4b7d2a61
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from sharkservers.auth.utils import APP_TIMEZONE
+from sharkservers.db import uuid7
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f2d8e61c3a'
+down_revision = '9c1e4b7d2a61'
+branch_labels = None
+depends_on = None
+
+# table -> [(referencing table, referencing column)]
+TABLES = {
+    'chats': [],
+    'forum_posts': [('threads_posts', 'post'), ('posts_likes', 'post')],
+    'forum_threads': [('threads_posts', 'thread'), ('threads_threadmetas', 'thread')],
+    'forum_reputation': [('posts_likes', 'like')],
+    'forum_threads_meta': [('threads_threadmetas', 'threadmeta')],
+    'user_sessions': [('users_usersessions', 'usersession')],
+}
+
+
+def _get_timestamp_ms(created_at):
+    if created_at is None:
+        return None
+    if isinstance(created_at, str):
+        created_at = datetime.datetime.fromisoformat(created_at)
+    # created_at is the naive local time of the application, see now_datetime
+    return int(created_at.replace(tzinfo=APP_TIMEZONE).timestamp() * 1000)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    for table, references in TABLES.items():
+        rows = connection.execute(
+            sa.text(f'SELECT id, created_at FROM {table} ORDER BY created_at'),
+        ).fetchall()
+        keys = [
+            {'old': row.id, 'new': uuid7(_get_timestamp_ms(row.created_at)).hex}
+            for row in rows
+        ]
+        if not keys:
+            continue
+        connection.execute(
+            sa.text(f'UPDATE {table} SET id = :new WHERE id = :old'),
+            keys,
+        )
+        for reference_table, column in references:
+            connection.execute(
+                sa.text(
+                    f'UPDATE {reference_table} SET "{column}" = :new WHERE "{column}" = :old',
+                ),
+                keys,
+            )
+
+
+def downgrade() -> None:
+    # the old random keys are not kept, so the rows cannot be re-keyed back
+    raise NotImplementedError('The UUIDv7 primary keys cannot be downgraded')
@@ -33,6 +33,7 @@ from sharkservers.auth.schemas import TokenDataSchema
 from sharkservers.auth.services.auth import AuthService
 from sharkservers.auth.services.code import CodeService
 from sharkservers.auth.services.jwt import JWTService
+from sharkservers.auth.services.principal import principal_cache
 from sharkservers.auth.services.steam import SteamAuthService
 from sharkservers.db import get_redis
 from sharkservers.logger import logger
@@ -148,7 +149,13 @@ async def get_current_user(
         if scope not in token_data.scopes:
             raise no_permissions_exception
     logger.info(f"Token data: {token_data.user_id}")
-    user: User = await users_service.get_one(
+    user = await principal_cache.get(
+        token_data.user_id.uuid,
+        token_data.secret,
+    )
+    if user is not None:
+        return user
+    user = await users_service.get_one(
         id=token_data.user_id.uuid,
         related=[
             "roles",
@@ -161,7 +168,7 @@ async def get_current_user(
     )
     if user.secret_salt != token_data.secret:
         raise invalid_credentials_exception
-
+    await principal_cache.set(user)
     return user
 
 
@@ -31,6 +31,7 @@ class AuthExceptionsDetailEnum(str, Enum):
     INCORRECT_USERNAME_PASSWORD = "Incorrect username or password"  # noqa: S105
     NO_PERMISSIONS = "Not enough permissions"
     USER_EXISTS = "Email or username already exists"
+    PASSWORD_HASHER_BUSY = "Too many authentication requests, try again later"  # noqa: S105
 
 
 class AuthEventsEnum(str, Enum):
@@ -15,6 +15,7 @@ Exceptions:
 - user_exists_exception: Raised when a user exists.
 - invalid_activation_code_exception: Raised when an activation code is invalid.
 - token_expired_exception: Raised when a token is expired.
+- password_hasher_busy_exception: Raised when the password hasher queue is full.
 """
 
 from fastapi import HTTPException
@@ -70,3 +71,7 @@ token_expired_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail=AuthExceptionsDetailEnum.TOKEN_EXPIRED,
 )
+password_hasher_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail=AuthExceptionsDetailEnum.PASSWORD_HASHER_BUSY,
+)
@@ -39,8 +39,10 @@ from sharkservers.auth.schemas import (
     TokenSchema,
 )
 from sharkservers.auth.services.code import CodeService
+from sharkservers.auth.services.hasher import password_hasher
 from sharkservers.auth.services.jwt import JWTService
-from sharkservers.auth.utils import get_password_hash, now_datetime, verify_password
+from sharkservers.auth.services.principal import principal_cache
+from sharkservers.auth.utils import now_datetime
 from sharkservers.enums import ActivationEmailTypeEnum
 from sharkservers.logger import logger
 from sharkservers.roles.enums import ProtectedDefaultRolesTagEnum
@@ -147,7 +149,10 @@ class AuthService:
                 username=username,
                 related=["roles", "roles__scopes", "sessions"],
             )
-            if not verify_password(password, user.password) or not user.is_activated:
+            if (
+                not await password_hasher.verify(password, user.password)
+                or not user.is_activated
+            ):
                 return False
         except NoMatch:
             return False
@@ -180,8 +185,8 @@ class AuthService:
         ------
             user_exists_exception: If the user already exists.
         """
+        password = await password_hasher.hash(user_data.password)
         try:
-            password = get_password_hash(user_data.password)
             secret_salt = self.generate_secret_salt()
 
             user_role = await self.roles_service.get_one(
@@ -266,7 +271,7 @@ class AuthService:
         refresh_token, refresh_toke_exp = jwt_refresh_token_service.encode(
             data={"sub": user_id, "secret": user.secret_salt},
         )
-        await user.update(last_online=now_datetime())
+        await user.update(_columns=["last_online"], last_online=now_datetime())
         return (
             TokenSchema(
                 access_token=TokenDetailsSchema(
@@ -325,7 +330,7 @@ class AuthService:
                 },
             )
             # TODO(Qwizi): replace with timezone  # noqa: TD003
-            await user.update(last_login=datetime.utcnow())  # noqa: DTZ003
+            await user.update(_columns=["last_login"], last_login=datetime.utcnow())  # noqa: DTZ003
             return (
                 TokenSchema(
                     access_token=TokenDetailsSchema(
@@ -357,7 +362,8 @@ class AuthService:
             User: The updated user object.
         """
         secret = self.generate_secret_salt()
-        await user.update(secret_salt=secret)
+        await user.update(_columns=["secret_salt"], secret_salt=secret)
+        await principal_cache.invalidate(user.id)
         return user
 
     @staticmethod
@@ -456,7 +462,7 @@ class AuthService:
         if user.is_activated:
             await code_service.delete(code)
             raise user_activated_exception
-        await user.update(is_activated=True)
+        await user.update(_columns=["is_activated"], is_activated=True)
         return True, user
 
     async def confirm_change_email(self, code_service: CodeService, code: str) -> User:
@@ -482,7 +488,7 @@ class AuthService:
         user_id = int(user_data.get("user_id"))
         email = user_data.get("email")
         user = await self.users_service.get_one(id=user_id)
-        await user.update(email=email)
+        await user.update(_columns=["email"], email=email)
         return user
 
     async def reset_password(
@@ -506,8 +512,9 @@ class AuthService:
         if not email:
             raise invalid_activation_code_exception
         user = await self.users_service.get_one(email=email)
-        new_password = get_password_hash(reset_password_data.password)
+        new_password = await password_hasher.hash(reset_password_data.password)
         await user.update(
+            _columns=["password", "secret_salt"],
             password=new_password,
             secret_salt=self.generate_secret_salt(),
         )
@@ -0,0 +1,120 @@
+"""
+Password hasher.
+
+This module contains PasswordHasher class which runs the CPU bound password hashing and
+verification in a bounded thread pool instead of on the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from sharkservers.auth.exceptions import password_hasher_busy_exception
+from sharkservers.auth.utils import get_password_hash, verify_password
+from sharkservers.settings import get_settings
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """
+    Service class for hashing and verifying passwords in a bounded worker pool.
+
+    Bcrypt releases the GIL, so the hashes run in parallel on the worker threads while
+    the event loop keeps serving other requests. At most `workers` operations run at once,
+    up to `queue_size` more wait for a worker and the rest are rejected with 503.
+
+    Attributes
+    ----------
+        workers (int): The number of worker threads.
+        queue_size (int): The maximum number of operations waiting for a worker.
+        in_flight (int): The number of running and waiting operations.
+        rejected (int): The number of operations rejected because the queue was full.
+
+    Methods
+    -------
+        hash: Hash a password.
+        verify: Verify a password against a hash.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 64) -> None:
+        """Initialize the PasswordHasher."""
+        self.workers = workers
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="password-hasher",
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Return the number of operations waiting for a worker.
+
+        Returns
+        -------
+            int: The queue depth.
+        """
+        return max(self.in_flight - self.workers, 0)
+
+    async def hash(self, plain_password: str) -> str:
+        """
+        Hash a password.
+
+        Args:
+        ----
+            plain_password (str): The plain password to be hashed.
+
+        Returns:
+        -------
+            str: The hashed password.
+
+        Raises:
+        ------
+            password_hasher_busy_exception: If the queue is full.
+        """
+        return await self._run(get_password_hash, plain_password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify if a plain password matches a hashed password.
+
+        Args:
+        ----
+            plain_password (str): The plain password to verify.
+            hashed_password (str): The hashed password to compare against.
+
+        Returns:
+        -------
+            bool: True if the plain password matches the hashed password, False otherwise.
+
+        Raises:
+        ------
+            password_hasher_busy_exception: If the queue is full.
+        """
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, func: Callable[..., T], *args: str) -> T:
+        if self.in_flight >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise password_hasher_busy_exception
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                func,
+                *args,
+            )
+        finally:
+            self.in_flight -= 1
+
+
+settings = get_settings()
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASHER_WORKERS,
+    queue_size=settings.PASSWORD_HASHER_QUEUE_SIZE,
+)
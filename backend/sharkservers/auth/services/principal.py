@@ -0,0 +1,266 @@
+"""
+Principal cache.
+
+This module contains PrincipalCache class which caches the authenticated user with its
+roles, scopes and player, so most requests authenticate without hitting the database.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from typing import TYPE_CHECKING
+
+from ormar import post_delete, post_relation_add, post_relation_remove, post_update
+from redis import asyncio as aioredis
+
+from sharkservers.cache import LocalCache
+from sharkservers.logger import logger
+from sharkservers.roles.models import Role
+from sharkservers.users.models import User
+
+if TYPE_CHECKING:
+    import uuid
+
+    from redis.asyncio.client import PubSub
+
+
+class PrincipalCache:
+    """
+    Two level cache of authenticated users keyed by user ID and secret salt.
+
+    The first level is an in-process LRU with a short TTL, the second one is a Redis hash
+    per user with the secret salt as the field, so a logout or a password reset changing
+    the salt misses the cache. The password hash and the secret salt are not part of the
+    cached user, which only authenticates and authorizes the request: a service changing
+    the user loads what it needs and updates only its own columns.
+    The invalidations are published on a Redis channel and every subscribed worker drops
+    its in-process entries, so a deactivated user or a removed role is not authorized by
+    the other workers. Without the subscription only Redis is used. The cache stays
+    disabled until `init` is called.
+
+    Attributes
+    ----------
+        redis (aioredis.Redis): Redis instance for the shared cache.
+        ttl (int): The TTL of the Redis entries in seconds.
+        local_ttl (float): The TTL of the in-process entries in seconds.
+        max_size (int): The maximum number of in-process entries.
+
+    Methods
+    -------
+        init: Enable the cache.
+        close: Disable the cache.
+        subscribe: Listen to the invalidations of the other workers.
+        unsubscribe: Stop listening to the invalidations.
+        get: Get the cached user.
+        set: Cache the user.
+        invalidate: Remove the user from the cache.
+        invalidate_all: Remove all users from the cache.
+    """
+
+    key = "principal"
+    channel = "principal:invalidate"
+    # the message invalidating all users
+    everyone = "*"
+
+    def __init__(self) -> None:
+        """Initialize the PrincipalCache."""
+        self.redis: aioredis.Redis | None = None
+        self.ttl = 60
+        self.local_ttl = 5.0
+        self.max_size = 1024
+        self._local = LocalCache(self.local_ttl, self.max_size)
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+
+    @property
+    def subscribed(self) -> bool:
+        """
+        Return whether the worker listens to the invalidations.
+
+        Returns
+        -------
+            bool: True if the listener is running.
+        """
+        return self._listener is not None and not self._listener.done()
+
+    def init(
+        self,
+        redis: aioredis.Redis,
+        ttl: int = 60,
+        local_ttl: float = 5.0,
+        max_size: int = 1024,
+    ) -> None:
+        """
+        Enable the cache.
+
+        Args:
+        ----
+            redis (aioredis.Redis): Redis instance for the shared cache.
+            ttl (int, optional): The TTL of the Redis entries in seconds. Defaults to 60.
+            local_ttl (float, optional): The TTL of the in-process entries in seconds. Defaults to 5.
+            max_size (int, optional): The maximum number of in-process entries. Defaults to 1024.
+        """
+        self.redis = redis
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_size = max_size
+        self._local = LocalCache(local_ttl, max_size)
+
+    def close(self) -> None:
+        """Disable the cache."""
+        self.redis = None
+        self._local.clear()
+
+    async def subscribe(self) -> None:
+        """Listen to the invalidations of the other workers on the Redis channel."""
+        if self.redis is None or self.subscribed:
+            return
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._local.clear()
+        self._listener = asyncio.create_task(self._listen(self._pubsub))
+
+    async def unsubscribe(self) -> None:
+        """Stop listening to the invalidations."""
+        listener, self._listener = self._listener, None
+        pubsub, self._pubsub = self._pubsub, None
+        if listener is not None:
+            listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await listener
+        if pubsub is not None:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        self._local.clear()
+
+    def get_redis_key(self, user_id: uuid.UUID) -> str:
+        """
+        Return the Redis key for the given user ID.
+
+        Args:
+        ----
+            user_id (uuid.UUID): The ID of the user.
+
+        Returns:
+        -------
+            str: The Redis key.
+        """
+        return f"{self.key}:{user_id}"
+
+    async def get(self, user_id: uuid.UUID, secret_salt: str) -> User | None:
+        """
+        Get the cached user.
+
+        Args:
+        ----
+            user_id (uuid.UUID): The ID of the user.
+            secret_salt (str): The secret salt from the access token.
+
+        Returns:
+        -------
+            User | None: The user or None if it is not cached or the secret salt does not match.
+        """
+        if self.redis is None:
+            return None
+        entries = self._local.get(str(user_id)) if self.subscribed else None
+        data = entries.get(secret_salt) if entries else None
+        if data is None:
+            payload = await self.redis.hget(self.get_redis_key(user_id), secret_salt)
+            if payload is None:
+                return None
+            data = json.loads(payload)
+            if self.subscribed:
+                self._local.set(str(user_id), {secret_salt: data})
+        # the secrets are not cached, the salt is the one of the key
+        user = User(**data, password="", secret_salt=secret_salt)
+        user.set_save_status(True)  # noqa: FBT003
+        return user
+
+    async def set(self, user: User) -> None:
+        """
+        Cache the user under its current secret salt.
+
+        Args:
+        ----
+            user (User): The user loaded with its relations.
+        """
+        if self.redis is None:
+            return
+        payload = user.json(exclude={"password", "secret_salt"})
+        if self.subscribed:
+            self._local.set(str(user.id), {user.secret_salt: json.loads(payload)})
+        key = self.get_redis_key(user.id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, user.secret_salt, payload)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        """
+        Remove the user from the cache.
+
+        Args:
+        ----
+            user_id (uuid.UUID): The ID of the user.
+        """
+        if self.redis is None:
+            return
+        self._local.pop(str(user_id))
+        await self.redis.delete(self.get_redis_key(user_id))
+        await self.redis.publish(self.channel, str(user_id))
+
+    async def invalidate_all(self) -> None:
+        """Remove all users from the cache."""
+        if self.redis is None:
+            return
+        self._local.clear()
+        keys = [key async for key in self.redis.scan_iter(match=f"{self.key}:*")]
+        if keys:
+            await self.redis.delete(*keys)
+        await self.redis.publish(self.channel, self.everyone)
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        try:
+            async for message in pubsub.listen():
+                user_id = message["data"]
+                if isinstance(user_id, bytes):
+                    user_id = user_id.decode()
+                if user_id == self.everyone:
+                    self._local.clear()
+                else:
+                    self._local.pop(user_id)
+        except Exception:  # noqa: BLE001
+            logger.exception("Principal cache invalidation listener failed")
+        finally:
+            # the in-process entries cannot be trusted without the invalidations
+            self._local.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+@post_update(User)
+@post_delete(User)
+@post_relation_add(User)
+@post_relation_remove(User)
+async def invalidate_principal_after_user_change(
+    sender: User,  # noqa: ARG001
+    instance: User,
+    **kwargs,  # noqa: ANN003, ARG001
+) -> None:
+    """Invalidate the cached user after it changes."""
+    await principal_cache.invalidate(instance.id)
+
+
+@post_update(Role)
+@post_delete(Role)
+@post_relation_add(Role)
+@post_relation_remove(Role)
+async def invalidate_principals_after_role_change(
+    sender: Role,  # noqa: ARG001
+    instance: Role,  # noqa: ARG001
+    **kwargs,  # noqa: ANN003, ARG001
+) -> None:
+    """Invalidate all cached users after a role or its scopes change."""
+    await principal_cache.invalidate_all()
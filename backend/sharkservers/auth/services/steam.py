@@ -140,9 +140,9 @@ class SteamAuthService:
             player = await self.players_service.Meta.model.objects.get(
                 steamid64=steamid64,
             )
-            await user.update(player=user)
+            await user.update(_columns=["player"], player=user)
             return player
 
         new_player = await self.players_service.create_player(steamid64=steamid64)
-        await user.update(player=new_player)
+        await user.update(_columns=["player"], player=new_player)
         return new_player
@@ -13,6 +13,9 @@ from cryptography.fernet import Fernet
 from passlib.context import CryptContext
 from zoneinfo import ZoneInfo
 
+# the timezone of the naive datetimes stored by the application
+APP_TIMEZONE = ZoneInfo("Europe/Warsaw")
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 crypto_key = Fernet.generate_key()
@@ -59,4 +62,4 @@ def now_datetime() -> datetime:
     -------
         datetime: The current datetime without timezone information.
     """
-    return datetime.now(tz=ZoneInfo("Europe/Warsaw")).replace(tzinfo=None)
+    return datetime.now(tz=APP_TIMEZONE).replace(tzinfo=None)
@@ -0,0 +1,450 @@
+"""
+Read-through cache of the service queries.
+
+This module contains ServiceCache class which caches the results of `BaseService.get_one`
+and `BaseService.get_all` for the services declaring `cache_ttl` in their Meta, and
+LocalCache class, the in-process LRU level of the Redis backed caches.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
+
+from ormar import (
+    post_delete,
+    post_relation_add,
+    post_relation_remove,
+    post_save,
+    post_update,
+)
+
+from sharkservers.logger import logger
+
+if TYPE_CHECKING:
+    import ormar
+    from redis import asyncio as aioredis
+    from redis.asyncio.client import PubSub
+
+
+class LocalCache:
+    """
+    In-process LRU cache whose entries expire after a TTL.
+
+    Attributes
+    ----------
+        ttl (float): The TTL of the entries in seconds.
+        max_size (int): The maximum number of entries, the least recently used are evicted.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_size: int = 1024) -> None:
+        """Initialize the LocalCache."""
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Get a value.
+
+        Args:
+        ----
+            key (Hashable): The key.
+
+        Returns:
+        -------
+            Any | None: The value or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Set a value and evict the least recently used ones over the size.
+
+        Args:
+        ----
+            key (Hashable): The key.
+            value (Any): The value.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove a value.
+
+        Args:
+        ----
+            key (Hashable): The key.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all values."""
+        self._entries.clear()
+
+
+class ServiceCache:
+    """
+    Two level read-through cache of the service queries.
+
+    Every cached entry is keyed by the query and by the versions of the tables it reads,
+    i.e. the table of the model and the tables of the selected relations. The ormar signals
+    of these models bump the table version, so the entries built from the old data are
+    never read again and expire with their TTL. Concurrent misses of the same key in one
+    worker wait for a single load.
+
+    The first level is an in-process LRU with a short TTL, the second one is Redis.
+    While subscribed to the invalidation channel the worker also keeps the table versions
+    in process and drops them when any worker bumps them, so a first level hit costs no
+    round trip at all. Without the subscription the versions are read from Redis on every
+    lookup. The cache stays disabled until `init` is called.
+
+    Attributes
+    ----------
+        redis (aioredis.Redis): Redis instance for the cached entries.
+        local_ttl (float): The TTL of the in-process entries and versions in seconds.
+        max_size (int): The maximum number of in-process entries.
+
+    Methods
+    -------
+        init: Enable the cache.
+        close: Disable the cache.
+        subscribe: Listen to the invalidations of the other workers.
+        unsubscribe: Stop listening to the invalidations.
+        watch: Invalidate the tables of a model on its signals.
+        watch_related: Watch a model and the models it relates to.
+        invalidate: Bump the version of a table.
+        get_or_load: Return the cached value or load and cache it.
+    """
+
+    key = "cache"
+    channel = "cache:invalidate"
+
+    def __init__(self) -> None:
+        """Initialize the ServiceCache."""
+        self.redis: aioredis.Redis | None = None
+        self.local_ttl = 5.0
+        self.max_size = 1024
+        self._local = LocalCache(self.local_ttl, self.max_size)
+        self._versions: dict[str, tuple[float, str]] = {}
+        self._invalidations = 0
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._watched: set[type[ormar.Model]] = set()
+        self._tables: dict[tuple[type[ormar.Model], tuple[str, ...]], list[str]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Return whether the cache is enabled.
+
+        Returns
+        -------
+            bool: True if the cache is enabled.
+        """
+        return self.redis is not None
+
+    @property
+    def subscribed(self) -> bool:
+        """
+        Return whether the worker listens to the invalidations.
+
+        Returns
+        -------
+            bool: True if the listener is running.
+        """
+        return self._listener is not None and not self._listener.done()
+
+    def init(
+        self,
+        redis: aioredis.Redis,
+        local_ttl: float = 5.0,
+        max_size: int = 1024,
+    ) -> None:
+        """
+        Enable the cache.
+
+        Args:
+        ----
+            redis (aioredis.Redis): Redis instance for the cached entries.
+            local_ttl (float, optional): The TTL of the in-process entries in seconds. Defaults to 5.
+            max_size (int, optional): The maximum number of in-process entries. Defaults to 1024.
+        """
+        self.redis = redis
+        self.local_ttl = local_ttl
+        self.max_size = max_size
+        self._local = LocalCache(local_ttl, max_size)
+        self._versions.clear()
+
+    def close(self) -> None:
+        """Disable the cache."""
+        self.redis = None
+        self._local.clear()
+        self._versions.clear()
+
+    async def subscribe(self) -> None:
+        """Listen to the invalidations of the other workers on the Redis channel."""
+        if self.redis is None or self.subscribed:
+            return
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._versions.clear()
+        self._listener = asyncio.create_task(self._listen(self._pubsub))
+
+    async def unsubscribe(self) -> None:
+        """Stop listening to the invalidations."""
+        listener, self._listener = self._listener, None
+        pubsub, self._pubsub = self._pubsub, None
+        if listener is not None:
+            listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await listener
+        if pubsub is not None:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        self._versions.clear()
+
+    def get_version_key(self, table: str) -> str:
+        """
+        Return the Redis key of the table version.
+
+        Args:
+        ----
+            table (str): The table name.
+
+        Returns:
+        -------
+            str: The Redis key.
+        """
+        return f"{self.key}:{table}:version"
+
+    def watch(self, model: type[ormar.Model]) -> None:
+        """
+        Invalidate the table of the model on its save, update, delete and relation signals.
+
+        Args:
+        ----
+            model (type[ormar.Model]): The model.
+        """
+        if model in self._watched:
+            return
+        self._watched.add(model)
+
+        async def invalidate_after_change(
+            sender: type[ormar.Model],
+            **kwargs,  # noqa: ANN003, ARG001
+        ) -> None:
+            await self.invalidate(sender.Meta.tablename)
+
+        for signal in (
+            post_save,
+            post_update,
+            post_delete,
+            post_relation_add,
+            post_relation_remove,
+        ):
+            signal(model)(invalidate_after_change)
+
+    def watch_related(self, model: type[ormar.Model]) -> None:
+        """
+        Watch a model and every model reachable through its relations.
+
+        The services declaring `cache_ttl` watch their model when they are defined, so a
+        worker writing a model before it ever read it through the cache still bumps its
+        table version for the other workers.
+
+        Args:
+        ----
+            model (type[ormar.Model]): The model.
+        """
+        pending = [model]
+        while pending:
+            current = pending.pop()
+            if current in self._watched:
+                continue
+            self.watch(current)
+            for field in current.Meta.model_fields.values():
+                if not field.is_relation or field.virtual:
+                    continue
+                pending.append(field.to)
+                if field.is_multi and field.through is not None:
+                    pending.append(field.through)
+
+    async def invalidate(self, table: str) -> None:
+        """
+        Bump the version of a table and notify the other workers.
+
+        Writes which bypass the ormar signals, e.g. `QuerySet.update` or raw statements,
+        call it explicitly.
+
+        Args:
+        ----
+            table (str): The table name.
+        """
+        if self.redis is None:
+            return
+        await self.redis.incr(self.get_version_key(table))
+        self._invalidations += 1
+        self._versions.pop(table, None)
+        await self.redis.publish(self.channel, table)
+
+    def get_tables(
+        self,
+        model: type[ormar.Model],
+        related: str | list[str] | None,
+    ) -> list[str]:
+        """
+        Return the tables read by a query and watch their models.
+
+        Args:
+        ----
+            model (type[ormar.Model]): The queried model.
+            related (str | list[str] | None): The selected relations.
+
+        Returns:
+        -------
+            list[str]: The table names.
+        """
+        if isinstance(related, str):
+            related = [related]
+        fingerprint = (model, tuple(sorted(related or [])))
+        tables = self._tables.get(fingerprint)
+        if tables is not None:
+            return tables
+        models = {model}
+        for relation in fingerprint[1]:
+            target = model
+            for field_name in relation.split("__"):
+                field = target.Meta.model_fields[field_name]
+                if field.is_multi and field.through is not None:
+                    models.add(field.through)
+                target = field.to
+                models.add(target)
+        for related_model in models:
+            self.watch(related_model)
+        tables = self._tables[fingerprint] = sorted(
+            {related_model.Meta.tablename for related_model in models},
+        )
+        return tables
+
+    async def get_or_load(  # noqa: PLR0913
+        self,
+        model: type[ormar.Model],
+        query: dict,
+        related: str | list[str] | None,
+        ttl: int,
+        load: Callable[[], Awaitable[Any]],
+        dump: Callable[[Any], Any],
+        restore: Callable[[Any], Any],
+        key_func: Callable[[dict], str] | None = None,
+    ) -> Any:
+        """
+        Return the cached value or load and cache it.
+
+        Args:
+        ----
+            model (type[ormar.Model]): The queried model.
+            query (dict): The query arguments identifying the entry.
+            related (str | list[str] | None): The selected relations.
+            ttl (int): The TTL of the Redis entry in seconds.
+            load (Callable[[], Awaitable[Any]]): Load the value from the database.
+            dump (Callable[[Any], Any]): Convert the value to JSON compatible data.
+            restore (Callable[[Any], Any]): Convert the cached data back to the value.
+            key_func (Callable[[dict], str], optional): Build the key of the query.
+                Defaults to a hash of the query.
+
+        Returns:
+        -------
+            Any: The value.
+        """
+        versions = await self._get_versions(self.get_tables(model, related))
+        query_key = (
+            key_func(query)
+            if key_func
+            else hashlib.sha1(  # noqa: S324
+                json.dumps(query, sort_keys=True, default=str).encode(),
+            ).hexdigest()
+        )
+        key = f"{self.key}:{model.Meta.tablename}:{query_key}:{'.'.join(versions)}"
+
+        data = self._local.get(key)
+        if data is not None:
+            return restore(data)
+        cached = await self.redis.get(key)
+        if cached is not None:
+            data = json.loads(cached)
+            self._local.set(key, data)
+            return restore(data)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            data = await asyncio.shield(inflight)
+            if data is not None:
+                return restore(data)
+            return await load()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await load()
+            data = dump(value)
+            await self.redis.set(key, json.dumps(data, default=str), ex=ttl)
+        except BaseException:
+            future.set_result(None)
+            raise
+        else:
+            self._local.set(key, data)
+            future.set_result(data)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get_versions(self, tables: list[str]) -> list[str]:
+        now = time.monotonic()
+        if self.subscribed:
+            versions = [self._versions.get(table) for table in tables]
+            if all(version and version[0] > now for version in versions):
+                return [version for _, version in versions]
+        invalidations = self._invalidations
+        values = await self.redis.mget(
+            [self.get_version_key(table) for table in tables],
+        )
+        versions = [self._decode(value) or "0" for value in values]
+        # an invalidation received during the read may be older than the read versions
+        if self.subscribed and invalidations == self._invalidations:
+            for table, version in zip(tables, versions):
+                self._versions[table] = (now + self.local_ttl, version)
+        return versions
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        try:
+            async for message in pubsub.listen():
+                self._invalidations += 1
+                self._versions.pop(self._decode(message["data"]), None)
+        except Exception:  # noqa: BLE001
+            logger.exception("Service cache invalidation listener failed")
+        finally:
+            # the versions cannot be trusted without the invalidations
+            self._versions.clear()
+
+    @staticmethod
+    def _decode(value: str | bytes | None) -> str | None:
+        return value.decode() if isinstance(value, bytes) else value
+
+
+service_cache = ServiceCache()
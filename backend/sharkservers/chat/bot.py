@@ -1,15 +1,16 @@
-import json
+from __future__ import annotations
 
-from broadcaster import Broadcast
-from fastapi.encoders import jsonable_encoder
-from fastapi_pagination import Params
+from typing import TYPE_CHECKING
 
-from sharkservers.chat.enums import WebsocketEventEnum
-from sharkservers.chat.schemas import ChatEventSchema
+from sharkservers.chat.rooms import GLOBAL_ROOM, get_room_channel
 from sharkservers.chat.services import ChatService
+from sharkservers.chat.websocket import create_message, encode_last_messages
 from sharkservers.forum.services import PostService, ThreadService
 from sharkservers.users.services import UserService
 
+if TYPE_CHECKING:
+    from broadcaster import Broadcast
+
 
 class Bot:
     broadcast: None | Broadcast
@@ -38,26 +39,13 @@ class Bot:
     def set_broadcast(self, broadcast: Broadcast):
         self.broadcast = broadcast
 
-    async def send_message(self, message: str):
-        new_message = await self.chat_service.create(
-            author=self.bot_user,
-            message=message,
-        )
-        new_message_schema = ChatEventSchema(
-            event=WebsocketEventEnum.GET_MESSAGE,
-            data=new_message,
-        )
-        messages = await self.chat_service.get_all(
-            params=Params(size=10),
-            related=["author", "author__display_role"],
-            order_by="-id",
-        )
-        messages_schema = ChatEventSchema(
-            event=WebsocketEventEnum.GET_MESSAGES,
-            data=messages,
-        )
-        # await websocket.send_json(jsonable_encoder(messages_schema))
+    async def send_message(self, message: str, room: str = GLOBAL_ROOM):
+        await create_message(self.chat_service, self.bot_user, message, room=room)
         await self.broadcast.publish(
-            channel="chat",
-            message=json.dumps(jsonable_encoder(messages_schema)),
+            channel=get_room_channel(room),
+            message=await encode_last_messages(
+                self.chat_service,
+                related=["author", "author__display_role"],
+                room=room,
+            ),
         )
@@ -4,9 +4,12 @@ from fastapi import Depends, WebSocketException, status
 from sharkservers.auth.dependencies import get_access_token_service
 from sharkservers.auth.services.jwt import JWTService
 from sharkservers.chat.bot import Bot
+from sharkservers.chat.rooms import GLOBAL_ROOM, can_join_room
 from sharkservers.chat.services import ChatService
 from sharkservers.forum.dependencies import get_posts_service, get_threads_service
 from sharkservers.forum.services import PostService, ThreadService
+from sharkservers.servers.dependencies import get_servers_service
+from sharkservers.servers.services import ServerService
 from sharkservers.users.dependencies import get_users_service
 from sharkservers.users.services import UserService
 
@@ -38,6 +41,16 @@ async def ws_get_current_user(
     return user
 
 
+async def ws_get_valid_room(
+    room: str = GLOBAL_ROOM,
+    author=Depends(ws_get_current_user),
+    servers_service: ServerService = Depends(get_servers_service),
+):
+    if not await can_join_room(room, author, servers_service):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    return room
+
+
 async def get_bot(
     users_service: UserService = Depends(get_users_service),
     threads_service: ThreadService = Depends(get_threads_service),
@@ -0,0 +1,310 @@
+"""
+Chat history.
+
+This module contains ChatHistory class which keeps the recent chat messages of every room
+in a capped Redis Stream and in a per-process ring buffer, so the history is served
+without SQL. The chats table stays the durable archive.
+"""
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import TYPE_CHECKING
+
+import orjson
+from fastapi_pagination import Params
+
+from sharkservers.chat.enums import WebsocketEventEnum
+from sharkservers.chat.rooms import GLOBAL_ROOM
+from sharkservers.chat.schemas import ChatOut
+from sharkservers.responses import dumps, get_encoder
+
+if TYPE_CHECKING:
+    from redis import asyncio as aioredis
+
+    from sharkservers.chat.models import Chat
+    from sharkservers.chat.services import ChatService
+
+
+class ChatHistory:
+    """
+    Recent chat messages stored in a Redis Stream per room and mirrored in ring buffers.
+
+    Every entry is a serialized ChatOut keyed by its stream ID, which clients use to resume
+    the history after a reconnect. The ring buffer of each process catches up with the
+    entries appended by the other processes on read. The number of messages of a room is
+    counted in Redis, seeded from the archive and reseeded when it expires. The history
+    stays disabled until `init` is called.
+
+    Attributes
+    ----------
+        redis (aioredis.Redis): Redis instance for the streams.
+        size (int): The number of messages kept in a ring buffer and sent as the history.
+        maxlen (int): The approximate maximum length of a stream.
+        total_ttl (int): The seconds before the message count of a room is reseeded.
+
+    Methods
+    -------
+        init: Enable the history.
+        close: Disable the history.
+        get_stream_key: Return the Redis key of the room stream.
+        append: Append a message to the history of its room.
+        get_recent: Get the most recent messages of a room.
+        get_since: Get the messages of a room appended after a stream ID.
+        get_total: Get the number of messages of a room.
+        encode_messages: Serialize the messages event.
+    """
+
+    key = "chat:stream"
+    total_key = "chat:total"
+    total_ttl = 3600
+
+    def __init__(self) -> None:
+        """Initialize the ChatHistory."""
+        self.redis: aioredis.Redis | None = None
+        self.size = 10
+        self.maxlen = 1000
+        self._buffers: dict[str, deque[tuple[str, dict]]] = {}
+        self._warmed: set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Return whether the history is enabled.
+
+        Returns
+        -------
+            bool: True if the history is enabled.
+        """
+        return self.redis is not None
+
+    def init(self, redis: aioredis.Redis, size: int = 10, maxlen: int = 1000) -> None:
+        """
+        Enable the history.
+
+        Args:
+        ----
+            redis (aioredis.Redis): Redis instance for the streams.
+            size (int, optional): The number of messages sent as the history. Defaults to 10.
+            maxlen (int, optional): The approximate maximum length of a stream. Defaults to 1000.
+        """
+        self.redis = redis
+        self.size = size
+        self.maxlen = maxlen
+        # only a seeded count is incremented, a missing one is counted in the archive
+        self._increment_total = redis.register_script(
+            'if redis.call("EXISTS", KEYS[1]) == 1 then '
+            'return redis.call("INCR", KEYS[1]) end return nil',
+        )
+        self._buffers.clear()
+        self._warmed.clear()
+
+    def close(self) -> None:
+        """Disable the history."""
+        self.redis = None
+        self._buffers.clear()
+        self._warmed.clear()
+
+    def get_stream_key(self, room: str) -> str:
+        """
+        Return the Redis key of the room stream.
+
+        Args:
+        ----
+            room (str): The room.
+
+        Returns:
+        -------
+            str: The Redis key.
+        """
+        return f"{self.key}:{room}"
+
+    async def append(self, message: Chat) -> str:
+        """
+        Append a message to the history of its room.
+
+        Args:
+        ----
+            message (Chat): The message saved in the database, loaded with its author.
+
+        Returns:
+        -------
+            str: The stream ID of the message.
+        """
+        stream_id = await self._add(message)
+        await self._increment_total(keys=[f"{self.total_key}:{message.room}"])
+        await self._refresh(message.room)
+        return stream_id
+
+    async def get_recent(
+        self,
+        room: str = GLOBAL_ROOM,
+        chat_service: ChatService | None = None,
+    ) -> list[tuple[str, dict]]:
+        """
+        Get the most recent messages of a room, oldest first.
+
+        Args:
+        ----
+            room (str, optional): The room. Defaults to the global room.
+            chat_service (ChatService, optional): The chat service used to backfill an empty stream
+                from the archive once per process. Defaults to None.
+
+        Returns:
+        -------
+            list[tuple[str, dict]]: The stream IDs with the messages.
+        """
+        buffer = await self._refresh(room)
+        if not buffer and chat_service is not None and room not in self._warmed:
+            self._warmed.add(room)
+            await self._backfill(room, chat_service)
+        return list(buffer)
+
+    async def get_since(
+        self,
+        last_id: str,
+        room: str = GLOBAL_ROOM,
+    ) -> list[tuple[str, dict]] | None:
+        """
+        Get the messages of a room appended after a stream ID, oldest first.
+
+        Args:
+        ----
+            last_id (str): The stream ID of the last message received by the client.
+            room (str, optional): The room. Defaults to the global room.
+
+        Returns:
+        -------
+            list[tuple[str, dict]] | None: The stream IDs with the messages or None if the
+                stream no longer holds the given ID or the ID is invalid.
+        """
+        try:
+            since = self._parse_id(last_id)
+        except ValueError:
+            return None
+        stream_key = self.get_stream_key(room)
+        first = await self.redis.xrange(stream_key, count=1)
+        if not first or self._parse_id(self._decode(first[0][0])) > since:
+            return None
+        entries = await self.redis.xrange(
+            stream_key,
+            min=f"({last_id}",
+            count=self.maxlen,
+        )
+        return [self._parse_entry(entry) for entry in entries]
+
+    async def get_total(
+        self,
+        room: str = GLOBAL_ROOM,
+        chat_service: ChatService | None = None,
+    ) -> int | None:
+        """
+        Get the number of messages of a room.
+
+        Args:
+        ----
+            room (str, optional): The room. Defaults to the global room.
+            chat_service (ChatService, optional): The chat service used to count the archived
+                messages when the count is not seeded. Defaults to None.
+
+        Returns:
+        -------
+            int | None: The number of messages or None if it is not seeded and there is no
+                chat service.
+        """
+        total_key = f"{self.total_key}:{room}"
+        total = await self.redis.get(total_key)
+        if total is None:
+            if chat_service is None:
+                return None
+            total = await chat_service.Meta.model.objects.filter(room=room).count()
+            await self.redis.set(total_key, total, nx=True, ex=self.total_ttl)
+        return int(total)
+
+    def encode_messages(
+        self,
+        entries: list[tuple[str, dict]],
+        total: int | None = None,
+    ) -> str:
+        """
+        Serialize the messages event, newest message first.
+
+        The page has the same fields as the paginated messages of the database, the stream
+        ID of the newest message is sent next to it as `last_id`.
+
+        Args:
+        ----
+            entries (list[tuple[str, dict]]): The stream IDs with the messages, oldest first.
+            total (int, optional): The number of messages of the room. Defaults to the
+                number of entries.
+
+        Returns:
+        -------
+            str: The serialized event.
+        """
+        items = [data for _, data in reversed(entries)]
+        total = len(items) if total is None else max(total, len(items))
+        return dumps(
+            {
+                "event": WebsocketEventEnum.GET_MESSAGES,
+                "data": {
+                    "items": items,
+                    "total": total,
+                    "page": 1,
+                    "size": self.size,
+                    "pages": math.ceil(total / self.size),
+                },
+                "last_id": entries[-1][0] if entries else None,
+            },
+        ).decode()
+
+    async def _refresh(self, room: str) -> deque[tuple[str, dict]]:
+        stream_key = self.get_stream_key(room)
+        buffer = self._buffers.get(room)
+        if buffer is None:
+            buffer = self._buffers[room] = deque(maxlen=self.size)
+        if buffer:
+            entries = await self.redis.xrange(stream_key, min=f"({buffer[-1][0]}")
+        else:
+            entries = (await self.redis.xrevrange(stream_key, count=self.size))[::-1]
+        buffer.extend(self._parse_entry(entry) for entry in entries)
+        return buffer
+
+    async def _backfill(self, room: str, chat_service: ChatService) -> None:
+        messages = await chat_service.get_all(
+            params=Params(size=self.size),
+            related=["author", "author__display_role"],
+            order_by="-created_at",
+            room=room,
+        )
+        # the archived messages are already counted
+        for message in reversed(messages.items):
+            await self._add(message)
+        await self._refresh(room)
+
+    async def _add(self, message: Chat) -> str:
+        return self._decode(
+            await self.redis.xadd(
+                self.get_stream_key(message.room),
+                {"data": get_encoder(ChatOut).dumps(message)},
+                maxlen=self.maxlen,
+                approximate=True,
+            ),
+        )
+
+    def _parse_entry(self, entry: tuple) -> tuple[str, dict]:
+        stream_id, fields = entry
+        data = fields.get("data", fields.get(b"data"))
+        return self._decode(stream_id), orjson.loads(data)
+
+    @staticmethod
+    def _parse_id(stream_id: str) -> tuple[int, int]:
+        milliseconds, _, sequence = stream_id.partition("-")
+        return int(milliseconds), int(sequence or 0)
+
+    @staticmethod
+    def _decode(value: str | bytes) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+
+chat_history = ChatHistory()
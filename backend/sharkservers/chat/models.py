@@ -1,8 +1,8 @@
 # chat models
-import uuid
 import ormar
 
-from sharkservers.db import BaseMeta, DateFieldsMixins
+from sharkservers.chat.rooms import GLOBAL_ROOM
+from sharkservers.db import BaseMeta, DateFieldsMixins, uuid7
 from sharkservers.users.models import User
 
 
@@ -10,6 +10,7 @@ class Chat(ormar.Model, DateFieldsMixins):
     class Meta(BaseMeta):
         tablename = "chats"
 
-    id: str = ormar.UUID(primary_key=True, default=uuid.uuid4)
+    id: str = ormar.UUID(primary_key=True, default=uuid7)
     author: User = ormar.ForeignKey(User)
     message: str = ormar.String(max_length=500)
+    room: str = ormar.String(max_length=64, default=GLOBAL_ROOM, index=True)
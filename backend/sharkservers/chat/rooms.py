@@ -0,0 +1,112 @@
+"""
+Chat rooms.
+
+A room is the global room, the staff room or a server room named by the public server ID,
+e.g. `server_1Xv5…`. Every room has its own broadcast channel and history stream, so a
+message is only fanned out to the members of its room. A server room is open to the staff
+and to the admins of that server, i.e. the users holding its admin role.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from fastapi import HTTPException
+from uuidbase62.types import to_uuidbase62
+
+if TYPE_CHECKING:
+    from sharkservers.servers.models import Server
+    from sharkservers.servers.services import ServerService
+    from sharkservers.users.models import User
+
+GLOBAL_ROOM = "global"
+STAFF_ROOM = "staff"
+SERVER_ROOM_PREFIX = "server"
+
+
+def get_room_channel(room: str) -> str:
+    """
+    Return the broadcast channel of a room.
+
+    Args:
+    ----
+        room (str): The room.
+
+    Returns:
+    -------
+        str: The channel name.
+    """
+    return f"chat:{room}"
+
+
+def is_staff(user: User | None) -> bool:
+    """
+    Return whether the user has a staff role.
+
+    Args:
+    ----
+        user (User | None): The user loaded with its roles.
+
+    Returns:
+    -------
+        bool: True if any role of the user is a staff role.
+    """
+    return user is not None and any(role.is_staff for role in user.roles or [])
+
+
+async def can_join_room(
+    room: str,
+    user: User | None,
+    servers_service: ServerService,
+) -> bool:
+    """
+    Check whether the user can join the room.
+
+    Everyone can read the global room, only staff can join the staff room and a server
+    room is limited to the staff and the holders of the server admin role.
+
+    Args:
+    ----
+        room (str): The room.
+        user (User | None): The user loaded with its roles or None for anonymous clients.
+        servers_service (ServerService): The server service used to check the server rooms.
+
+    Returns:
+    -------
+        bool: True if the room exists and the user can join it.
+    """
+    if room == GLOBAL_ROOM:
+        return True
+    if room == STAFF_ROOM:
+        return is_staff(user)
+    if user is None:
+        return False
+    server = await get_room_server(room, servers_service)
+    if server is None:
+        return False
+    return is_staff(user) or (
+        server.admin_role is not None
+        and any(role.id == server.admin_role.id for role in user.roles or [])
+    )
+
+
+async def get_room_server(room: str, servers_service: ServerService) -> Server | None:
+    """
+    Return the server of a server room.
+
+    Args:
+    ----
+        room (str): The room.
+        servers_service (ServerService): The server service.
+
+    Returns:
+    -------
+        Server | None: The server or None if the room is not an existing server room.
+    """
+    try:
+        server_id = to_uuidbase62(room, SERVER_ROOM_PREFIX)
+    except ValueError:
+        return None
+    try:
+        return await servers_service.get_one(id=server_id.uuid)
+    except HTTPException:
+        return None
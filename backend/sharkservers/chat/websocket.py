@@ -1,21 +1,79 @@
-import json
-
-from fastapi.encoders import jsonable_encoder
 from fastapi_pagination import Params
+from starlette import status
 from starlette.websockets import WebSocket
 
 from sharkservers.chat.enums import WebsocketEventEnum
+from sharkservers.chat.history import chat_history
+from sharkservers.chat.models import Chat
+from sharkservers.chat.rooms import GLOBAL_ROOM, get_room_channel
 from sharkservers.chat.schemas import ChatEventSchema
 from sharkservers.chat.services import ChatService
+from sharkservers.hub import SubscriptionClosedError
 from sharkservers.logger import logger
+from sharkservers.responses import get_encoder
 from sharkservers.users.models import User
-from sharkservers.utils import broadcast
+from sharkservers.utils import broadcast, hub
+
+
+CHAT_MESSAGES_RELATED = [
+    "author",
+    "author__display_role",
+    "author__player",
+    "author__player__steamrep_profile",
+]
+
+
+async def create_message(
+    chat_service: ChatService,
+    author: User,
+    message: str,
+    room: str = GLOBAL_ROOM,
+) -> Chat:
+    """Archive the message in the database and append it to the room history."""
+    new_message = await chat_service.create(author=author, message=message, room=room)
+    if chat_history.enabled:
+        await chat_history.append(new_message)
+    return new_message
+
+
+async def encode_last_messages(
+    chat_service: ChatService,
+    related: list[str] = CHAT_MESSAGES_RELATED,
+    last_id: str | None = None,
+    room: str = GLOBAL_ROOM,
+) -> str:
+    """
+    Serialize the last messages event of a room once for all its connections.
+
+    With the history enabled the messages come from the ring buffer, or from the stream
+    after `last_id` when a client resumes, without querying the database.
+    """
+    if chat_history.enabled:
+        entries = await chat_history.get_since(last_id, room) if last_id else None
+        if entries is None:
+            entries = await chat_history.get_recent(room, chat_service)
+        return chat_history.encode_messages(
+            entries,
+            total=await chat_history.get_total(room, chat_service),
+        )
+    messages = await chat_service.get_all(
+        params=Params(size=10),
+        related=related,
+        order_by="-id",
+        room=room,
+    )
+    return (
+        get_encoder(ChatEventSchema)
+        .dumps({"event": WebsocketEventEnum.GET_MESSAGES, "data": messages})
+        .decode()
+    )
 
 
 async def chatroom_ws_receiver(
     websocket,
     chat_service: ChatService,
     author: User | None = None,
+    room: str = GLOBAL_ROOM,
 ):
     async for message in websocket.iter_json():
         message_event = message.get("event", None)
@@ -24,59 +82,32 @@ async def chatroom_ws_receiver(
             if message_data is None:
                 return
 
-            new_message = await chat_service.create(author=author, message=message_data)
-            logger.info(new_message)
-            new_message_schema = ChatEventSchema(
-                event=WebsocketEventEnum.GET_MESSAGE,
-                data=new_message,
-            )
-            messages = await chat_service.get_all(
-                params=Params(size=10),
-                related=[
-                    "author",
-                    "author__display_role",
-                    "author__player",
-                    "author__player__steamrep_profile",
-                ],
-                order_by="-id",
+            new_message = await create_message(
+                chat_service,
+                author,
+                message_data,
+                room=room,
             )
-            messages_schema = ChatEventSchema(
-                event=WebsocketEventEnum.GET_MESSAGES,
-                data=messages,
-            )
-            # await websocket.send_json(jsonable_encoder(messages_schema))
+            logger.info(new_message)
             await broadcast.publish(
-                channel="chat",
-                message=json.dumps(jsonable_encoder(messages_schema)),
+                channel=get_room_channel(room),
+                message=await encode_last_messages(chat_service, room=room),
+            )
+        elif message_event == WebsocketEventEnum.GET_MESSAGES:
+            await websocket.send_text(
+                await encode_last_messages(
+                    chat_service,
+                    last_id=message.get("last_id", None),
+                    room=room,
+                ),
             )
-
-        await broadcast.publish(channel="chat", message=json.dumps(message))
 
 
-async def chatroom_ws_sender(
-    websocket: WebSocket,
-    chat_service: ChatService,
-    author: User = None,
-):
-    async with broadcast.subscribe(channel="chat") as subscriber:
-        async for event in subscriber:
-            message = json.loads(event.message)
-            message_event = message.get("event", None)
-            message_data = message.get("data", None)
-            logger.info(message_event)
-            if message_event == WebsocketEventEnum.GET_MESSAGES:
-                messages = await chat_service.get_all(
-                    params=Params(size=10),
-                    related=[
-                        "author",
-                        "author__display_role",
-                        "author__player",
-                        "author__player__steamrep_profile",
-                    ],
-                    order_by="-id",
-                )
-                messages_schema = ChatEventSchema(
-                    event=WebsocketEventEnum.GET_MESSAGES,
-                    data=messages,
-                )
-                await websocket.send_json(jsonable_encoder(messages_schema))
+async def chatroom_ws_sender(websocket: WebSocket, room: str = GLOBAL_ROOM):
+    async with hub.subscribe(channel=get_room_channel(room)) as queue:
+        try:
+            while True:
+                message = await queue.get()
+                await websocket.send_text(message.text)
+        except SubscriptionClosedError:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
@@ -0,0 +1,405 @@
+"""
+Command line interface of the SharkServers API.
+
+Commands:
+- importtime: Report the import time of a module, like `python -X importtime`.
+- generate-data: Generate a synthetic dataset in the database, see `sharkservers.generator`.
+
+Usage:
+    python -m sharkservers.cli importtime --module sharkservers.main --limit 20 --budget 4
+    python -m sharkservers.cli generate-data --users 100000 --threads 1000000 \
+        --posts 10000000 --likes 20000000 --chats 1000000 --seed 1 --reset
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import os
+import re
+import subprocess
+import sys
+import time
+
+# third-party modules imported on first use, loading them at startup is a regression
+LAZY_MODULES = (
+    "stripe",
+    "steam",
+    "PIL",
+    "resend",
+    "fastapi_mail",
+    "asyncio_redis",
+)
+DATASET_OPTIONS = (
+    "users",
+    "categories",
+    "threads",
+    "posts",
+    "likes",
+    "chats",
+    "seed",
+    "user_skew",
+    "hot_threads",
+    "hot_posts",
+    "like_skew",
+    "days",
+    "until",
+    "prefix",
+    "password",
+    "batch_size",
+)
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+IMPORT_CODE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+class ImportTime:
+    """
+    Import time of a module, as reported by `python -X importtime`.
+
+    Attributes
+    ----------
+        name (str): The module.
+        self_time (float): Seconds spent in the module itself.
+        cumulative_time (float): Seconds spent in the module and the modules it imported.
+        depth (int): The nesting level of the import.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        self_time: float,
+        cumulative_time: float,
+        depth: int,
+    ) -> None:
+        """Initialize the ImportTime."""
+        self.name = name
+        self.self_time = self_time
+        self.cumulative_time = cumulative_time
+        self.depth = depth
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """
+    Parse the output of `python -X importtime`.
+
+    Args:
+    ----
+        output (str): The standard error of the process.
+
+    Returns:
+    -------
+        list[ImportTime]: The import times, in the order the imports finished.
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append(
+                ImportTime(
+                    name,
+                    int(self_us) / 1_000_000,
+                    int(cumulative_us) / 1_000_000,
+                    len(indent) // 2,
+                ),
+            )
+    return imports
+
+
+class ImportReport:
+    """
+    Import time report of a module imported in a fresh interpreter.
+
+    Attributes
+    ----------
+        module (str): The imported module.
+        total (float): Wall-clock seconds of the import.
+        imports (list[ImportTime]): The import times of the module and its dependencies.
+    """
+
+    def __init__(self, module: str, total: float, imports: list[ImportTime]) -> None:
+        """Initialize the ImportReport."""
+        self.module = module
+        self.total = total
+        self.imports = imports
+
+    @property
+    def modules(self) -> set[str]:
+        """Return the names of the imported modules."""
+        return {item.name for item in self.imports}
+
+    def get_eager_modules(
+        self,
+        lazy_modules: tuple[str, ...] = LAZY_MODULES,
+    ) -> list[str]:
+        """
+        Get the modules meant to be imported on first use which were imported.
+
+        Args:
+        ----
+            lazy_modules (tuple[str, ...]): The top-level modules imported on first use.
+
+        Returns:
+        -------
+            list[str]: The imported ones.
+        """
+        modules = self.modules
+        return [name for name in lazy_modules if name in modules]
+
+    def get_slowest(self, limit: int, *, by_self: bool = False) -> list[ImportTime]:
+        """
+        Get the slowest imports.
+
+        Args:
+        ----
+            limit (int): The number of imports.
+            by_self (bool): Whether to sort by the self time instead of the cumulative time.
+
+        Returns:
+        -------
+            list[ImportTime]: The slowest imports, slowest first.
+        """
+        return sorted(
+            self.imports,
+            key=lambda item: item.self_time if by_self else item.cumulative_time,
+            reverse=True,
+        )[:limit]
+
+    def render(self, limit: int, *, by_self: bool = False) -> str:
+        """
+        Render the report as a table.
+
+        Args:
+        ----
+            limit (int): The number of imports listed.
+            by_self (bool): Whether to sort by the self time instead of the cumulative time.
+
+        Returns:
+        -------
+            str: The report.
+        """
+        lines = [
+            f"{self.module} imported in {self.total:.3f} s "
+            f"({len(self.imports)} modules)",
+            f"{'cumulative':>12} {'self':>10}  module",
+        ]
+        lines.extend(
+            f"{item.cumulative_time * 1000:9.1f} ms {item.self_time * 1000:7.1f} ms  "
+            f"{'  ' * item.depth}{item.name}"
+            for item in self.get_slowest(limit, by_self=by_self)
+        )
+        eager = self.get_eager_modules()
+        if eager:
+            lines.append(
+                f"Imported at startup instead of on first use: {', '.join(eager)}",
+            )
+        return "\n".join(lines)
+
+
+def measure_import(module: str) -> ImportReport:
+    """
+    Import a module in a fresh interpreter and measure it.
+
+    The interpreter inherits the environment, so the settings of the application apply.
+
+    Args:
+    ----
+        module (str): The module, e.g. `sharkservers.main`.
+
+    Returns:
+    -------
+        ImportReport: The report.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_CODE.format(module=module)],  # noqa: S603
+        capture_output=True,
+        text=True,
+        check=True,
+        env=os.environ.copy(),
+    )
+    total = float(process.stdout.strip().splitlines()[-1])
+    return ImportReport(module, total, parse_importtime(process.stderr))
+
+
+def importtime(args: argparse.Namespace) -> int:
+    """
+    Print the import time report of a module.
+
+    Args:
+    ----
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+    -------
+        int: 1 when the import exceeds the budget or imports a lazy module, else 0.
+    """
+    report = measure_import(args.module)
+    print(report.render(args.limit, by_self=args.self_time))  # noqa: T201
+    if args.budget is not None and report.total > args.budget:
+        print(f"Over the budget of {args.budget:.3f} s")  # noqa: T201
+        return 1
+    return 1 if report.get_eager_modules() else 0
+
+
+async def _generate_dataset(args: argparse.Namespace) -> dict[str, int]:
+    """Reset the database if asked, then connect to it and generate the dataset."""
+    from sharkservers.db import database
+    from sharkservers.generator import (
+        DatasetOptions,
+        generate_dataset,
+        get_sync_engine,
+        reset_database,
+    )
+
+    if args.reset:
+        engine = get_sync_engine()
+        reset_database(engine)
+        engine.dispose()
+    # the options left out keep the defaults of DatasetOptions
+    options = DatasetOptions(
+        **{
+            name: getattr(args, name)
+            for name in DATASET_OPTIONS
+            if getattr(args, name) is not None
+        },
+    )
+    await database.connect()
+    try:
+        return await generate_dataset(options)
+    finally:
+        await database.disconnect()
+
+
+def generate_data(args: argparse.Namespace) -> int:
+    """
+    Generate a synthetic dataset and print the number of rows per table.
+
+    Args:
+    ----
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+    -------
+        int: The exit code, 0.
+    """
+    start = time.perf_counter()
+    counts = asyncio.run(_generate_dataset(args))
+    duration = time.perf_counter() - start
+    for table, count in counts.items():
+        print(f"{count:>12} {table}")  # noqa: T201
+    total = sum(counts.values())
+    print(f"{total:>12} rows in {duration:.1f} s ({total / duration:.0f} rows/s)")  # noqa: T201
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Create the parser of the command line arguments.
+
+    Returns
+    -------
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="sharkservers",
+        description=__doc__.splitlines()[1],
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importtime_parser = commands.add_parser(
+        "importtime",
+        help="Report the import time of a module.",
+    )
+    importtime_parser.add_argument("--module", default="sharkservers.main")
+    importtime_parser.add_argument("--limit", type=int, default=25)
+    importtime_parser.add_argument(
+        "--self",
+        dest="self_time",
+        action="store_true",
+        help="Sort by the time spent in the module itself.",
+    )
+    importtime_parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Fail when the import takes longer, in seconds.",
+    )
+    importtime_parser.set_defaults(handler=importtime)
+
+    generate_parser = commands.add_parser(
+        "generate-data",
+        help="Generate a synthetic dataset in the database.",
+        description="The options left out take the defaults of "
+        "sharkservers.generator.DatasetOptions.",
+    )
+    generate_parser.add_argument("--users", type=int)
+    generate_parser.add_argument("--categories", type=int)
+    generate_parser.add_argument("--threads", type=int)
+    generate_parser.add_argument("--posts", type=int)
+    generate_parser.add_argument("--likes", type=int)
+    generate_parser.add_argument("--chats", type=int)
+    generate_parser.add_argument("--seed", type=int)
+    generate_parser.add_argument(
+        "--user-skew",
+        type=float,
+        help="The exponent of the power law of the authors, 0 for uniform.",
+    )
+    generate_parser.add_argument(
+        "--hot-threads",
+        type=float,
+        help="The share of the threads which are hot.",
+    )
+    generate_parser.add_argument(
+        "--hot-posts",
+        type=float,
+        help="The share of the posts written in the hot threads.",
+    )
+    generate_parser.add_argument(
+        "--like-skew",
+        type=float,
+        help="The exponent of the power law of the likes, 0 for uniform.",
+    )
+    generate_parser.add_argument("--days", type=int)
+    generate_parser.add_argument(
+        "--until",
+        type=datetime.datetime.fromisoformat,
+        help="The creation time of the newest rows, e.g. 2024-01-01, today by default.",
+    )
+    generate_parser.add_argument(
+        "--prefix",
+        help="The prefix of the usernames and category names.",
+    )
+    generate_parser.add_argument("--password")
+    generate_parser.add_argument("--batch-size", type=int)
+    generate_parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Drop and create the tables first.",
+    )
+    generate_parser.set_defaults(handler=generate_data)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Run a command.
+
+    Args:
+    ----
+        argv (list[str] | None): The command line arguments, `sys.argv` by default.
+
+    Returns:
+    -------
+        int: The exit code.
+    """
+    args = get_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
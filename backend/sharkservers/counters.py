@@ -0,0 +1,240 @@
+"""
+Module contains the reconciliation of denormalized counter columns.
+
+It includes the following classes and functions:
+- CounterSpec: Describes a counter column and the grouped query which recomputes it.
+- CounterReconciler: Recomputes counters with set-based statements and reports the drift.
+- increment_counters: Atomically adds deltas to the counters of a single row.
+- counter_batch: Merges the increments issued within a block into one statement per row.
+"""
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+import ormar
+import sqlalchemy
+
+from sharkservers.cache import service_cache
+from sharkservers.db import database
+from sharkservers.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+_counter_batch: ContextVar[dict | None] = ContextVar("counter_batch", default=None)
+
+
+class CounterSpec:
+    """
+    Denormalized counter column and the grouped query which recomputes it.
+
+    Attributes
+    ----------
+        name (str): The name of the counter used in the drift report.
+        table (sqlalchemy.Table): The table holding the counter.
+        column (str): The name of the counter column.
+        source (sqlalchemy.Select): The `SELECT key, value ... GROUP BY key` statement
+            with the expected counter value per primary key.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: sqlalchemy.Table,
+        column: str,
+        source: sqlalchemy.sql.Select,
+    ) -> None:
+        """
+        Initialize the counter spec.
+
+        Args:
+        ----
+            name (str): The name of the counter used in the drift report.
+            table (sqlalchemy.Table): The table holding the counter.
+            column (str): The name of the counter column.
+            source (sqlalchemy.Select): The grouped statement labelling its columns `key` and `value`.
+        """
+        self.name = name
+        self.table = table
+        self.column = column
+        self.source = source
+
+    def get_drifted(self) -> sqlalchemy.sql.Subquery:
+        """
+        Return the rows whose stored counter differs from the recomputed one.
+
+        Rows missing from the grouped source are expected to hold 0.
+
+        Returns
+        -------
+            sqlalchemy.Subquery: The `key, value` subquery of drifted rows.
+        """
+        counts = self.source.subquery()
+        target = self.table.alias()
+        value = sqlalchemy.func.coalesce(counts.c.value, 0)
+        pk = next(iter(target.primary_key))
+        return (
+            sqlalchemy.select(pk.label("key"), value.label("value"))
+            .select_from(target.outerjoin(counts, pk == counts.c.key))
+            .where(target.c[self.column] != value)
+            .subquery()
+        )
+
+
+class CounterReconciler:
+    """Recompute denormalized counters with a few grouped statements per counter."""
+
+    def __init__(self, counters: list[CounterSpec]) -> None:
+        """
+        Initialize the reconciler.
+
+        Args:
+        ----
+            counters (list[CounterSpec]): The counters to reconcile.
+        """
+        self.counters = counters
+
+    async def reconcile(self) -> dict[str, int]:
+        """
+        Reconcile all counters.
+
+        Returns
+        -------
+            dict[str, int]: The number of drifted rows per counter name.
+        """
+        report = {}
+        for counter in self.counters:
+            report[counter.name] = await self.reconcile_counter(counter)
+            logger.info(
+                f"Reconciled counter {counter.name} -> {report[counter.name]} drifted",
+            )
+        return report
+
+    async def reconcile_counter(self, counter: CounterSpec) -> int:
+        """
+        Reconcile a single counter.
+
+        The drift is counted and fixed within one transaction, PostgreSQL uses
+        `UPDATE ... FROM (SELECT ... GROUP BY)` while SQLite falls back to a correlated
+        subquery because SQLAlchemy cannot compile multi-table updates for it.
+
+        Args:
+        ----
+            counter (CounterSpec): The counter to reconcile.
+
+        Returns:
+        -------
+            int: The number of drifted rows.
+        """
+        drifted = counter.get_drifted()
+        table = counter.table
+        pk = next(iter(table.primary_key))
+        async with database.transaction():
+            drift_count = await database.fetch_val(
+                sqlalchemy.select(sqlalchemy.func.count()).select_from(drifted),
+            )
+            if not drift_count:
+                return 0
+            if database.url.dialect == "sqlite":
+                query = (
+                    table.update()
+                    .values(
+                        {
+                            counter.column: sqlalchemy.select(drifted.c.value)
+                            .where(drifted.c.key == pk)
+                            .scalar_subquery(),
+                        },
+                    )
+                    .where(pk.in_(sqlalchemy.select(drifted.c.key)))
+                )
+            else:
+                query = (
+                    table.update()
+                    .values({counter.column: drifted.c.value})
+                    .where(pk == drifted.c.key)
+                )
+            await database.execute(query)
+        await service_cache.invalidate(table.name)
+        return drift_count
+
+
+def _get_increment_query(
+    table: sqlalchemy.Table,
+    pk_value,  # noqa: ANN001
+    deltas: dict[str, int],
+) -> sqlalchemy.sql.Update:
+    pk = next(iter(table.primary_key))
+    values = {}
+    for column, delta in deltas.items():
+        new_value = table.c[column] + delta
+        values[column] = sqlalchemy.case((new_value < 0, 0), else_=new_value)
+    return table.update().values(values).where(pk == pk_value)
+
+
+async def increment_counters(instance: ormar.Model, **deltas: int) -> None:
+    """
+    Atomically add deltas to the counters of a single row.
+
+    Issues `UPDATE ... SET col = col + :delta` (floored at 0) instead of a read-modify-write,
+    so concurrent writers never lose increments. The deltas are mirrored on the instance
+    when it is loaded. Inside `counter_batch` the increments are collected and flushed
+    once the block succeeds.
+
+    Args:
+    ----
+        instance (ormar.Model): The instance holding the counters.
+        **deltas (int): The deltas per counter column.
+    """
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if not instance.__pk_only__:
+        for column, delta in deltas.items():
+            value = getattr(instance, column)
+            if value is not None:
+                setattr(instance, column, max(value + delta, 0))
+    batch = _counter_batch.get()
+    if batch is not None:
+        row = batch.setdefault((instance.Meta.table, instance.pk), {})
+        for column, delta in deltas.items():
+            row[column] = row.get(column, 0) + delta
+        return
+    await database.execute(
+        _get_increment_query(instance.Meta.table, instance.pk, deltas),
+    )
+    await service_cache.invalidate(instance.Meta.tablename)
+
+
+@asynccontextmanager
+async def counter_batch() -> AsyncIterator[None]:
+    """
+    Merge the counter increments issued within the block into one statement per row.
+
+    The block runs in a transaction, the increments are flushed at its end, so they are
+    committed together with the writes they count, or rolled back with them when the
+    block raises. Nested blocks join the outermost batch.
+
+    Yields
+    ------
+        None
+    """
+    if _counter_batch.get() is not None:
+        yield
+        return
+    batch = {}
+    token = _counter_batch.set(batch)
+    try:
+        async with database.transaction():
+            yield
+            for (table, pk_value), deltas in batch.items():
+                deltas = {column: delta for column, delta in deltas.items() if delta}  # noqa: PLW2901
+                if deltas:
+                    await database.execute(
+                        _get_increment_query(table, pk_value, deltas),
+                    )
+    finally:
+        _counter_batch.reset(token)
+    for table in {table for table, _ in batch}:
+        await service_cache.invalidate(table.name)
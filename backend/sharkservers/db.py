@@ -3,9 +3,19 @@ Module contains database-related functionality for the SharkServers API.
 
 It defines the database connection, models, and base service class.
 """
+from __future__ import annotations
 
+import base64
+import binascii
 import datetime
+import enum
+import json
+import os
+import threading
+import time
+import uuid
 from sqlite3 import IntegrityError as SQLIntegrityError
+from typing import TYPE_CHECKING
 
 import databases
 import ormar
@@ -14,21 +24,95 @@ from asyncpg import UniqueViolationError
 from fakeredis import aioredis as fake_aioredis
 from fastapi import HTTPException
 from fastapi_pagination import Params
+from fastapi_pagination.api import create_page
 from fastapi_pagination.ext.ormar import paginate
+from ormar.queryset.clause import FilterGroup
 from psycopg2 import IntegrityError
+from pydantic import parse_obj_as
 from redis import asyncio as aioredis
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from starlette.requests import Request
 
 from sharkservers.auth.utils import now_datetime
+from sharkservers.cache import service_cache
+from sharkservers.instrumentation import instrument_database
+from sharkservers.metrics import instrument_redis
+from sharkservers.schemas import CursorPage, CursorParams
 from sharkservers.settings import get_settings
 
+if TYPE_CHECKING:
+    import random
+    from collections.abc import Callable
+
 settings = get_settings()
 
 DATABASE_URL = settings.get_database_url()
 REDIS_URL = settings.get_redis_url()
-database = databases.Database(DATABASE_URL)
+database = instrument_database(databases.Database(DATABASE_URL))
 metadata = sqlalchemy.MetaData()
 
+# the bind parameter limits of a single statement
+SQLITE_MAX_PARAMS = 999
+POSTGRES_MAX_PARAMS = 32767
+
+_uuid7_lock = threading.Lock()
+_uuid7_last: tuple[int, int] = (0, 0)
+
+
+def uuid7(
+    timestamp_ms: int | None = None,
+    rng: random.Random | None = None,
+) -> uuid.UUID:
+    """
+    Generate a time-ordered UUID version 7 (RFC 9562).
+
+    The first 48 bits hold the Unix time in milliseconds, so the new keys are appended at
+    the end of the primary key index and sorting by the key sorts by creation time.
+    The 12 bits after the version are a counter, which keeps the keys generated within the
+    same millisecond monotonic.
+
+    Args:
+    ----
+        timestamp_ms (int, optional): The Unix time in milliseconds. Defaults to now.
+        rng (random.Random, optional): The generator of the random bits of the keys
+            generated for a given time, e.g. to generate reproducible data. Defaults to
+            `os.urandom`.
+
+    Returns:
+    -------
+        uuid.UUID: The generated UUID.
+    """
+    global _uuid7_last  # noqa: PLW0603
+    if timestamp_ms is None:
+        with _uuid7_lock:
+            timestamp_ms = time.time_ns() // 1_000_000
+            last_ms, counter = _uuid7_last
+            if timestamp_ms <= last_ms:
+                timestamp_ms, counter = last_ms, counter + 1
+                if counter > 0xFFF:  # noqa: PLR2004
+                    timestamp_ms, counter = last_ms + 1, 0
+            else:
+                counter = int.from_bytes(os.urandom(2)) & 0x7FF
+            _uuid7_last = (timestamp_ms, counter)
+    elif rng is not None:
+        counter = rng.getrandbits(12)
+    else:
+        counter = int.from_bytes(os.urandom(2)) & 0xFFF
+    rand_b = (
+        rng.getrandbits(62)
+        if rng is not None
+        else int.from_bytes(os.urandom(8)) & 0x3FFFFFFFFFFFFFFF
+    )
+    value = (
+        (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
 
 async def create_redis_pool() -> aioredis.Redis:
     """
@@ -38,9 +122,11 @@ async def create_redis_pool() -> aioredis.Redis:
     -------
         aioredis.Redis: The Redis connection pool.
     """
-    if settings.TESTING:
-        return await fake_aioredis.FakeRedis()
-    return aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    if settings.TESTING or settings.FAKE_REDIS:
+        return instrument_redis(await fake_aioredis.FakeRedis())
+    return instrument_redis(
+        aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True),
+    )
 
 
 async def get_redis(request: Request) -> aioredis.Redis:
@@ -83,13 +169,28 @@ class DateFieldsMixins:
 
 
 class BaseService:
-    """Base service class for ormar models."""
+    """
+    Base service class for ormar models.
+
+    A service opts into the read-through cache of `get_one` and paginated `get_all` by
+    declaring `cache_ttl` (seconds) in its Meta. `cache_key` optionally replaces the hash
+    of the query arguments in the key, the versions of the tables of the model and of
+    the selected relations are always part of it, see `ServiceCache`.
+    """
 
     class Meta:
         """Meta class for the BaseService class."""
 
         model: ormar.Model = None
         not_found_exception: HTTPException = None
+        cache_ttl: int | None = None
+        cache_key: Callable[[dict], str] | None = None
+
+    def __init_subclass__(cls, **kwargs) -> None:  # noqa: ANN003
+        """Watch the models read by the cached queries of the service."""
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.Meta, "cache_ttl", None) is not None:
+            service_cache.watch_related(cls.Meta.model)
 
     async def get_one(self, **kwargs) -> ormar.Model:  # noqa: ANN003
         """
@@ -107,8 +208,23 @@ class BaseService:
         ------
             HTTPException: If no matching model instance is found.
         """
+        related = kwargs.pop("related", None)
+        cache_ttl = getattr(self.Meta, "cache_ttl", None)
+        if cache_ttl is None or not service_cache.enabled:
+            return await self._get_one(related, **kwargs)
+        return await service_cache.get_or_load(
+            self.Meta.model,
+            {"method": "get_one", "related": related, "filters": kwargs},
+            related,
+            cache_ttl,
+            load=lambda: self._get_one(related, **kwargs),
+            dump=self._dump_instance,
+            restore=self._restore_instance,
+            key_func=getattr(self.Meta, "cache_key", None),
+        )
+
+    async def _get_one(self, related, **kwargs) -> ormar.Model:  # noqa: ANN001, ANN003
         try:
-            related = kwargs.pop("related", None)
             return (
                 (
                     await self.Meta.model.objects.select_related(related)
@@ -124,36 +240,265 @@ class BaseService:
         except ormar.NoMatch as err:
             raise self.Meta.not_found_exception from err
 
-    async def get_all(  # noqa: ANN201
+    async def get_all(  # noqa: ANN201, PLR0913
         self,
-        params: Params = None,
+        params: Params | CursorParams = None,
         related=None,  # noqa: ANN001
         order_by=None,  # noqa: ANN001
+        fields: list[str] | None = None,
+        exclude_fields: list[str] | None = None,
         **kwargs,  # noqa: ANN003
     ):
         """
         Get all model instances based on the provided filters.
 
+        Passing `CursorParams` switches to keyset pagination, see `paginate_by_cursor`.
+        `fields` and `exclude_fields` restrict the loaded own columns of the model, the
+        non-nullable and ordering columns are always loaded because ormar needs them.
+
         Args:
         ----
-            params (Params, optional): The pagination parameters.
+            params (Params | CursorParams, optional): The pagination parameters.
             related (str, optional): The related model to include.
             order_by (str, optional): The field to order the results by.
+            fields (list[str], optional): The own columns to load.
+            exclude_fields (list[str], optional): The own columns not to load.
             **kwargs: The filters to apply.
 
         Returns:
         -------
             QuerySet: The retrieved model instances.
         """
+        cache_ttl = getattr(self.Meta, "cache_ttl", None)
+        if (
+            cache_ttl is not None
+            and service_cache.enabled
+            and isinstance(params, Params)
+        ):
+            return await service_cache.get_or_load(
+                self.Meta.model,
+                {
+                    "method": "get_all",
+                    "params": params.dict(),
+                    "related": related,
+                    "order_by": order_by,
+                    "fields": fields,
+                    "exclude_fields": exclude_fields,
+                    "filters": kwargs,
+                },
+                related,
+                cache_ttl,
+                load=lambda: self._get_all(
+                    params,
+                    related,
+                    order_by,
+                    fields,
+                    exclude_fields,
+                    **kwargs,
+                ),
+                dump=lambda page: {
+                    "items": [self._dump_instance(item) for item in page.items],
+                    "total": page.total,
+                },
+                restore=lambda data: create_page(
+                    [self._restore_instance(item) for item in data["items"]],
+                    total=data["total"],
+                    params=params,
+                ),
+                key_func=getattr(self.Meta, "cache_key", None),
+            )
+        return await self._get_all(
+            params,
+            related,
+            order_by,
+            fields,
+            exclude_fields,
+            **kwargs,
+        )
+
+    async def _get_all(  # noqa: PLR0913, ANN202
+        self,
+        params,  # noqa: ANN001
+        related,  # noqa: ANN001
+        order_by,  # noqa: ANN001
+        fields,  # noqa: ANN001
+        exclude_fields,  # noqa: ANN001
+        **kwargs,  # noqa: ANN003
+    ):
         query = self.Meta.model.objects.filter(**kwargs)
         if related:
             query = query.select_related(related)
+        if fields or exclude_fields:
+            query = self._project(query, fields, exclude_fields, order_by)
+        if isinstance(params, CursorParams):
+            return await self.paginate_by_cursor(query, params, order_by=order_by)
         if order_by:
             query = query.order_by(order_by)
         if params:
             query = await paginate(query, params)
         return query
 
+    def _project(
+        self,
+        query: ormar.QuerySet,
+        fields: list[str] | None,
+        exclude_fields: list[str] | None,
+        order_by,  # noqa: ANN001
+    ) -> ormar.QuerySet:
+        """Restrict the loaded own columns, keeping the ones ormar needs."""
+        required = {
+            name
+            for name, field in self.Meta.model.Meta.model_fields.items()
+            if not field.nullable and not field.is_relation
+        }
+        required |= {
+            column.lstrip("-")
+            for column in self._get_keyset_columns(order_by)
+            if "__" not in column
+        }
+        if fields:
+            query = query.fields(list(dict.fromkeys([*fields, *sorted(required)])))
+        if exclude_fields:
+            excluded = [field for field in exclude_fields if field not in required]
+            if excluded:
+                query = query.exclude_fields(excluded)
+        return query
+
+    @staticmethod
+    def _dump_instance(instance: ormar.Model) -> dict:
+        """Convert an instance with its loaded relations to JSON compatible data."""
+        return json.loads(instance.json())
+
+    def _restore_instance(self, data: dict) -> ormar.Model:
+        """Rebuild a cached instance, marked as saved like the loaded ones."""
+        instance = self.Meta.model(**data)
+        instance.set_save_status(status=True)
+        return instance
+
+    async def paginate_by_cursor(
+        self,
+        query: ormar.QuerySet,
+        params: CursorParams,
+        order_by=None,  # noqa: ANN001
+    ) -> CursorPage:
+        """
+        Paginate a query with a keyset on the `(order columns, primary key)` tuple.
+
+        Instead of OFFSET/LIMIT and COUNT(*) the page continues after the last row of
+        the previous page, so fetching a deep page costs the same as the first one.
+        The ordering columns must not be nullable.
+
+        Args:
+        ----
+            query (QuerySet): The filtered query.
+            params (CursorParams): The cursor pagination parameters.
+            order_by (str | list[str], optional): The field(s) to order the results by.
+
+        Returns:
+        -------
+            CursorPage: The page with the cursor of the next one.
+
+        Raises:
+        ------
+            HTTPException: If the cursor is invalid.
+        """
+        columns = self._get_keyset_columns(order_by)
+        if params.cursor:
+            values = self._decode_cursor(params.cursor, columns)
+            query = query.filter(self._get_keyset_filter(columns, values))
+        items = await query.order_by(columns).limit(params.size + 1).all()
+        next_cursor = None
+        if len(items) > params.size:
+            items = items[: params.size]
+            next_cursor = self._encode_cursor(
+                [self._get_column_value(items[-1], column) for column in columns],
+            )
+        return CursorPage(items=items, next_cursor=next_cursor)
+
+    def _get_keyset_columns(self, order_by) -> list[str]:  # noqa: ANN001
+        """Return the ordering columns with the primary key appended as a tiebreaker."""
+        if not order_by:
+            order_by = []
+        elif not isinstance(order_by, list | tuple):
+            order_by = [order_by]
+        columns = [
+            column.value if isinstance(column, enum.Enum) else column
+            for column in order_by
+        ]
+        pkname = self.Meta.model.Meta.pkname
+        if all(column.lstrip("-") != pkname for column in columns):
+            descending = not columns or columns[-1].startswith("-")
+            columns.append(f"-{pkname}" if descending else pkname)
+        return columns
+
+    @staticmethod
+    def _get_keyset_filter(columns: list[str], values: list) -> FilterGroup:
+        """Build `(a, b) > (x, y)` as `a > x OR (a = x AND b > y)` for mixed directions."""
+        clauses = []
+        for index, column in enumerate(columns):
+            previous = {
+                previous_column.lstrip("-"): value
+                for previous_column, value in zip(columns[:index], values[:index])
+            }
+            operator = "lt" if column.startswith("-") else "gt"
+            clauses.append(
+                ormar.and_(
+                    **previous,
+                    **{f"{column.lstrip('-')}__{operator}": values[index]},
+                ),
+            )
+        return ormar.or_(*clauses)
+
+    @staticmethod
+    def _get_column_value(instance: ormar.Model, column: str):  # noqa: ANN205
+        """Get the value of a (possibly related) ordering column of an instance."""
+        value = instance
+        for name in column.lstrip("-").split("__"):
+            value = getattr(value, name)
+        return value
+
+    def _get_column_type(self, column: str) -> type:
+        """Get the python type of a (possibly related) ordering column."""
+        model = self.Meta.model
+        *relations, name = column.lstrip("-").split("__")
+        for relation in relations:
+            model = model.Meta.model_fields[relation].to
+        field = model.Meta.model_fields[name]
+        if field.is_relation:
+            field = field.to.Meta.model_fields[field.to.Meta.pkname]
+        return field.__type__
+
+    @staticmethod
+    def _encode_cursor(values: list) -> str:
+        """Encode the keyset values of the last row into an opaque cursor."""
+
+        def default(value):  # noqa: ANN001, ANN202
+            if isinstance(value, datetime.datetime | datetime.date):
+                return value.isoformat()
+            if isinstance(value, enum.Enum):
+                return value.value
+            if isinstance(value, uuid.UUID):
+                return str(value)
+            if isinstance(value, ormar.Model):
+                return default(value.pk)
+            raise TypeError(type(value))
+
+        data = json.dumps(values, default=default, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def _decode_cursor(self, cursor: str, columns: list[str]) -> list:
+        """Decode a cursor back into typed keyset values."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(columns):
+                raise ValueError  # noqa: TRY301
+            return [
+                parse_obj_as(self._get_column_type(column), value)
+                for column, value in zip(columns, values)
+            ]
+        except (ValueError, TypeError, KeyError, binascii.Error) as err:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from err
+
     async def delete(self, _id: int):  # noqa: ANN201
         """
         Delete a model instance by its ID.
@@ -213,11 +558,235 @@ class BaseService:
         ------
             HTTPException: If a unique constraint is violated.
         """
+        related = kwargs.pop("related", None)
         try:
-            related = kwargs.pop("related", None)
             await self.Meta.model.objects.filter(_exclude=False, **kwargs).update(
                 **updated_data,
             )
-            return await self.get_one(**kwargs, related=related)
         except (IntegrityError, SQLIntegrityError, UniqueViolationError) as err:
             raise HTTPException(422, "Key already exists") from err
+        # QuerySet.update does not send the ormar signals
+        await service_cache.invalidate(self.Meta.model.Meta.tablename)
+        instance = await self.get_one(**kwargs, related=related)
+        # the handlers of the updates, e.g. the principal cache, still see it
+        await self.Meta.model.Meta.signals.post_update.send(
+            sender=self.Meta.model,
+            instance=instance,
+        )
+        return instance
+
+    async def bulk_create(self, objects: list[dict | ormar.Model]) -> list[ormar.Model]:
+        """
+        Create many model instances with multi-row INSERT statements.
+
+        All rows are inserted in one transaction, with as few statements as the bind
+        parameter limit of the database allows. Like the other bulk methods it does not
+        send the ormar signals.
+
+        Args:
+        ----
+            objects (list[dict | ormar.Model]): The instances or their keyword arguments.
+
+        Returns:
+        -------
+            list[ormar.Model]: The created instances.
+
+        Raises:
+        ------
+            HTTPException: If a unique constraint is violated.
+        """
+        instances = [self._get_instance(_object) for _object in objects]
+        await self._insert(self.Meta.model, instances)
+        return instances
+
+    async def bulk_update(
+        self,
+        instances: list[ormar.Model],
+        columns: list[str],
+    ) -> list[ormar.Model]:
+        """
+        Update the columns of many saved model instances with one UPDATE statement.
+
+        Every column is set to `CASE pk WHEN ... THEN ... END`, so each row gets its own value.
+
+        Args:
+        ----
+            instances (list[ormar.Model]): The instances with the new values.
+            columns (list[str]): The fields to update.
+
+        Returns:
+        -------
+            list[ormar.Model]: The updated instances.
+
+        Raises:
+        ------
+            HTTPException: If a unique constraint is violated.
+        """
+        if not instances:
+            return instances
+        model = self.Meta.model
+        table = model.Meta.table
+        pk = table.c[model.get_column_alias(model.Meta.pkname)]
+        aliases = [model.get_column_alias(column) for column in columns]
+        rows = [
+            (instance.pk, instance.prepare_model_to_update(instance.dict()))
+            for instance in instances
+        ]
+        statements = [
+            table.update()
+            .values(
+                {
+                    alias: sqlalchemy.case(
+                        *[
+                            (
+                                pk == pk_value,
+                                sqlalchemy.literal(row[alias], table.c[alias].type),
+                            )
+                            for pk_value, row in chunk
+                        ],
+                        else_=table.c[alias],
+                    )
+                    for alias in aliases
+                },
+            )
+            .where(pk.in_([pk_value for pk_value, _ in chunk]))
+            for chunk in self._chunk(rows, 2 * len(aliases) + 1)
+        ]
+        await self._execute(model, statements)
+        for instance in instances:
+            instance.set_save_status(status=True)
+        return instances
+
+    async def bulk_upsert(
+        self,
+        objects: list[dict | ormar.Model],
+        conflict_columns: list[str],
+        update_columns: list[str] | None = None,
+    ) -> None:
+        """
+        Insert many rows or update the conflicting ones with `INSERT ... ON CONFLICT`.
+
+        The conflict columns need a unique constraint. The instances are not refreshed,
+        so the primary keys of the updated rows are not the ones in the database.
+
+        Args:
+        ----
+            objects (list[dict | ormar.Model]): The instances or their keyword arguments.
+            conflict_columns (list[str]): The fields of the unique constraint.
+            update_columns (list[str], optional): The fields to update on conflict.
+                Defaults to all fields except the primary key and the conflict ones,
+                an empty list keeps the existing rows unchanged.
+        """
+        model = self.Meta.model
+        table = model.Meta.table
+        instances = [self._get_instance(_object) for _object in objects]
+        rows = [
+            instance.prepare_model_to_save(instance.dict()) for instance in instances
+        ]
+        if not rows:
+            return
+        conflict = [model.get_column_alias(column) for column in conflict_columns]
+        if update_columns is None:
+            pk = model.get_column_alias(model.Meta.pkname)
+            update = [column for column in rows[0] if column not in {pk, *conflict}]
+        else:
+            update = [model.get_column_alias(column) for column in update_columns]
+        insert = (
+            sqlite_insert if database.url.dialect == "sqlite" else postgresql_insert
+        )
+        statements = []
+        for chunk in self._chunk(rows, len(rows[0])):
+            statement = insert(table).values(chunk)
+            statements.append(
+                statement.on_conflict_do_update(
+                    index_elements=conflict,
+                    set_={column: statement.excluded[column] for column in update},
+                )
+                if update
+                else statement.on_conflict_do_nothing(index_elements=conflict),
+            )
+        await self._execute(model, statements)
+
+    async def add_many(
+        self,
+        instance: ormar.Model,
+        relation: str,
+        related: list[ormar.Model],
+    ) -> ormar.Model:
+        """
+        Add many saved instances to a many-to-many relation with one INSERT statement.
+
+        Args:
+        ----
+            instance (ormar.Model): The owner of the relation.
+            relation (str): The name of the many-to-many field.
+            related (list[ormar.Model]): The instances to add.
+
+        Returns:
+        -------
+            ormar.Model: The owner with the instances registered in the relation.
+        """
+        field = instance.Meta.model_fields[relation]
+        source, target = (
+            field.default_source_field_name(),
+            field.default_target_field_name(),
+        )
+        await self._insert(
+            field.through,
+            [
+                field.through(**{source: instance.pk, target: item.pk})
+                for item in related
+            ],
+        )
+        for item in related:
+            setattr(instance, relation, item)
+        return instance
+
+    def _get_instance(self, _object: dict | ormar.Model) -> ormar.Model:
+        """Build a model instance from its keyword arguments."""
+        return (
+            _object if isinstance(_object, ormar.Model) else self.Meta.model(**_object)
+        )
+
+    async def _insert(
+        self,
+        model: type[ormar.Model],
+        instances: list[ormar.Model],
+    ) -> None:
+        """Insert the instances with multi-row INSERT statements in one transaction."""
+        rows = [
+            instance.prepare_model_to_save(instance.dict()) for instance in instances
+        ]
+        if not rows:
+            return
+        await self._execute(
+            model,
+            [
+                model.Meta.table.insert().values(chunk)
+                for chunk in self._chunk(rows, len(rows[0]))
+            ],
+        )
+        for instance in instances:
+            instance.set_save_status(status=True)
+
+    @staticmethod
+    async def _execute(model: type[ormar.Model], statements: list) -> None:
+        """Execute the bulk statements in one transaction and invalidate the cached queries."""
+        try:
+            async with database.transaction():
+                for statement in statements:
+                    await database.execute(statement)
+        except (IntegrityError, SQLIntegrityError, UniqueViolationError) as err:
+            raise HTTPException(422, "Key already exists") from err
+        await service_cache.invalidate(model.Meta.tablename)
+
+    @staticmethod
+    def _chunk(rows: list, params_per_row: int) -> list[list]:
+        """Split the rows so a statement stays within the bind parameter limit."""
+        limit = (
+            SQLITE_MAX_PARAMS
+            if database.url.dialect == "sqlite"
+            else POSTGRES_MAX_PARAMS
+        )
+        size = max(limit // max(params_per_row, 1), 1)
+        return [rows[index : index + size] for index in range(0, len(rows), size)]
@@ -1,26 +1,18 @@
 """Dependencies for the application."""
-import resend
-from fastapi import Depends
-from fastapi_mail import ConnectionConfig
-from fastapi_mail.email_utils import DefaultChecker
+from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+from fastapi import Depends, HTTPException, Query
+from fastapi_pagination import Params
+from pydantic import BaseModel
+
+from sharkservers.schemas import CursorParams, Projection
 from sharkservers.services import EmailService, UploadService
 from sharkservers.settings import Settings, get_settings
 
-settings = get_settings()
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS,
-)
+if TYPE_CHECKING:
+    from fastapi_mail.email_utils import DefaultChecker
 
 
 async def get_email_checker() -> DefaultChecker:
@@ -31,6 +23,9 @@ async def get_email_checker() -> DefaultChecker:
     -------
         DefaultChecker: The default email checker.
     """
+    # fastapi_mail is imported by the first email, it loads jinja2 and aiosmtplib
+    from fastapi_mail.email_utils import DefaultChecker
+
     checker = (
         DefaultChecker()
     )  # you can pass source argument for your own email domains
@@ -40,7 +35,7 @@ async def get_email_checker() -> DefaultChecker:
 
 async def get_email_service(
     settings: Settings = Depends(get_settings),
-    checker: DefaultChecker = Depends(get_email_checker),
+    checker=Depends(get_email_checker),  # noqa: ANN001
 ) -> EmailService:
     """
     Retrieve the email service.
@@ -54,6 +49,8 @@ async def get_email_service(
     -------
         EmailService: The email service.
     """
+    import resend
+
     resend.api_key = settings.RESEND_API_KEY
     return EmailService(resend=resend, checker=checker)
 
@@ -73,3 +70,104 @@ async def get_upload_service(
         UploadService: The upload service.
     """
     return UploadService(settings=settings)
+
+
+async def get_pagination_params(
+    params: Params = Depends(),
+    cursor: str | None = Query(
+        None,
+        description="Cursor returned as `next_cursor` by the previous page. "
+        "Pass an empty value to start keyset pagination.",
+    ),
+) -> Params | CursorParams:
+    """
+    Retrieve the pagination parameters, switching to keyset pagination when `cursor` is passed.
+
+    Args:
+    ----
+        params (Params, optional): The offset pagination parameters. Defaults to Depends().
+        cursor (str, optional): The cursor of the page to fetch. Defaults to None.
+
+    Returns:
+    -------
+        Params | CursorParams: The pagination parameters.
+    """
+    if cursor is None:
+        return params
+    return CursorParams(cursor=cursor or None, size=params.size)
+
+
+class ProjectionParams:
+    """
+    Dependency parsing the sparse fieldset query parameters of a list endpoint.
+
+    `fields` lists the own columns to return, a `-` prefix leaves a column out instead.
+    `include` lists the relations to return, the other relations are not joined.
+    Without both parameters the endpoint returns its full output schema.
+    """
+
+    def __init__(
+        self,
+        schema: type[BaseModel],
+        relations: dict[str, list[str]],
+    ) -> None:
+        """
+        Initialize the dependency.
+
+        Args:
+        ----
+            schema (type[BaseModel]): The slim output schema with optional fields.
+            relations (dict[str, list[str]]): The relations of the endpoint mapped to the
+                related paths to join, e.g. `author` to `author` and `author__display_role`.
+        """
+        self.schema = schema
+        self.relations = relations
+
+    async def __call__(
+        self,
+        fields: str | None = Query(
+            None,
+            description="Comma separated fields to return, prefix a field with `-` to leave it out",
+        ),
+        include: str | None = Query(
+            None,
+            description="Comma separated relations to return",
+        ),
+    ) -> Projection | None:
+        """
+        Parse the sparse fieldset.
+
+        Args:
+        ----
+            fields (str, optional): The comma separated fields.
+            include (str, optional): The comma separated relations.
+
+        Returns:
+        -------
+            Projection | None: The projection or None to return the full output schema.
+
+        Raises:
+        ------
+            HTTPException: If a field or relation is unknown.
+        """
+        if fields is None and include is None:
+            return None
+        requested = [
+            field.strip() for field in (fields or "").split(",") if field.strip()
+        ]
+        included = [name.strip() for name in (include or "").split(",") if name.strip()]
+        columns = set(self.schema.__fields__) - set(self.relations)
+        unknown = {field.lstrip("-") for field in requested} - columns
+        unknown |= set(included) - set(self.relations)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return Projection(
+            fields=[field for field in requested if not field.startswith("-")] or None,
+            exclude_fields=[field[1:] for field in requested if field.startswith("-")]
+            or None,
+            include=included,
+            related=[path for name in included for path in self.relations[name]],
+        )
@@ -46,3 +46,19 @@ class OrderEnum(str, Enum):
 
     ID_DESC = "-id"
     ID_ASC = "id"
+
+
+class OverflowPolicyEnum(str, Enum):
+    """
+    Enum class representing what happens when a websocket send queue is full.
+
+    Attributes
+    ----------
+        DROP_OLDEST (str): Drop the oldest queued message.
+        COALESCE (str): Replace the queued messages of the same channel, for snapshot channels.
+        DISCONNECT (str): Disconnect the slow client.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
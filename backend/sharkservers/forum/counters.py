@@ -0,0 +1,76 @@
+"""Forum counters."""
+from __future__ import annotations
+
+import sqlalchemy
+
+from sharkservers.counters import CounterSpec
+from sharkservers.forum.models import Category, Post, Thread
+from sharkservers.users.models import User
+
+threads_table = Thread.Meta.table
+posts_table = Post.Meta.table
+threads_posts_table = Thread.Meta.model_fields["posts"].through.Meta.table
+posts_likes_table = Post.Meta.model_fields["likes"].through.Meta.table
+
+
+def _count_by(column: sqlalchemy.Column) -> sqlalchemy.sql.Select:
+    return sqlalchemy.select(
+        column.label("key"),
+        sqlalchemy.func.count().label("value"),
+    ).group_by(column)
+
+
+CATEGORY_COUNTERS = [
+    CounterSpec(
+        name="categories.threads_count",
+        table=Category.Meta.table,
+        column="threads_count",
+        source=_count_by(threads_table.c.category),
+    ),
+]
+
+THREAD_COUNTERS = [
+    CounterSpec(
+        name="threads.post_count",
+        table=threads_table,
+        column="post_count",
+        source=_count_by(threads_posts_table.c.thread),
+    ),
+]
+
+POST_COUNTERS = [
+    CounterSpec(
+        name="posts.likes_count",
+        table=posts_table,
+        column="likes_count",
+        source=_count_by(posts_likes_table.c.post),
+    ),
+]
+
+USER_COUNTERS = [
+    CounterSpec(
+        name="users.threads_count",
+        table=User.Meta.table,
+        column="threads_count",
+        source=_count_by(threads_table.c.author),
+    ),
+    CounterSpec(
+        name="users.posts_count",
+        table=User.Meta.table,
+        column="posts_count",
+        source=_count_by(posts_table.c.author),
+    ),
+    CounterSpec(
+        name="users.likes_count",
+        table=User.Meta.table,
+        column="likes_count",
+        source=_count_by(posts_table.c.author).select_from(
+            posts_table.join(
+                posts_likes_table,
+                posts_table.c.id == posts_likes_table.c.post,
+            ),
+        ),
+    ),
+]
+
+FORUM_COUNTERS = CATEGORY_COUNTERS + THREAD_COUNTERS + POST_COUNTERS + USER_COUNTERS
@@ -75,7 +75,7 @@ async def get_valid_thread(
         Thread: The thread.
     """
     return await threads_service.get_one(
-        id=thread_id,
+        id=thread_id.uuid,
         related=[
             "category",
             "author",
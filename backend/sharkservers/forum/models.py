@@ -6,7 +6,8 @@ import uuid
 import ormar
 from ormar import post_delete, post_relation_add, post_relation_remove, post_save
 
-from sharkservers.db import BaseMeta, DateFieldsMixins
+from sharkservers.counters import increment_counters
+from sharkservers.db import BaseMeta, DateFieldsMixins, uuid7
 from sharkservers.forum.enums import (
     CategoryTypeEnum,
     ThreadActionEnum,
@@ -61,7 +62,7 @@ class Like(ormar.Model, DateFieldsMixins):
 
         tablename = "forum_reputation"
 
-    id: str = ormar.UUID(primary_key=True, default=uuid.uuid4)
+    id: str = ormar.UUID(primary_key=True, default=uuid7)
     author: User | None = ormar.ForeignKey(User, related_name="user_reputation")
 
 
@@ -83,7 +84,7 @@ class Post(ormar.Model, DateFieldsMixins):
 
         tablename = "forum_posts"
 
-    id: str = ormar.UUID(primary_key=True, default=uuid.uuid4)
+    id: str = ormar.UUID(primary_key=True, default=uuid7)
     author: User | None = ormar.ForeignKey(User, related_name="user_posts")
     content: str = ormar.Text()
     likes: list[Like] | None = ormar.ManyToMany(Like, related_name="post_likes")
@@ -107,7 +108,7 @@ class ThreadMeta(ormar.Model, DateFieldsMixins):
 
         tablename = "forum_threads_meta"
 
-    id: str = ormar.UUID(primary_key=True, default=uuid.uuid4)
+    id: str = ormar.UUID(primary_key=True, default=uuid7)
     name: str | None = ormar.String(max_length=64)
     value: str | None = ormar.Text(nullable=True)
     description: str | None = ormar.Text(nullable=True)
@@ -137,7 +138,7 @@ class Thread(ormar.Model, DateFieldsMixins):
 
         tablename = "forum_threads"
 
-    id: str = ormar.UUID(primary_key=True, default=uuid.uuid4)
+    id: str = ormar.UUID(primary_key=True, default=uuid7)
     title: str | None = ormar.String(max_length=64)
     content: str | None = ormar.Text()
     is_closed: bool | None = ormar.Boolean(default=False)
@@ -229,39 +230,31 @@ async def on_thread_save(
     -------
         None
     """
-    # Update category thread counter
-    category = await Category.objects.get(id=instance.category.id)
-    threads_category_count = category.threads_count + 1
-    threads_count = instance.author.threads_count + 1
-    await category.update(threads_count=threads_category_count)
-    await instance.author.update(threads_count=threads_count)
+    # Update category and author thread counters
+    category = instance.category
+    await increment_counters(category, threads_count=1)
+    await increment_counters(instance.author, threads_count=1)
+    if category.__pk_only__:
+        await category.load()
     # Check category type
     if category.type == CategoryTypeEnum.APPLICATION:
-        # create thread server_id meta field
-        server_id = await ThreadMeta.objects.create(
-            name="server_id",
-            description="Serwer na który aplikujesz",
-        )
-        experience = await ThreadMeta.objects.create(
-            name="question_experience",
-            description="Twoje doświadczenie",
-        )
-        age = await ThreadMeta.objects.create(
-            name="question_age",
-            description="Twój wiek",
-        )
-        reason = await ThreadMeta.objects.create(
-            name="question_reason",
-            description="Dlaczego chcesz zostac administratorem?",
-        )
+        # create the application meta fields with one insert each for metas and links
         meta_fields = [
-            server_id,
-            experience,
-            age,
-            reason,
+            ThreadMeta(name="server_id", description="Serwer na który aplikujesz"),
+            ThreadMeta(name="question_experience", description="Twoje doświadczenie"),
+            ThreadMeta(name="question_age", description="Twój wiek"),
+            ThreadMeta(
+                name="question_reason",
+                description="Dlaczego chcesz zostac administratorem?",
+            ),
         ]
+        await ThreadMeta.objects.bulk_create(meta_fields)
+        through = Thread.Meta.model_fields["meta_fields"].through
+        await through.objects.bulk_create(
+            [through(thread=instance.pk, threadmeta=meta.pk) for meta in meta_fields],
+        )
         for meta_field in meta_fields:
-            await instance.meta_fields.add(meta_field)
+            instance.meta_fields = meta_field
 
 
 @post_delete(Thread)
@@ -279,10 +272,10 @@ async def update_category_thread_counter_after_delete(
         instance (Thread): Thread instance
         **kwargs: Additional arguments
     """
-    category = await Category.objects.get(id=instance.category.id)
-    await category.update(
-        threads_count=category.threads_count - 1 if category.threads_count > 0 else 0,
-    )
+    if instance.category:
+        await increment_counters(instance.category, threads_count=-1)
+    if instance.author:
+        await increment_counters(instance.author, threads_count=-1)
 
 
 @post_relation_add(Thread)
@@ -294,12 +287,9 @@ async def update_thread_post_counter_after_relation_add(
 ) -> None:
     """Update thread post counter after relation add."""
     if isinstance(child, Post):
-        thread = await Thread.objects.get(id=instance.id)
-        thread_posts_count = thread.post_count + 1
-        posts_count = child.author.posts_count + 1
-        await thread.update(post_count=thread_posts_count)
-        logger.info(f"Thread {thread.title} post count updated to {thread.post_count}")
-        await child.author.update(posts_count=posts_count)
+        await increment_counters(instance, post_count=1)
+        await increment_counters(child.author, posts_count=1)
+        logger.info(f"Thread {instance.id} post count incremented")
 
 
 @post_relation_remove(Thread)
@@ -311,11 +301,34 @@ async def update_thread_post_counter_after_relation_remove(
 ) -> None:
     """Update thread post counter after relation remove."""
     if isinstance(child, Post):
-        thread = await Thread.objects.get(id=instance.id)
-        thread_posts_count = thread.post_count - 1 if thread.post_count > 0 else 0
-        posts_count = (
-            child.author.posts_count - 1 if child.author.posts_count > 0 else 0
-        )
-        await thread.update(post_count=thread_posts_count)
-        logger.info(f"Thread {thread.title} post count updated to {thread.post_count}")
-        await child.author.update(posts_count=posts_count)
+        await increment_counters(instance, post_count=-1)
+        await increment_counters(child.author, posts_count=-1)
+        logger.info(f"Thread {instance.id} post count decremented")
+
+
+@post_relation_add(Post)
+async def update_post_likes_counter_after_relation_add(
+    sender: Post,  # noqa: ARG001
+    instance: Post,
+    child: Like,
+    **kwargs,  # noqa: ARG001, ANN003
+) -> None:
+    """Update post and author likes counters after relation add."""
+    if isinstance(child, Like):
+        await increment_counters(instance, likes_count=1)
+        if instance.author:
+            await increment_counters(instance.author, likes_count=1)
+
+
+@post_relation_remove(Post)
+async def update_post_likes_counter_after_relation_remove(
+    sender: Post,  # noqa: ARG001
+    instance: Post,
+    child: Like,
+    **kwargs,  # noqa: ARG001, ANN003
+) -> None:
+    """Update post and author likes counters after relation remove."""
+    if isinstance(child, Like):
+        await increment_counters(instance, likes_count=-1)
+        if instance.author:
+            await increment_counters(instance.author, likes_count=-1)
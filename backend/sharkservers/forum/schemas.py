@@ -1,6 +1,8 @@
 """Forum schemas."""
 from __future__ import annotations
 
+import datetime
+
 from fastapi import Query
 from pydantic import BaseModel, Field
 from uuidbase62 import (
@@ -81,6 +83,29 @@ class ThreadOut(UUIDBase62ModelMixin, thread_out):
         orm_mode = True
 
 
+class ThreadSlimOut(UUIDBase62ModelMixin, BaseModel):
+    """Thread output schema of a sparse fieldset, every field is optional."""
+
+    id: con_uuidbase62(prefix="thread")
+    created_at: datetime.datetime | None
+    updated_at: datetime.datetime | None
+    title: str | None
+    content: str | None
+    is_closed: bool | None
+    is_pinned: bool | None
+    status: str | None
+    post_count: int | None
+    author: UserOut | None
+    category: CategoryOut | None
+    server: ServerOut | None
+    meta_fields: list[ThreadMetaOut] | None
+
+    class Config:
+        """Thread slim output schema config."""
+
+        orm_mode = True
+
+
 class LikeOut(UUIDBase62ModelMixin, like_out):
     """Like output schema."""
 
@@ -170,7 +195,7 @@ class AdminUpdateThreadSchema(UpdateThreadSchema):
 class CreatePostSchema(BaseModel):
     """Create post schema."""
 
-    thread_id: int
+    thread_id: con_uuidbase62(prefix="thread")
     content: str = Field(min_length=2)
 
 
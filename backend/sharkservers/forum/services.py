@@ -4,7 +4,13 @@ from __future__ import annotations
 from fastapi import HTTPException
 from starlette import status as starlette_status
 
+from sharkservers.counters import CounterReconciler, counter_batch
 from sharkservers.db import BaseService
+from sharkservers.forum.counters import (
+    CATEGORY_COUNTERS,
+    POST_COUNTERS,
+    THREAD_COUNTERS,
+)
 from sharkservers.forum.enums import (
     CategoryTypeEnum,
     ThreadStatusEnum,
@@ -33,17 +39,13 @@ class CategoryService(BaseService):
 
         model = Category
         not_found_exception = category_not_found_exception
+        cache_ttl = 60
 
     async def sync_counters(self) -> None:
         """Sync category threads counters."""
         try:
-            categories = await self.Meta.model.objects.select_related("threads").all()
-            for category in categories:
-                threads_count = await category.threads.count()
-                await category.update(threads_count=threads_count)
-            logger.info(
-                f"Finished sync counters to category threads -> {len(categories)}",
-            )
+            report = await CounterReconciler(CATEGORY_COUNTERS).reconcile()
+            logger.info(f"Finished sync counters to category threads -> {report}")
         except Exception as e:  # noqa: BLE001
             logger.error(e)
 
@@ -70,9 +72,15 @@ class ThreadMetaService(BaseService):
         -------
             ThreadMeta: The thread meta.
         """
-        for key, value in data.items():
-            thread_meta = await self.get_one(name=key, thread_meta__id=thread_id)
-            await thread_meta.update(value=value)
+        thread_metas = await self.Meta.model.objects.filter(
+            name__in=list(data),
+            thread_meta__id=thread_id,
+        ).all()
+        if len(thread_metas) != len(data):
+            raise self.Meta.not_found_exception
+        for thread_meta in thread_metas:
+            thread_meta.value = data[thread_meta.name]
+        await self.bulk_update(thread_metas, ["value"])
 
 
 class ThreadService(BaseService):
@@ -181,11 +189,8 @@ class ThreadService(BaseService):
     async def sync_counters(self) -> None:
         """Sync thread posts counters."""
         try:
-            threads = await self.Meta.model.objects.select_related("posts").all()
-            for thread in threads:
-                posts_count = await thread.posts.count()
-                await thread.update(post_count=posts_count)
-            logger.info(f"Finished sync counters to thread posts -> {len(threads)}")
+            report = await CounterReconciler(THREAD_COUNTERS).reconcile()
+            logger.info(f"Finished sync counters to thread posts -> {report}")
         except Exception as e:  # noqa: BLE001
             logger.error(e)
 
@@ -204,7 +209,7 @@ class ThreadService(BaseService):
         user = thread.author
         admin_role = thread.server.admin_role
         if user.display_role.tag == ProtectedDefaultRolesTagEnum.USER.value:
-            await user.update(display_role=admin_role)
+            await user.update(_columns=["display_role"], display_role=admin_role)
             await user.roles.add(admin_role)
         else:
             await user.roles.add(admin_role)
@@ -222,11 +227,8 @@ class PostService(BaseService):
     async def sync_counters(self) -> None:
         """Sync post likes counters."""
         try:
-            posts = await self.Meta.model.objects.select_related("likes").all()
-            for post in posts:
-                likes_count = await post.likes.count()
-                await post.update(likes_count=likes_count)
-            logger.info(f"Finished sync counters to post likes -> {len(posts)}")
+            report = await CounterReconciler(POST_COUNTERS).reconcile()
+            logger.info(f"Finished sync counters to post likes -> {report}")
         except Exception as e:  # noqa: BLE001
             logger.error(e)
 
@@ -264,8 +266,9 @@ class LikeService(BaseService):
                 break
         if like_exists:
             raise like_already_exists_exception
-        new_like = await self.create(author=author)
-        await post.likes.add(new_like)
+        async with counter_batch():
+            new_like = await self.create(author=author)
+            await post.likes.add(new_like)
         return new_like, post.likes
 
     async def remove_like_from_post(self, post: Post, author: User) -> dict:
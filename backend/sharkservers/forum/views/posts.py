@@ -8,6 +8,7 @@ from fastapi_pagination import Page, Params
 from fastapi_pagination.ext.ormar import paginate
 
 from sharkservers.auth.dependencies import get_current_active_user
+from sharkservers.counters import counter_batch
 from sharkservers.forum.dependencies import (
     get_likes_service,
     get_posts_service,
@@ -119,13 +120,13 @@ async def create_post(
     -------
         PostOut: The post.
     """
-    post_data_dict = post_data.dict()
-    thread_id = post_data_dict.pop("thread_id")
-    thread = await threads_service.get_one(id=thread_id)
+    post_data_dict = post_data.dict(exclude={"thread_id"})
+    thread = await threads_service.get_one(id=post_data.thread_id.uuid)
     if thread.is_closed:
         raise thread_is_closed_exception
-    new_post = await posts_service.create(**post_data_dict, author=user)
-    await thread.posts.add(new_post)
+    async with counter_batch():
+        new_post = await posts_service.create(**post_data_dict, author=user)
+        await thread.posts.add(new_post)
     dispatch(PostEventEnum.CREATE_POST, payload={"data": new_post})
     return new_post
 
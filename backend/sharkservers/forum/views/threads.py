@@ -1,9 +1,12 @@
 """Threads views."""
+from __future__ import annotations
+
 from fastapi import APIRouter, Depends, Security
 from fastapi_limiter.depends import RateLimiter
 from fastapi_pagination import Page, Params
 
 from sharkservers.auth.dependencies import get_current_active_user
+from sharkservers.dependencies import ProjectionParams, get_pagination_params
 from sharkservers.forum.dependencies import (
     get_categories_service,
     get_thread_meta_service,
@@ -17,6 +20,7 @@ from sharkservers.forum.schemas import (
     CreateThreadSchema,
     ThreadOut,
     ThreadQuery,
+    ThreadSlimOut,
     UpdateThreadSchema,
 )
 from sharkservers.forum.services import (
@@ -24,6 +28,8 @@ from sharkservers.forum.services import (
     ThreadMetaService,
     ThreadService,
 )
+from sharkservers.responses import FastJSONResponse
+from sharkservers.schemas import CursorPage, CursorParams, Projection
 from sharkservers.servers.dependencies import get_servers_service
 from sharkservers.servers.services import ServerService
 from sharkservers.settings import get_settings
@@ -38,25 +44,43 @@ limiter = RateLimiter(
     minutes=60 if settings.TESTING else 2,
 )
 
+thread_relations = {
+    "category": ["category"],
+    "author": [
+        "author",
+        "author__display_role",
+        "author__player",
+        "author__player__steamrep_profile",
+    ],
+    "meta_fields": ["meta_fields"],
+    "server": ["server", "server__admin_role"],
+}
+thread_projection = ProjectionParams(ThreadSlimOut, thread_relations)
+
 
 @router.get("")
 async def get_threads(
-    params: Params = Depends(),
+    params: Params | CursorParams = Depends(get_pagination_params),
     queries: ThreadQuery = Depends(),
+    projection: Projection | None = Depends(thread_projection),
     threads_service: ThreadService = Depends(get_threads_service),
-) -> Page[ThreadOut]:
+) -> CursorPage[ThreadOut] | Page[ThreadOut]:
     """
     Get all threads.
 
+    With `fields` or `include` the threads are returned as `ThreadSlimOut` with only
+    the requested fields and the other relations are not joined.
+
     Args:
     ----
-        params (Params, optional): The params. Defaults to Depends().
+        params (Params | CursorParams, optional): The params. Defaults to Depends(get_pagination_params).
         queries (ThreadQuery, optional): The queries. Defaults to Depends().
+        projection (Projection | None, optional): The sparse fieldset. Defaults to Depends(thread_projection).
         threads_service (ThreadService, optional): The threads service. Defaults to Depends(get_threads_service).
 
     Returns:
     -------
-        Page[ThreadOut]: The threads.
+        CursorPage[ThreadOut] | Page[ThreadOut]: The threads.
     """
     kwargs = {}
     if queries.category:
@@ -73,20 +97,22 @@ async def get_threads(
     if queries.closed is not None:
         kwargs["is_closed"] = queries.closed
 
-    return await threads_service.get_all(
+    if projection is None:
+        return await threads_service.get_all(
+            params=params,
+            related=[path for paths in thread_relations.values() for path in paths],
+            **kwargs,
+        )
+    threads = await threads_service.get_all(
         params=params,
-        related=[
-            "category",
-            "author",
-            "author__display_role",
-            "author__player",
-            "author__player__steamrep_profile",
-            "meta_fields",
-            "server",
-            "server__admin_role",
-        ],
+        related=projection.related,
+        fields=projection.fields,
+        exclude_fields=projection.exclude_fields,
         **kwargs,
     )
+    return FastJSONResponse(
+        projection.apply(threads, ThreadSlimOut, list(thread_relations)),
+    )
 
 
 @router.post("", dependencies=[Depends(limiter)])
@@ -0,0 +1,717 @@
+"""
+Synthetic forum datasets.
+
+Generates users, categories, threads, posts, likes and chat messages at production volumes
+so the performance of the application can be reproduced locally. The rows are written in
+batches, with `COPY` on PostgreSQL and executemany elsewhere, through a synchronous
+SQLAlchemy engine instead of the services creating one model at a time.
+
+The dataset is deterministic: the same options, `until` included, produce the same rows,
+except for the bcrypt salt of the shared password. The activity is skewed like on a real
+forum: the authors are drawn from a power law, a few hot threads get most of the posts and
+the likes of a batch of posts follow a power law as well. The denormalized counters are
+computed while the rows are planned, so they match the rows like the ormar signals would
+keep them.
+
+Classes:
+- DatasetOptions: Volumes and distributions of a dataset.
+- PowerLaw: Sampler of indexes whose popularity follows a power law.
+- DatasetGenerator: Generator of the rows of a dataset.
+- BulkWriter: Writer of batches of rows with executemany.
+- CopyWriter: Writer of batches of rows with the PostgreSQL `COPY`.
+
+Functions:
+- get_sync_engine: Create a synchronous engine for the database of the application.
+- get_writer: Get the fastest writer of a connection.
+- reset_database: Drop and create the tables.
+- write_dataset: Write the rows of a generator.
+- generate_dataset: Generate a dataset in the database of the application.
+"""
+from __future__ import annotations
+
+import datetime
+import io
+import math
+import random
+import uuid
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Any
+
+import sqlalchemy
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from sharkservers.auth.utils import APP_TIMEZONE, get_password_hash, now_datetime
+from sharkservers.cache import service_cache
+from sharkservers.chat.models import Chat
+from sharkservers.chat.rooms import GLOBAL_ROOM
+from sharkservers.db import database, metadata, uuid7
+from sharkservers.forum.enums import CategoryTypeEnum
+from sharkservers.forum.models import Category, Like, Post, Thread
+from sharkservers.roles.dependencies import get_roles_service
+from sharkservers.roles.enums import ProtectedDefaultRolesTagEnum
+from sharkservers.scopes.dependencies import get_scopes_service
+from sharkservers.services import MainService
+from sharkservers.users.models import User
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+Batch = tuple[sqlalchemy.Table, list[dict]]
+
+DEFAULT_PASSWORD = "fake_password"  # noqa: S105
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MILLISECOND = datetime.timedelta(milliseconds=1)
+TEXT_POOL_SIZE = 1024
+WORDS = (
+    "server",
+    "map",
+    "round",
+    "player",
+    "admin",
+    "ban",
+    "vip",
+    "skin",
+    "knife",
+    "rifle",
+    "headshot",
+    "clutch",
+    "team",
+    "match",
+    "rank",
+    "lag",
+    "ping",
+    "update",
+    "plugin",
+    "config",
+    "mod",
+    "event",
+    "tournament",
+    "question",
+    "help",
+    "thanks",
+    "please",
+    "great",
+    "again",
+    "today",
+    "tonight",
+    "weekend",
+    "new",
+    "old",
+    "best",
+    "worst",
+    "fix",
+    "bug",
+    "report",
+    "idea",
+)
+
+
+class DatasetOptions(BaseModel):
+    """
+    Volumes and distributions of a dataset.
+
+    The options are query parameters when used as a dependency.
+    """
+
+    users: int = Field(1000, ge=1, description="The number of users.")
+    categories: int = Field(10, ge=1, description="The number of categories.")
+    threads: int = Field(10_000, ge=1, description="The number of threads.")
+    posts: int = Field(100_000, ge=0, description="The number of posts.")
+    likes: int = Field(
+        200_000,
+        ge=0,
+        description="The number of likes, at most one per user and post.",
+    )
+    chats: int = Field(10_000, ge=0, description="The number of chat messages.")
+    seed: int = Field(0, description="The seed of the random generator.")
+    user_skew: float = Field(
+        1.1,
+        ge=0,
+        description="The exponent of the power law of the authors, 0 for uniform.",
+    )
+    hot_threads: float = Field(
+        0.01,
+        ge=0,
+        le=1,
+        description="The share of the threads which are hot.",
+    )
+    hot_posts: float = Field(
+        0.5,
+        ge=0,
+        le=1,
+        description="The share of the posts written in the hot threads.",
+    )
+    like_skew: float = Field(
+        1.0,
+        ge=0,
+        description="The exponent of the power law of the likes within a batch of "
+        "posts, 0 for uniform.",
+    )
+    days: int = Field(
+        365,
+        ge=1,
+        description="The number of days the rows were created in.",
+    )
+    until: datetime.datetime | None = Field(
+        None,
+        description="The creation time of the newest rows, the midnight of today by "
+        "default. Pass it to reproduce a dataset on another day.",
+    )
+    prefix: str = Field(
+        "fake",
+        description="The prefix of the usernames, emails and category names, which "
+        "must not be taken when adding to existing data.",
+    )
+    password: str = Field(DEFAULT_PASSWORD, description="The password of every user.")
+    batch_size: int = Field(
+        10_000,
+        ge=1,
+        description="The number of rows written at once.",
+    )
+
+
+class PowerLaw:
+    """
+    Sampler of indexes whose popularity follows a power law.
+
+    The rank of a sample is drawn from the continuous power law with the density
+    `rank ** -exponent` by inverse transform, which takes constant memory for any size.
+    The ranks are scattered over the indexes by an affine permutation, so the popular
+    indexes are not the first ones.
+
+    Attributes
+    ----------
+        size (int): The number of indexes.
+        exponent (float): The exponent, 0 for uniform and the higher the more skewed.
+        rng (random.Random): The random generator.
+        step (int): The multiplier of the permutation, coprime with the size.
+        offset (int): The offset of the permutation.
+    """
+
+    def __init__(self, size: int, exponent: float, rng: random.Random) -> None:
+        """Initialize the PowerLaw."""
+        self.size = size
+        self.exponent = exponent
+        self.rng = rng
+        self.step = 1
+        while size > 1:
+            self.step = rng.randrange(1, size)
+            if math.gcd(self.step, size) == 1:
+                break
+        self.offset = rng.randrange(size) if size else 0
+
+    def index(self, rank: int) -> int:
+        """Return the index of a rank, 0 being the most popular."""
+        return (rank * self.step + self.offset) % self.size
+
+    def sample(self) -> int:
+        """Return a random index."""
+        u = self.rng.random()
+        upper = self.size + 1
+        if self.exponent == 0:
+            rank = int(u * self.size)
+        elif self.exponent == 1:
+            rank = int(upper**u) - 1
+        else:
+            power = 1 - self.exponent
+            rank = int(((upper**power - 1) * u + 1) ** (1 / power)) - 1
+        return self.index(min(rank, self.size - 1))
+
+
+class DatasetGenerator:
+    """
+    Generator of the rows of a dataset.
+
+    The relations and counters are planned on initialization, in arrays of integers, then
+    the rows are generated batch by batch in the order of the foreign keys.
+
+    Attributes
+    ----------
+        options (DatasetOptions): The options.
+        role_id (uuid.UUID): The role of the users.
+        password (str): The password hash of the users.
+        rng (random.Random): The random generator.
+        until (datetime.datetime): The creation time of the newest rows.
+        start (datetime.datetime): The creation time of the oldest rows.
+        user_ids (list[uuid.UUID]): The keys of the users.
+        category_ids (list[uuid.UUID]): The keys of the categories.
+    """
+
+    def __init__(
+        self,
+        options: DatasetOptions,
+        role_id: uuid.UUID,
+        password: str,
+    ) -> None:
+        """Initialize the DatasetGenerator."""
+        self.options = options
+        self.role_id = role_id
+        self.password = password
+        self.rng = random.Random(options.seed)
+        self.until = options.until or now_datetime().replace(
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+            tzinfo=None,
+        )
+        self.start = self.until - datetime.timedelta(days=options.days)
+        self.user_ids = [self._to_uuid4() for _ in range(options.users)]
+        self.category_ids = [self._to_uuid4() for _ in range(options.categories)]
+        self._texts: dict[tuple[int, int], list[str]] = {}
+        self._plan()
+
+    def _plan(self) -> None:
+        """Draw the authors, threads and number of likes of the rows and their counters."""
+        options, rng = self.options, self.rng
+        self.authors = PowerLaw(options.users, options.user_skew, rng)
+        self.user_threads = array("L", [0]) * options.users
+        self.user_posts = array("L", [0]) * options.users
+        self.user_likes = array("L", [0]) * options.users
+        self.category_threads = [0] * options.categories
+        self.thread_posts = array("L", [0]) * options.threads
+
+        self.thread_authors = array(
+            "L",
+            (self.authors.sample() for _ in range(options.threads)),
+        )
+        self.thread_categories = array(
+            "L",
+            (rng.randrange(options.categories) for _ in range(options.threads)),
+        )
+        for author, category in zip(self.thread_authors, self.thread_categories):
+            self.user_threads[author] += 1
+            self.category_threads[category] += 1
+
+        hot_threads = PowerLaw(options.threads, 0, rng)
+        hot_count = max(1, round(options.threads * options.hot_threads))
+        self.post_threads = array(
+            "L",
+            (
+                hot_threads.index(rng.randrange(hot_count))
+                if rng.random() < options.hot_posts
+                else rng.randrange(options.threads)
+                for _ in range(options.posts)
+            ),
+        )
+        self.post_authors = array(
+            "L",
+            (self.authors.sample() for _ in range(options.posts)),
+        )
+        for thread, author in zip(self.post_threads, self.post_authors):
+            self.thread_posts[thread] += 1
+            self.user_posts[author] += 1
+
+        # a user likes a post once, so a post has at most as many likes as there are users
+        self.post_likes = array("L", [0]) * options.posts
+        likes = min(options.likes, options.posts * options.users)
+        for start, stop in self._batches(options.posts):
+            batch_likes = likes * stop // options.posts - likes * start // options.posts
+            posts = PowerLaw(stop - start, options.like_skew, rng)
+            while batch_likes:
+                post = start + posts.sample()
+                if self.post_likes[post] < options.users:
+                    self.post_likes[post] += 1
+                    self.user_likes[self.post_authors[post]] += 1
+                    batch_likes -= 1
+
+    def _batches(self, count: int) -> Iterator[tuple[int, int]]:
+        """Split the indexes of `count` rows into batches."""
+        for start in range(0, count, self.options.batch_size):
+            yield start, min(start + self.options.batch_size, count)
+
+    def _spread(self, index: int, count: int) -> datetime.datetime:
+        """Return the creation time of the row `index` of `count` rows created in order."""
+        return self.start + (self.until - self.start) * (index / max(count, 1))
+
+    def _after(self, created_at: datetime.datetime) -> datetime.datetime:
+        """Return a random time between the given time and the newest rows."""
+        return created_at + (self.until - created_at) * self.rng.random()
+
+    def _to_uuid4(self) -> uuid.UUID:
+        """Return a random key."""
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _to_uuid7(self, created_at: datetime.datetime) -> uuid.UUID:
+        """Return a time-ordered key of a row created at the given local time."""
+        return uuid7(
+            (created_at.replace(tzinfo=APP_TIMEZONE) - EPOCH) // MILLISECOND,
+            self.rng,
+        )
+
+    def _text(self, min_words: int, max_words: int) -> str:
+        """Return a random sentence, picked from a pool as joining words is slow."""
+        texts = self._texts.get((min_words, max_words))
+        if texts is None:
+            texts = self._texts[min_words, max_words] = [
+                " ".join(
+                    self.rng.choices(WORDS, k=self.rng.randint(min_words, max_words)),
+                ).capitalize()
+                for _ in range(TEXT_POOL_SIZE)
+            ]
+        return self.rng.choice(texts)
+
+    def _draw_likers(self, count: int) -> list[int]:
+        """Return `count` distinct users drawn from the power law of the authors."""
+        users = set()
+        for _ in range(4 * count):
+            if len(users) == count:
+                break
+            users.add(self.authors.sample())
+        if len(users) < count:
+            # the unpopular users are rarely drawn, the last ones are picked uniformly
+            missing = [user for user in range(self.options.users) if user not in users]
+            users.update(self.rng.sample(missing, count - len(users)))
+        return sorted(users)
+
+    def generate(self) -> Iterator[Batch]:
+        """
+        Generate the rows.
+
+        Returns
+        -------
+            Iterator[Batch]: The tables and their batches of rows, the referenced rows first.
+        """
+        yield from self.generate_users()
+        yield from self.generate_categories()
+        yield from self.generate_threads()
+        yield from self.generate_posts()
+        yield from self.generate_chats()
+
+    def generate_users(self) -> Iterator[Batch]:
+        """Generate the users and their roles."""
+        prefix = self.options.prefix
+        field = User.Meta.model_fields["roles"]
+        users_roles = field.through.Meta.table
+        user_column = field.default_source_field_name()
+        role_column = field.default_target_field_name()
+        avatar = User.Meta.model_fields["avatar"].default
+        for start, stop in self._batches(self.options.users):
+            users = []
+            for i in range(start, stop):
+                created_at = self._spread(i, self.options.users)
+                users.append(
+                    {
+                        "id": self.user_ids[i],
+                        "username": f"{prefix}_user_{i}",
+                        "email": f"{prefix}_user_{i}@example.com",
+                        "password": self.password,
+                        "secret_salt": uuid.UUID(int=self.rng.getrandbits(128)).hex,
+                        "is_activated": True,
+                        "is_superuser": False,
+                        "avatar": avatar,
+                        "display_role": self.role_id,
+                        "threads_count": self.user_threads[i],
+                        "posts_count": self.user_posts[i],
+                        "likes_count": self.user_likes[i],
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    },
+                )
+            yield User.Meta.table, users
+            yield (
+                users_roles,
+                [
+                    {user_column: user["id"], role_column: self.role_id}
+                    for user in users
+                ],
+            )
+
+    def generate_categories(self) -> Iterator[Batch]:
+        """Generate the categories."""
+        yield (
+            Category.Meta.table,
+            [
+                {
+                    "id": self.category_ids[i],
+                    "name": f"{self.options.prefix}_category_{i}",
+                    "description": self._text(5, 20),
+                    "type": CategoryTypeEnum.PUBLIC.value,
+                    "threads_count": self.category_threads[i],
+                    "created_at": self.start,
+                    "updated_at": self.start,
+                }
+                for i in range(self.options.categories)
+            ],
+        )
+
+    def generate_threads(self) -> Iterator[Batch]:
+        """Generate the threads."""
+        self.thread_ids = []
+        for start, stop in self._batches(self.options.threads):
+            threads = []
+            for i in range(start, stop):
+                created_at = self._spread(i, self.options.threads)
+                threads.append(
+                    {
+                        "id": self._to_uuid7(created_at),
+                        "title": self._text(2, 8)[:64],
+                        "content": self._text(10, 100),
+                        "is_closed": False,
+                        "is_pinned": False,
+                        "category": self.category_ids[self.thread_categories[i]],
+                        "author": self.user_ids[self.thread_authors[i]],
+                        "post_count": self.thread_posts[i],
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    },
+                )
+            self.thread_ids.extend(thread["id"] for thread in threads)
+            yield Thread.Meta.table, threads
+
+    def generate_posts(self) -> Iterator[Batch]:
+        """Generate the posts, their threads and likes."""
+        threads_field = Thread.Meta.model_fields["posts"]
+        threads_posts = threads_field.through.Meta.table
+        thread_column = threads_field.default_source_field_name()
+        post_column = threads_field.default_target_field_name()
+        likes_field = Post.Meta.model_fields["likes"]
+        posts_likes = likes_field.through.Meta.table
+        liked_post_column = likes_field.default_source_field_name()
+        like_column = likes_field.default_target_field_name()
+        for start, stop in self._batches(self.options.posts):
+            posts, threads, likes, post_likes = [], [], [], []
+            for i in range(start, stop):
+                thread = self.post_threads[i]
+                created_at = self._after(self._spread(thread, self.options.threads))
+                post_id = self._to_uuid7(created_at)
+                posts.append(
+                    {
+                        "id": post_id,
+                        "author": self.user_ids[self.post_authors[i]],
+                        "content": self._text(5, 80),
+                        "likes_count": self.post_likes[i],
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    },
+                )
+                threads.append(
+                    {thread_column: self.thread_ids[thread], post_column: post_id},
+                )
+                for author in self._draw_likers(self.post_likes[i]):
+                    liked_at = self._after(created_at)
+                    like_id = self._to_uuid7(liked_at)
+                    likes.append(
+                        {
+                            "id": like_id,
+                            "author": self.user_ids[author],
+                            "created_at": liked_at,
+                            "updated_at": liked_at,
+                        },
+                    )
+                    post_likes.append(
+                        {liked_post_column: post_id, like_column: like_id},
+                    )
+            yield Post.Meta.table, posts
+            yield threads_posts, threads
+            if likes:
+                yield Like.Meta.table, likes
+                yield posts_likes, post_likes
+
+    def generate_chats(self) -> Iterator[Batch]:
+        """Generate the chat messages of the global room."""
+        for start, stop in self._batches(self.options.chats):
+            chats = []
+            for i in range(start, stop):
+                created_at = self._spread(i, self.options.chats)
+                chats.append(
+                    {
+                        "id": self._to_uuid7(created_at),
+                        "author": self.user_ids[self.authors.sample()],
+                        "message": self._text(1, 30)[:500],
+                        "room": GLOBAL_ROOM,
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    },
+                )
+            yield Chat.Meta.table, chats
+
+
+class BulkWriter:
+    """
+    Writer of batches of rows with executemany.
+
+    Attributes
+    ----------
+        connection (sqlalchemy.engine.Connection): The connection.
+        counts (Counter): The number of written rows per table.
+    """
+
+    def __init__(self, connection: sqlalchemy.engine.Connection) -> None:
+        """Initialize the BulkWriter."""
+        self.connection = connection
+        self.counts: Counter = Counter()
+
+    def write(self, table: sqlalchemy.Table, rows: list[dict]) -> None:
+        """
+        Write a batch of rows.
+
+        Args:
+        ----
+            table (sqlalchemy.Table): The table.
+            rows (list[dict]): The rows, with the same columns.
+        """
+        self.connection.execute(table.insert(), rows)
+        self.counts[table.name] += len(rows)
+
+
+class CopyWriter(BulkWriter):
+    """
+    Writer of batches of rows with the PostgreSQL `COPY`.
+
+    The rows are sent as CSV, with the values converted by the bind processors of the
+    columns like in an insert, which is an order of magnitude faster than executemany.
+    Every value is quoted and None is sent as an unquoted empty field, which COPY reads as
+    NULL, while a quoted empty field stays an empty string.
+    """
+
+    def write(self, table: sqlalchemy.Table, rows: list[dict]) -> None:
+        """
+        Write a batch of rows.
+
+        Args:
+        ----
+            table (sqlalchemy.Table): The table.
+            rows (list[dict]): The rows, with the same columns.
+        """
+        dialect = self.connection.dialect
+        preparer = dialect.identifier_preparer
+        columns = list(rows[0])
+        processors = [table.c[name].type.bind_processor(dialect) for name in columns]
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(
+                ",".join(
+                    _to_copy_field(
+                        value if value is None or process is None else process(value),
+                    )
+                    for value, process in zip(
+                        (row[name] for name in columns),
+                        processors,
+                    )
+                ),
+            )
+            buffer.write("\n")
+        buffer.seek(0)
+        statement = (
+            f"COPY {preparer.format_table(table)} "
+            f"({', '.join(preparer.quote(name) for name in columns)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+        self.counts[table.name] += len(rows)
+
+
+def _to_copy_field(value: Any) -> str:
+    """Return the CSV field of a value, only an unquoted empty field is NULL."""
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def get_sync_engine() -> sqlalchemy.engine.Engine:
+    """
+    Create a synchronous engine for the database of the application.
+
+    Returns
+    -------
+        sqlalchemy.engine.Engine: The engine.
+    """
+    return sqlalchemy.create_engine(str(database.url.replace(driver="")))
+
+
+def get_writer(connection: sqlalchemy.engine.Connection) -> BulkWriter:
+    """
+    Get the fastest writer of a connection.
+
+    Args:
+    ----
+        connection (sqlalchemy.engine.Connection): The connection.
+
+    Returns:
+    -------
+        BulkWriter: A CopyWriter on PostgreSQL, else a BulkWriter.
+    """
+    if connection.dialect.name == "postgresql":
+        return CopyWriter(connection)
+    return BulkWriter(connection)
+
+
+def reset_database(engine: sqlalchemy.engine.Engine) -> None:
+    """
+    Drop and create the tables.
+
+    Call it before connecting to the database, SQLite would lock the tables otherwise.
+
+    Args:
+    ----
+        engine (sqlalchemy.engine.Engine): The synchronous engine.
+    """
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+
+def write_dataset(
+    engine: sqlalchemy.engine.Engine,
+    batches: Iterable[Batch],
+) -> dict[str, int]:
+    """
+    Write the rows of a generator within one transaction.
+
+    Args:
+    ----
+        engine (sqlalchemy.engine.Engine): The synchronous engine.
+        batches (Iterable[Batch]): The tables and their batches of rows.
+
+    Returns:
+    -------
+        dict[str, int]: The number of written rows per table.
+    """
+    with engine.begin() as connection:
+        writer = get_writer(connection)
+        for table, rows in batches:
+            writer.write(table, rows)
+    return dict(writer.counts)
+
+
+async def generate_dataset(options: DatasetOptions) -> dict[str, int]:
+    """
+    Generate a dataset in the database of the application.
+
+    The default scopes and roles are created when missing, every user gets the user role.
+    The rows are generated and written in a worker thread and the cached queries of the
+    written tables are invalidated afterwards. The database must be connected.
+
+    Args:
+    ----
+        options (DatasetOptions): The options.
+
+    Returns:
+    -------
+        dict[str, int]: The number of written rows per table.
+    """
+    scopes_service = await get_scopes_service()
+    await MainService.create_default_scopes(scopes_service=scopes_service)
+    roles_service = await get_roles_service()
+    await roles_service.create_default_roles(scopes_service=scopes_service)
+    role = await roles_service.get_one(tag=ProtectedDefaultRolesTagEnum.USER.value)
+    password = get_password_hash(options.password)
+
+    def write() -> dict[str, int]:
+        engine = get_sync_engine()
+        try:
+            generator = DatasetGenerator(options, role.id, password)
+            return write_dataset(engine, generator.generate())
+        finally:
+            engine.dispose()
+
+    counts = await run_in_threadpool(write)
+    for table in counts:
+        await service_cache.invalidate(table)
+    return counts
@@ -0,0 +1,432 @@
+"""
+Per-process subscription hub.
+
+This module contains SubscriptionHub class which holds a single broadcast subscription per
+channel and fans the messages out to the local websocket connections through their bounded
+ConnectionQueue, so a slow client never holds up the others, and LazyBroadcast which
+imports the broadcast backend when it connects.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
+
+from broadcaster import Broadcast
+
+from sharkservers.enums import OverflowPolicyEnum
+from sharkservers.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from broadcaster._base import Subscriber
+
+
+class LazyBroadcast(Broadcast):
+    """
+    Broadcast creating its backend when it connects.
+
+    The backend of a `redis://` URL imports asyncio_redis, a process which never connects,
+    e.g. a migration or a CLI command, does not need it.
+    """
+
+    def __init__(self, url: str) -> None:
+        """Initialize the LazyBroadcast."""
+        self.url = url
+        self._subscribers = {}
+
+    async def connect(self) -> None:
+        """Create the backend and connect to it."""
+        if not hasattr(self, "_backend"):
+            super().__init__(self.url)
+        await super().connect()
+
+
+class HubMessage:
+    """
+    Message received from a channel and shared by all the local subscribers.
+
+    Attributes
+    ----------
+        channel (str): The channel the message was published on.
+        text (str): The raw message.
+    """
+
+    def __init__(self, channel: str, text: str) -> None:
+        """Initialize the HubMessage."""
+        self.channel = channel
+        self.text = text
+
+    @cached_property
+    def data(self) -> Any:
+        """
+        Return the decoded JSON message, decoded once for all the subscribers.
+
+        Returns
+        -------
+            Any: The decoded message.
+        """
+        return json.loads(self.text)
+
+
+class SubscriptionClosedError(Exception):
+    """Raised to the consumer of a queue whose channel subscription ended."""
+
+
+class SlowConsumerError(SubscriptionClosedError):
+    """Raised to the consumer of a queue which overflowed with the disconnect policy."""
+
+
+class ConnectionQueue:
+    """
+    Bounded send queue of a single websocket connection.
+
+    Putting never blocks the producer. When the queue is full the overflow policy decides
+    whether the oldest message is dropped, the queued messages of the same channel are
+    replaced or the consumer is disconnected.
+
+    Attributes
+    ----------
+        maxsize (int): The maximum number of queued messages.
+        policy (OverflowPolicyEnum): The overflow policy.
+        enqueued (int): The number of messages put on the queue.
+        dropped (int): The number of messages dropped or replaced.
+        max_lag (int): The highest number of queued messages seen.
+        overflowed (bool): Whether the queue overflowed with the disconnect policy.
+        closed (bool): Whether the channel subscription of the queue ended.
+
+    Methods
+    -------
+        put: Queue a message without blocking.
+        get: Wait for the next message.
+        close: End the queue after its channel subscription ended.
+        lag: Return the number of queued messages.
+        lag_seconds: Return the age of the oldest queued message.
+        stats: Return the lag metrics.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100,
+        policy: OverflowPolicyEnum = OverflowPolicyEnum.DROP_OLDEST,
+    ) -> None:
+        """Initialize the ConnectionQueue."""
+        self.maxsize = maxsize
+        self.policy = policy
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_lag = 0
+        self.overflowed = False
+        self.closed = False
+        self._messages: deque[tuple[float, HubMessage]] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, message: HubMessage) -> None:
+        """
+        Queue a message without blocking.
+
+        Args:
+        ----
+            message (HubMessage): The message to send.
+        """
+        if self.overflowed or self.closed:
+            return
+        self.enqueued += 1
+        if self.policy == OverflowPolicyEnum.COALESCE:
+            queued = len(self._messages)
+            self._messages = deque(
+                item for item in self._messages if item[1].channel != message.channel
+            )
+            self.dropped += queued - len(self._messages)
+        if len(self._messages) >= self.maxsize:
+            if self.policy == OverflowPolicyEnum.DISCONNECT:
+                self.overflowed = True
+                self.dropped += len(self._messages) + 1
+                self._messages.clear()
+                self._ready.set()
+                return
+            self._messages.popleft()
+            self.dropped += 1
+        self._messages.append((time.monotonic(), message))
+        self.max_lag = max(self.max_lag, len(self._messages))
+        self._ready.set()
+
+    async def get(self) -> HubMessage:
+        """
+        Wait for the next message.
+
+        Returns
+        -------
+            HubMessage: The oldest queued message.
+
+        Raises
+        ------
+            SlowConsumerError: If the queue overflowed with the disconnect policy.
+            SubscriptionClosedError: If the queue was closed and has no queued message.
+        """
+        while not self._messages:
+            if self.overflowed:
+                msg = "Websocket send queue overflowed"
+                raise SlowConsumerError(msg)
+            if self.closed:
+                msg = "Channel subscription ended"
+                raise SubscriptionClosedError(msg)
+            self._ready.clear()
+            await self._ready.wait()
+        return self._messages.popleft()[1]
+
+    def close(self) -> None:
+        """End the queue, the consumer gets the queued messages then an error."""
+        self.closed = True
+        self._ready.set()
+
+    def get_nowait(self) -> HubMessage:
+        """
+        Return the next message without waiting.
+
+        Returns
+        -------
+            HubMessage: The oldest queued message.
+
+        Raises
+        ------
+            asyncio.QueueEmpty: If there is no queued message.
+        """
+        if not self._messages:
+            raise asyncio.QueueEmpty
+        return self._messages.popleft()[1]
+
+    def empty(self) -> bool:
+        """
+        Return whether there is no queued message.
+
+        Returns
+        -------
+            bool: True if the queue is empty.
+        """
+        return not self._messages
+
+    def lag(self) -> int:
+        """
+        Return the number of queued messages.
+
+        Returns
+        -------
+            int: The number of queued messages.
+        """
+        return len(self._messages)
+
+    def lag_seconds(self) -> float:
+        """
+        Return the age of the oldest queued message.
+
+        Returns
+        -------
+            float: The age in seconds, 0 when the queue is empty.
+        """
+        if not self._messages:
+            return 0.0
+        return time.monotonic() - self._messages[0][0]
+
+    def stats(self) -> dict:
+        """
+        Return the lag metrics.
+
+        Returns
+        -------
+            dict: The queued, enqueued and dropped messages, the highest lag and the age of
+                the oldest queued message.
+        """
+        return {
+            "lag": self.lag(),
+            "lag_seconds": self.lag_seconds(),
+            "max_lag": self.max_lag,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+        }
+
+
+class SubscriptionHub:
+    """
+    Process level hub of the broadcast subscriptions.
+
+    The first local subscriber of a channel starts a listener task subscribed to the
+    broadcast, the last one leaving stops it. Every received message is put as the same
+    HubMessage instance on the ConnectionQueue of each local subscriber. When the broadcast
+    subscription fails, the queues of the channel are closed so their consumers stop.
+
+    Attributes
+    ----------
+        broadcast (Broadcast): The broadcast to subscribe to.
+        queue_size (int): The default size of the connection queues.
+        policy (OverflowPolicyEnum): The default overflow policy of the connection queues.
+        received (int): The number of messages received from the broadcast.
+        delivered (int): The number of messages put on the connection queues.
+
+    Methods
+    -------
+        subscribe: Subscribe a local connection to a channel.
+        subscribers_count: Return the number of local subscribers of a channel.
+        stats: Return the lag metrics of the local subscribers.
+        close: Stop all the listener tasks and close the subscriber queues.
+    """
+
+    def __init__(
+        self,
+        broadcast: Broadcast,
+        queue_size: int = 100,
+        policy: OverflowPolicyEnum = OverflowPolicyEnum.DROP_OLDEST,
+    ) -> None:
+        """Initialize the SubscriptionHub."""
+        self.broadcast = broadcast
+        self.queue_size = queue_size
+        self.policy = policy
+        self.received = 0
+        self.delivered = 0
+        self._subscribers: dict[str, set[ConnectionQueue]] = {}
+        self._listeners: dict[str, asyncio.Task] = {}
+        self._stops: dict[str, asyncio.Event] = {}
+
+    @asynccontextmanager
+    async def subscribe(
+        self,
+        channel: str,
+        policy: OverflowPolicyEnum | None = None,
+    ) -> AsyncIterator[ConnectionQueue]:
+        """
+        Subscribe a local connection to a channel.
+
+        Args:
+        ----
+            channel (str): The channel to subscribe to.
+            policy (OverflowPolicyEnum, optional): The overflow policy of the connection queue.
+                Defaults to the hub policy.
+
+        Yields:
+        ------
+            ConnectionQueue: The queue receiving the channel messages.
+        """
+        queue = ConnectionQueue(maxsize=self.queue_size, policy=policy or self.policy)
+        subscribers = self._subscribers.setdefault(channel, set())
+        subscribers.add(queue)
+        try:
+            if channel not in self._listeners:
+                ready = asyncio.Event()
+                stop = self._stops[channel] = asyncio.Event()
+                self._listeners[channel] = asyncio.create_task(
+                    self._listen(channel, ready, stop),
+                )
+                await ready.wait()
+            yield queue
+        finally:
+            subscribers.discard(queue)
+            if queue.dropped:
+                logger.warning(f"Slow {channel} subscriber -> {queue.stats()}")
+            if not subscribers:
+                del self._subscribers[channel]
+                await self._stop_listener(channel)
+
+    def subscribers_count(self, channel: str) -> int:
+        """
+        Return the number of local subscribers of a channel.
+
+        Args:
+        ----
+            channel (str): The channel.
+
+        Returns:
+        -------
+            int: The number of subscribers.
+        """
+        return len(self._subscribers.get(channel, ()))
+
+    def stats(self) -> dict[str, list[dict]]:
+        """
+        Return the lag metrics of the local subscribers.
+
+        Returns
+        -------
+            dict[str, list[dict]]: The metrics of each subscriber queue by channel.
+        """
+        return {
+            channel: [queue.stats() for queue in subscribers]
+            for channel, subscribers in self._subscribers.items()
+        }
+
+    async def close(self) -> None:
+        """Stop all the listener tasks and close the subscriber queues."""
+        for channel in list(self._listeners):
+            await self._stop_listener(channel)
+        self._close_queues()
+
+    def _close_queues(self, channel: str | None = None) -> None:
+        channels = list(self._subscribers) if channel is None else [channel]
+        for name in channels:
+            for queue in self._subscribers.get(name, ()):
+                queue.close()
+
+    async def _stop_listener(self, channel: str) -> None:
+        task = self._listeners.pop(channel, None)
+        stop = self._stops.pop(channel, None)
+        if task is None:
+            return
+        # a cancelled broadcast subscription never unsubscribes, the listener leaves it
+        stop.set()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _listen(
+        self,
+        channel: str,
+        ready: asyncio.Event,
+        stop: asyncio.Event,
+    ) -> None:
+        try:
+            async with self.broadcast.subscribe(channel=channel) as subscriber:
+                ready.set()
+                await self._receive(channel, subscriber, stop)
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Subscription to {channel} failed -> {e!r}")
+            if not stop.is_set():
+                # the next subscriber starts a new listener
+                self._listeners.pop(channel, None)
+                self._stops.pop(channel, None)
+                self._close_queues(channel)
+        finally:
+            ready.set()
+
+    async def _receive(
+        self,
+        channel: str,
+        subscriber: Subscriber,
+        stop: asyncio.Event,
+    ) -> None:
+        stopping = asyncio.ensure_future(stop.wait())
+        receiving = None
+        try:
+            while True:
+                receiving = asyncio.ensure_future(subscriber.get())
+                await asyncio.wait(
+                    {receiving, stopping},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if stop.is_set():
+                    receiving.cancel()
+                    return
+                # raises Unsubscribed when the broadcast disconnects
+                message = HubMessage(channel, receiving.result().message)
+                self.received += 1
+                for queue in self._subscribers.get(channel, ()):
+                    queue.put(message)
+                    self.delivered += 1
+        finally:
+            stopping.cancel()
+            if receiving is not None:
+                receiving.cancel()
@@ -0,0 +1,224 @@
+"""
+Per-request instrumentation of the database queries.
+
+It includes the following classes and functions:
+- QueryStats: Records the queries run within a request and detects the N+1 patterns.
+- collect_queries: Records the queries run within the block.
+- instrument_database: Wraps the query methods of a database to feed the active QueryStats.
+"""
+from __future__ import annotations
+
+import functools
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+
+    import databases
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+INSTRUMENTED_METHODS = (
+    "execute",
+    "execute_many",
+    "fetch_all",
+    "fetch_one",
+    "fetch_val",
+)
+
+
+class QueryStats:
+    """
+    Queries run within a request.
+
+    Attributes
+    ----------
+        count (int): The number of queries.
+        duration (float): The total time spent in the database in seconds.
+        shapes (Counter[str]): The number of runs of every statement shape.
+        slowest (list[tuple[float, str]]): The slowest statements with their duration.
+    """
+
+    def __init__(self, n_plus_one_threshold: int = 5, slowest_count: int = 3) -> None:
+        """
+        Initialize the QueryStats.
+
+        Args:
+        ----
+            n_plus_one_threshold (int, optional): The number of runs of the same statement
+                shape reported as N+1. Defaults to 5.
+            slowest_count (int, optional): The number of slowest statements kept. Defaults to 3.
+        """
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slowest_count = slowest_count
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter[str] = Counter()
+        self.slowest: list[tuple[float, str]] = []
+
+    def record(self, shape: str, duration: float) -> None:
+        """
+        Record a query.
+
+        Args:
+        ----
+            shape (str): The statement with placeholders instead of the values.
+            duration (float): The duration of the query in seconds.
+        """
+        self.count += 1
+        self.duration += duration
+        self.shapes[shape] += 1
+        if len(self.slowest) < self.slowest_count or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, shape))
+            self.slowest.sort(key=lambda entry: entry[0], reverse=True)
+            del self.slowest[self.slowest_count :]
+
+    def get_n_plus_one(self) -> dict[str, int]:
+        """
+        Get the statement shapes repeated at least `n_plus_one_threshold` times.
+
+        Returns
+        -------
+            dict[str, int]: The number of runs per repeated statement shape.
+        """
+        return {
+            shape: count
+            for shape, count in self.shapes.items()
+            if count >= self.n_plus_one_threshold
+        }
+
+    def get_server_timing(self) -> str:
+        """
+        Get the `Server-Timing` header value.
+
+        Returns
+        -------
+            str: The header value, e.g. `db;dur=1.23;desc="4 queries"`.
+        """
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+    def get_report(self) -> str:
+        """
+        Get the summary of the queries for the log.
+
+        Returns
+        -------
+            str: The summary.
+        """
+        slowest = "; ".join(
+            f"{duration * 1000:.2f}ms {_shorten(shape)}"
+            for duration, shape in self.slowest
+        )
+        return (
+            f"{self.count} queries in {self.duration * 1000:.2f}ms, slowest: {slowest}"
+        )
+
+
+@contextmanager
+def collect_queries(
+    n_plus_one_threshold: int = 5,
+    slowest_count: int = 3,
+) -> Iterator[QueryStats]:
+    """
+    Record the queries run within the block, including the tasks started in it.
+
+    Args:
+    ----
+        n_plus_one_threshold (int, optional): The number of runs of the same statement
+            shape reported as N+1. Defaults to 5.
+        slowest_count (int, optional): The number of slowest statements kept. Defaults to 3.
+
+    Yields:
+    ------
+        QueryStats: The recorded queries.
+    """
+    stats = QueryStats(
+        n_plus_one_threshold=n_plus_one_threshold,
+        slowest_count=slowest_count,
+    )
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def get_statement_shape(query: Any) -> str:
+    """
+    Get the shape of a statement, i.e. its SQL with placeholders instead of the values.
+
+    Args:
+    ----
+        query (Any): The SQLAlchemy statement or raw SQL.
+
+    Returns:
+    -------
+        str: The statement shape.
+    """
+    return query if isinstance(query, str) else str(query)
+
+
+def instrument_database(database: databases.Database) -> databases.Database:
+    """
+    Wrap the query methods of a database to feed the active QueryStats.
+
+    Outside of `collect_queries` the wrappers only look up the context variable.
+
+    Args:
+    ----
+        database (databases.Database): The database.
+
+    Returns:
+    -------
+        databases.Database: The same database.
+    """
+    if getattr(database, "_instrumented", False):
+        return database
+    for name in INSTRUMENTED_METHODS:
+        setattr(database, name, _instrument(getattr(database, name)))
+    database.iterate = _instrument_iterate(database.iterate)
+    database._instrumented = True  # noqa: SLF001
+    return database
+
+
+def _instrument(
+    method: Callable[..., Awaitable[Any]],
+) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(method)
+    async def wrapper(query: Any, *args: Any, **kwargs: Any) -> Any:
+        stats = _query_stats.get()
+        if stats is None:
+            return await method(query, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await method(query, *args, **kwargs)
+        finally:
+            stats.record(get_statement_shape(query), time.perf_counter() - start)
+
+    return wrapper
+
+
+def _instrument_iterate(
+    method: Callable[..., AsyncIterator[Any]],
+) -> Callable[..., AsyncIterator[Any]]:
+    @functools.wraps(method)
+    async def wrapper(query: Any, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        stats = _query_stats.get()
+        start = time.perf_counter()
+        try:
+            async for record in method(query, *args, **kwargs):
+                yield record
+        finally:
+            if stats is not None:
+                stats.record(get_statement_shape(query), time.perf_counter() - start)
+
+    return wrapper
+
+
+def _shorten(shape: str, length: int = 120) -> str:
+    shape = " ".join(shape.split())
+    return shape if len(shape) <= length else f"{shape[:length]}..."
@@ -5,65 +5,76 @@ It contains the FastAPI application setup, including routes, middlewares, and We
 """
 
 import os
-from typing import TYPE_CHECKING
+import secrets
 
 import anyio
 from aiocron import crontab
 from fastapi import (
     Depends,
     FastAPI,
+    Header,
     HTTPException,
-    Response,
     WebSocket,
     WebSocketDisconnect,
+    status,
 )
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi_events.handlers.local import local_handler
 from fastapi_events.middleware import EventHandlerASGIMiddleware
 from fastapi_pagination import add_pagination
-from jose import JWTError
 from starlette.middleware.cors import CORSMiddleware
-from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 from starlette.staticfiles import StaticFiles
 
 from sharkservers.__version import VERSION
-from sharkservers.auth.dependencies import (
-    get_access_token_service,
-)
-from sharkservers.auth.services.auth import AuthService
-from sharkservers.auth.utils import now_datetime
 from sharkservers.auth.views import router as auth_router_v1
-from sharkservers.chat.dependencies import get_chat_service, ws_get_current_user
+from sharkservers.chat.dependencies import (
+    get_chat_service,
+    ws_get_current_user,
+    ws_get_valid_room,
+)
 from sharkservers.chat.services import ChatService
 from sharkservers.chat.views import router as chat_router
 from sharkservers.chat.websocket import chatroom_ws_receiver, chatroom_ws_sender
+from sharkservers.counters import CounterReconciler
+from sharkservers.enums import OverflowPolicyEnum
 from sharkservers.exception_handlers import (
     http_exception_handler,
     request_validation_exception_handler,
     unhandled_exception_handler,
 )
-from sharkservers.forum.dependencies import (
-    get_categories_service,
-    get_posts_service,
-    get_threads_service,
-)
+from sharkservers.forum.counters import FORUM_COUNTERS
 from sharkservers.forum.views import (
     admin_router_v1 as admin_forum_router,
 )
 from sharkservers.forum.views import (
     router_v1 as forum_router,
 )
+from sharkservers.hub import SubscriptionClosedError
 
 # import admin posts router
 from sharkservers.logger import logger
-from sharkservers.middleware import log_request_middleware
+from sharkservers.metrics import (
+    CONTENT_TYPE,
+    metrics_publisher,
+    time_job,
+    websocket_connections,
+)
+from sharkservers.middleware import (
+    LogRequestMiddleware,
+    MetricsMiddleware,
+    QueryInstrumentationMiddleware,
+    UserLastOnlineMiddleware,
+)
 from sharkservers.players.views import router as steamprofile_router
 from sharkservers.players.views_admin import router as admin_steamprofiles_router
+from sharkservers.responses import FastJSONResponse, add_fast_json_responses
 from sharkservers.roles.views import router as roles_router
 from sharkservers.roles.views_admin import router as admin_roles_router
 from sharkservers.scopes.views import router as scopes_router
 from sharkservers.scopes.views_admin import router as admin_scopes_router
+from sharkservers.servers.poller import ServerStatusPoller
 from sharkservers.servers.views.admin.admins import (
     router as admin_servers_admin_users_router,
 )
@@ -72,9 +83,9 @@ from sharkservers.servers.views.admin.admins_groups import (
 )
 from sharkservers.servers.views.admin.servers import router as admin_servers_router
 from sharkservers.servers.views.servers import router as servers_router
-from sharkservers.settings import Settings, get_settings
+from sharkservers.settings import get_settings
 from sharkservers.subscryptions.views import router as subscryptions_router
-from sharkservers.users.dependencies import get_users_service
+from sharkservers.users.services import PresenceService
 
 # Admin Routes
 from sharkservers.users.views.admin import (
@@ -89,12 +100,6 @@ from sharkservers.utils import app_lifespan, custom_generate_unique_id
 # Routers
 from sharkservers.views import router as root_router
 
-if TYPE_CHECKING:
-    from sharkservers.auth.schemas import TokenDataSchema
-    from sharkservers.auth.services.jwt import JWTService
-    from sharkservers.users.services import UserService
-
-
 script_dir = os.path.dirname(__file__)  # noqa: PTH120
 st_abs_file_path = os.path.join(script_dir, "../static/")  # noqa: PTH118
 installed_file_path = os.path.join(script_dir, "installed")  # noqa: PTH118
@@ -170,26 +175,56 @@ def init_routes(_app: FastAPI) -> FastAPI:
 
 
 @crontab("* 5 * * *")
+@time_job("update_tables_counters")
 async def update_tables_counters() -> None:
     """Cron job function to update the counters in the database tables."""
     try:
         logger.info("Updating tables counters")
-        categories_service = await get_categories_service()
-        threads_service = await get_threads_service()
-        posts_service = await get_posts_service()
-        users_service = await get_users_service()
-        await categories_service.sync_counters()
-        await threads_service.sync_counters()
-        await posts_service.sync_counters()
-        await users_service.sync_counters(
-            threads_service=threads_service,
-            posts_service=posts_service,
+        report = await CounterReconciler(FORUM_COUNTERS).reconcile()
+        logger.info(
+            f"Finished updating tables counters -> {sum(report.values())} drifted",
         )
-        logger.info("Finished updating tables counters")
     except Exception as e:  # noqa: BLE001
         logger.error(e)
 
 
+@crontab("* * * * *")
+@time_job("flush_users_presence")
+async def flush_users_presence() -> None:
+    """Cron job function to write the last online time of active users to the database."""
+    try:
+        presence_service = PresenceService(
+            redis=app.state.redis,
+            online_window=get_settings().USERS_ONLINE_WINDOW,
+        )
+        flushed = await presence_service.flush()
+        logger.info(f"Flushed users presence -> {flushed}")
+    except Exception as e:  # noqa: BLE001
+        logger.error(e)
+
+
+async def verify_metrics_token(authorization: str = Header("")) -> None:
+    """
+    Require the METRICS_TOKEN bearer token, the metrics are disabled without a token.
+
+    Args:
+    ----
+        authorization (str): The Authorization header.
+
+    Raises:
+    ------
+        HTTPException: If the metrics are disabled or the token is invalid.
+    """
+    token = get_settings().METRICS_TOKEN
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 def add_middlewares(_app: FastAPI) -> FastAPI:
     """
     Add middlewares to the FastAPI application.
@@ -202,31 +237,7 @@ def add_middlewares(_app: FastAPI) -> FastAPI:
     -------
         FastAPI: The FastAPI application instance with the middlewares added.
     """
-
-    @_app.middleware("http")
-    async def update_user_last_online_time_middleware(
-        request: Request,
-        call_next,  # noqa: ANN001
-    ) -> Response:
-        settings: Settings = get_settings()  # Add type annotation for settings
-        response: Response = await call_next(request)
-        if "Authorization" not in request.headers:
-            return response
-        try:
-            access_token_service: JWTService = await get_access_token_service(
-                settings=settings,
-            )  # Import AccessTokenService and use the correct type
-            jwt_token: str = await AuthService.oauth2_scheme(request=request)
-            token_data: TokenDataSchema = access_token_service.decode_token(
-                jwt_token,
-            )  # Import TokenData and use the correct type
-            users_service: UserService = await get_users_service()
-            user = await users_service.get_one(id=token_data.user_id.uuid)
-            await user.update(last_online=now_datetime())
-            return response  # noqa: TRY300
-        except (JWTError, HTTPException):
-            return response
-
+    _app.add_middleware(UserLastOnlineMiddleware)
     _app.add_middleware(GZipMiddleware)
     _app.add_middleware(
         CORSMiddleware,
@@ -247,7 +258,14 @@ def add_middlewares(_app: FastAPI) -> FastAPI:
         handlers=[local_handler],
         middleware_id=event_handler_id,
     )
-    _app.middleware("http")(log_request_middleware)
+    settings = get_settings()
+    if settings.QUERY_INSTRUMENTATION:
+        _app.add_middleware(
+            QueryInstrumentationMiddleware,
+            n_plus_one_threshold=settings.QUERY_N_PLUS_ONE_THRESHOLD,
+        )
+    _app.add_middleware(LogRequestMiddleware)
+    _app.add_middleware(MetricsMiddleware)
     return _app
 
 
@@ -265,11 +283,13 @@ def create_app() -> FastAPI:
         debug=True,
         generate_unique_id_function=custom_generate_unique_id,
         lifespan=app_lifespan,
+        default_response_class=FastJSONResponse,
     )
     _app = add_middlewares(_app)
     _app.mount("/static", StaticFiles(directory=st_abs_file_path), name="static")
     init_routes(_app)
     add_pagination(_app)
+    add_fast_json_responses(_app)
     _app.add_exception_handler(
         RequestValidationError,
         request_validation_exception_handler,
@@ -282,29 +302,60 @@ def create_app() -> FastAPI:
         websocket: WebSocket,
         chat_service: ChatService = Depends(get_chat_service),
         author=Depends(ws_get_current_user),  # noqa: ANN001
+        room: str = Depends(ws_get_valid_room),
     ) -> None:
-        try:
-            logger.info(_app.state.broadcast)
-            await websocket.accept()
-
-            async with anyio.create_task_group() as task_group:
-                # run until first is complete
-                async def run_chatroom_ws_receiver() -> None:
-                    await chatroom_ws_receiver(
-                        websocket=websocket,
-                        chat_service=chat_service,
-                        author=author,
-                    )
+        with websocket_connections.track(endpoint="chat"):
+            try:
+                logger.info(_app.state.broadcast)
+                await websocket.accept()
+
+                async with anyio.create_task_group() as task_group:
+                    # run until first is complete
+                    async def run_chatroom_ws_receiver() -> None:
+                        await chatroom_ws_receiver(
+                            websocket=websocket,
+                            chat_service=chat_service,
+                            author=author,
+                            room=room,
+                        )
+                        await task_group.cancel_scope.cancel()
+
+                    task_group.start_soon(run_chatroom_ws_receiver)
+                    await chatroom_ws_sender(websocket, room=room)
                     await task_group.cancel_scope.cancel()
-
-                task_group.start_soon(run_chatroom_ws_receiver)
-                await chatroom_ws_sender(
-                    websocket,
-                    chat_service=chat_service,
-                    author=author,
-                )
-        except WebSocketDisconnect:
-            pass
+            except WebSocketDisconnect:
+                pass
+
+    @_app.websocket("/ws/servers")
+    async def servers_status_websocket_endpoint(websocket: WebSocket) -> None:
+        with websocket_connections.track(endpoint="servers"):
+            try:
+                await websocket.accept()
+                snapshot = await _app.state.redis.get(ServerStatusPoller.snapshot_key)
+                if snapshot is not None:
+                    await websocket.send_text(
+                        snapshot.decode() if isinstance(snapshot, bytes) else snapshot,
+                    )
+                # only the latest snapshot matters to a client lagging behind
+                async with _app.state.hub.subscribe(
+                    channel=ServerStatusPoller.channel,
+                    policy=OverflowPolicyEnum.COALESCE,
+                ) as queue:
+                    while True:
+                        await websocket.send_text((await queue.get()).text)
+            except SubscriptionClosedError:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            except WebSocketDisconnect:
+                pass
+
+    @_app.get("/metrics", tags=["metrics"], include_in_schema=False)
+    async def metrics_endpoint(
+        _: None = Depends(verify_metrics_token),
+    ) -> PlainTextResponse:
+        return PlainTextResponse(
+            await metrics_publisher.render(),
+            media_type=CONTENT_TYPE,
+        )
 
     return _app
 
@@ -1,9 +1,16 @@
 """Module contains the ConnectionManager class, which manages WebSocket connections and provides methods for sending messages."""
 from __future__ import annotations
 
+import asyncio
+import contextlib
 from typing import TYPE_CHECKING
 
-from fastapi.encoders import jsonable_encoder
+from starlette import status
+
+from sharkservers.enums import OverflowPolicyEnum
+from sharkservers.hub import ConnectionQueue, HubMessage, SlowConsumerError
+from sharkservers.responses import dumps
+from sharkservers.settings import get_settings
 
 if TYPE_CHECKING:
     from fastapi import WebSocket
@@ -12,11 +19,25 @@ if TYPE_CHECKING:
 
 
 class ConnectionManager:
-    """Manages WebSocket connections and provides methods for sending messages."""
+    """
+    Manages WebSocket connections and provides methods for sending messages.
+
+    Every connection gets a bounded ConnectionQueue drained by its own writer task, so
+    broadcasting never waits for a slow connection.
+    """
+
+    channel = "manager"
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        queue_size: int = 100,
+        policy: OverflowPolicyEnum = OverflowPolicyEnum.DROP_OLDEST,
+    ) -> None:
         """Initialize the ConnectionManager class."""
-        self.active_connections: list[WebSocket] = []
+        self.queue_size = queue_size
+        self.policy = policy
+        self.active_connections: dict[WebSocket, ConnectionQueue] = {}
+        self._writers: dict[WebSocket, asyncio.Task] = {}
 
     async def connect(self, websocket: WebSocket) -> None:
         """
@@ -28,7 +49,9 @@ class ConnectionManager:
 
         """  # noqa: D401
         await websocket.accept()
-        self.active_connections.append(websocket)
+        queue = ConnectionQueue(maxsize=self.queue_size, policy=self.policy)
+        self.active_connections[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._write(websocket, queue))
 
     def disconnect(self, websocket: WebSocket) -> None:
         """
@@ -42,7 +65,10 @@ class ConnectionManager:
         -------
             None
         """  # noqa: D401
-        self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None:
+            writer.cancel()
 
     async def send_personal_message(
         self,
@@ -61,11 +87,13 @@ class ConnectionManager:
         -------
             None
         """
-        await websocket.send_json(jsonable_encoder(chat_schema))
+        await websocket.send_text(dumps(chat_schema).decode())
 
     async def broadcast(self, chat_schema: ChatEventSchema) -> None:
         """
-        Send a message to all active WebSocket connections.
+        Queue a message for all active WebSocket connections.
+
+        The message is serialized once and the call returns without waiting for the sends.
 
         Args:
         ----
@@ -75,8 +103,33 @@ class ConnectionManager:
         -------
             None
         """
-        for connection in self.active_connections:
-            await connection.send_json(jsonable_encoder(chat_schema))
+        message = HubMessage(self.channel, dumps(chat_schema).decode())
+        for queue in self.active_connections.values():
+            queue.put(message)
 
+    def stats(self) -> list[dict]:
+        """
+        Return the lag metrics of the active connections.
 
-manager = ConnectionManager()
+        Returns
+        -------
+            list[dict]: The metrics of each connection queue.
+        """
+        return [queue.stats() for queue in self.active_connections.values()]
+
+    async def _write(self, websocket: WebSocket, queue: ConnectionQueue) -> None:
+        try:
+            while True:
+                message = await queue.get()
+                await websocket.send_text(message.text)
+        except SlowConsumerError:
+            with contextlib.suppress(RuntimeError):
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            self.active_connections.pop(websocket, None)
+            self._writers.pop(websocket, None)
+
+
+manager = ConnectionManager(
+    queue_size=get_settings().WEBSOCKET_QUEUE_SIZE,
+    policy=get_settings().WEBSOCKET_OVERFLOW_POLICY,
+)
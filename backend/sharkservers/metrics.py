@@ -0,0 +1,703 @@
+"""
+Prometheus compatible metrics.
+
+This module contains a small in-process metrics registry rendered in the Prometheus text
+exposition format and MetricsPublisher class which shares the metrics of every worker
+through Redis, so a scrape of `/metrics` on any worker returns all of them, each series
+labelled with its worker.
+
+It includes the following classes and functions:
+- Counter, Gauge, Histogram: The metric types.
+- MetricsRegistry: Collects and renders the metrics.
+- MetricsPublisher: Shares the metrics of the workers through Redis.
+- instrument_redis, instrument_broadcast: Measure the Redis commands and the published messages.
+- track_database_pool, track_hub, track_password_hasher: Expose the state of these objects.
+- time_job: Measure the duration of a cron job.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import os
+import socket
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+from sharkservers.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterator
+
+    import databases
+    from broadcaster import Broadcast
+    from redis import asyncio as aioredis
+
+    from sharkservers.auth.services.hasher import PasswordHasher
+    from sharkservers.hub import SubscriptionHub
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """
+    Base class of the metrics.
+
+    Every combination of the label values is a separate series. A metric created with
+    a `function` reads its series from it on every collection instead of storing them.
+
+    Attributes
+    ----------
+        name (str): The metric name.
+        documentation (str): The help text.
+        labelnames (tuple[str, ...]): The label names.
+        function (Callable, optional): Returns the value, or the values by label values.
+    """
+
+    type = "untyped"
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: MetricsRegistry | None = None,
+        function: Callable[[], Any] | None = None,
+    ) -> None:
+        """Initialize the Metric and register it."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.function = function
+        self._values: dict[tuple[str, ...], Any] = {}
+        (registry or metrics_registry).register(self)
+
+    def collect(self) -> list[tuple[tuple[str, ...], Any]]:
+        """
+        Return the series of the metric.
+
+        Returns
+        -------
+            list[tuple[tuple[str, ...], Any]]: The label values and the value of every series.
+        """
+        if self.function is None:
+            return list(self._values.items())
+        values = self.function()
+        if isinstance(values, dict):
+            return [
+                (key if isinstance(key, tuple) else (key,), value)
+                for key, value in values.items()
+            ]
+        return [((), values)]
+
+    def _get_key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    """Monotonically increasing value, e.g. the number of handled requests."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Increase the series of the labels.
+
+        Args:
+        ----
+            amount (float, optional): The increment. Defaults to 1.
+            **labels: The label values.
+        """
+        key = self._get_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value which goes up and down, e.g. the number of open connections."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        """
+        Set the series of the labels.
+
+        Args:
+        ----
+            value (float): The value.
+            **labels: The label values.
+        """
+        self._values[self._get_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Increase the series of the labels.
+
+        Args:
+        ----
+            amount (float, optional): The increment. Defaults to 1.
+            **labels: The label values.
+        """
+        key = self._get_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Decrease the series of the labels.
+
+        Args:
+        ----
+            amount (float, optional): The decrement. Defaults to 1.
+            **labels: The label values.
+        """
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        """
+        Increase the series of the labels for the duration of the block.
+
+        Args:
+        ----
+            **labels: The label values.
+
+        Yields:
+        ------
+            None
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. the request latency in seconds."""
+
+    type = "histogram"
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: MetricsRegistry | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize the Histogram and register it."""
+        self.buckets = buckets
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Observe a value in the series of the labels.
+
+        Args:
+        ----
+            value (float): The observed value.
+            **labels: The label values.
+        """
+        key = self._get_key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = {
+                "buckets": [0] * len(self.buckets),
+                "sum": 0.0,
+                "count": 0,
+            }
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][index] += 1
+                break
+        series["sum"] += value
+        series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """
+        Observe the duration of the block in seconds.
+
+        Args:
+        ----
+            **labels: The label values.
+
+        Yields:
+        ------
+            None
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class MetricsRegistry:
+    """
+    Registry of the metrics of a worker.
+
+    Methods
+    -------
+        register: Add a metric.
+        collect: Return the JSON compatible snapshot of the metrics.
+        render: Render the snapshots of the workers in the Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the MetricsRegistry."""
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        """
+        Add a metric.
+
+        Args:
+        ----
+            metric (Metric): The metric.
+
+        Raises:
+        ------
+            ValueError: If a metric with the same name is registered.
+        """
+        if metric.name in self._metrics:
+            msg = f"Metric {metric.name} is already registered"
+            raise ValueError(msg)
+        self._metrics[metric.name] = metric
+
+    def collect(self) -> dict[str, dict]:
+        """
+        Return the JSON compatible snapshot of the metrics.
+
+        Returns
+        -------
+            dict[str, dict]: The type, help, label names and series of every metric by name.
+        """
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            try:
+                samples = metric.collect()
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Collecting metric {name} failed -> {e!r}")
+                continue
+            snapshot[name] = {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labels": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", [])),
+                "samples": [[list(key), value] for key, value in samples],
+            }
+        return snapshot
+
+    def render(self, snapshots: dict[str, dict[str, dict]]) -> str:
+        """
+        Render the snapshots of the workers in the Prometheus text format.
+
+        Args:
+        ----
+            snapshots (dict[str, dict[str, dict]]): The snapshot of every worker by worker ID.
+
+        Returns:
+        -------
+            str: The exposition.
+        """
+        metrics: dict[str, dict] = {}
+        for snapshot in snapshots.values():
+            for name, metric in snapshot.items():
+                metrics.setdefault(name, metric)
+        lines = []
+        for name, metric in sorted(metrics.items()):
+            lines.append(f"# HELP {name} {_escape_help(metric['help'])}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for worker, snapshot in sorted(snapshots.items()):
+                worker_metric = snapshot.get(name)
+                if worker_metric is None:
+                    continue
+                labelnames = ["worker", *worker_metric["labels"]]
+                for values, value in worker_metric["samples"]:
+                    labels = dict(zip(labelnames, [worker, *values]))
+                    if worker_metric["type"] == "histogram":
+                        lines.extend(
+                            _render_histogram(
+                                name,
+                                labels,
+                                worker_metric["buckets"],
+                                value,
+                            ),
+                        )
+                    else:
+                        lines.append(_render_sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsPublisher:
+    """
+    Share the metrics of the workers through Redis.
+
+    Every worker stores its snapshot under its own key expiring after a few publish
+    intervals and registers itself in a sorted set scored with the same expiry time, so a
+    scrape reads the live workers without scanning the keyspace and the metrics of a
+    stopped worker disappear. The metrics stay local to the worker until `init` is called.
+
+    Attributes
+    ----------
+        redis (aioredis.Redis): Redis instance for the snapshots.
+        registry (MetricsRegistry): The registry of the worker.
+        worker (str): The worker ID.
+        interval (float): The seconds between the publications.
+
+    Methods
+    -------
+        init: Enable the publication.
+        close: Disable the publication.
+        publish: Store the snapshot of the worker.
+        render: Render the metrics of all the live workers.
+        run: Publish the snapshot periodically.
+    """
+
+    key = "metrics:worker"
+    workers_key = "metrics:workers"
+
+    def __init__(
+        self,
+        registry: MetricsRegistry | None = None,
+        worker: str | None = None,
+    ) -> None:
+        """Initialize the MetricsPublisher."""
+        self.redis: aioredis.Redis | None = None
+        self.registry = registry or metrics_registry
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        self.interval = 15.0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Return whether the publication is enabled.
+
+        Returns
+        -------
+            bool: True if the publication is enabled.
+        """
+        return self.redis is not None
+
+    def init(self, redis: aioredis.Redis, interval: float = 15.0) -> None:
+        """
+        Enable the publication.
+
+        Args:
+        ----
+            redis (aioredis.Redis): Redis instance for the snapshots.
+            interval (float, optional): The seconds between the publications. Defaults to 15.
+        """
+        self.redis = redis
+        self.interval = interval
+
+    def close(self) -> None:
+        """Disable the publication."""
+        self.redis = None
+
+    async def publish(self) -> dict[str, dict]:
+        """
+        Store the snapshot of the worker.
+
+        Returns
+        -------
+            dict[str, dict]: The published snapshot.
+        """
+        snapshot = self.registry.collect()
+        if self.redis is not None:
+            ttl = int(self.interval * 3) + 1
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(f"{self.key}:{self.worker}", json.dumps(snapshot), ex=ttl)
+                pipe.zadd(self.workers_key, {self.worker: time.time() + ttl})
+                pipe.expire(self.workers_key, ttl)
+                await pipe.execute()
+        return snapshot
+
+    async def render(self) -> str:
+        """
+        Render the metrics of all the live workers.
+
+        The metrics of this worker are collected locally, the others are read from their
+        last published snapshots.
+
+        Returns
+        -------
+            str: The exposition.
+        """
+        snapshots = {self.worker: self.registry.collect()}
+        if self.redis is not None:
+            await self.redis.zremrangebyscore(self.workers_key, "-inf", time.time())
+            workers = [
+                worker
+                for worker in map(
+                    _decode,
+                    await self.redis.zrange(self.workers_key, 0, -1),
+                )
+                if worker != self.worker
+            ]
+            values = (
+                await self.redis.mget([f"{self.key}:{worker}" for worker in workers])
+                if workers
+                else []
+            )
+            for worker, value in zip(workers, values):
+                if value is not None:
+                    snapshots[worker] = json.loads(value)
+        return self.registry.render(snapshots)
+
+    async def run(self) -> None:
+        """Publish the snapshot periodically."""
+        while True:
+            try:
+                await self.publish()
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Publishing metrics failed -> {e!r}")
+            await asyncio.sleep(self.interval)
+
+
+def instrument_redis(redis: aioredis.Redis) -> aioredis.Redis:
+    """
+    Measure the latency of the commands of a Redis client.
+
+    Args:
+    ----
+        redis (aioredis.Redis): The Redis client.
+
+    Returns:
+    -------
+        aioredis.Redis: The same client.
+    """
+    execute_command = redis.execute_command
+
+    @functools.wraps(execute_command)
+    async def wrapper(*args: Any, **options: Any) -> Any:
+        with redis_command_duration.time(command=_decode(args[0]).upper()):
+            return await execute_command(*args, **options)
+
+    redis.execute_command = wrapper
+    return redis
+
+
+def instrument_broadcast(broadcast: Broadcast) -> Broadcast:
+    """
+    Count the messages published on a broadcast.
+
+    The messages are counted by the channel prefix, e.g. `chat` for `chat:global`.
+
+    Args:
+    ----
+        broadcast (Broadcast): The broadcast.
+
+    Returns:
+    -------
+        Broadcast: The same broadcast.
+    """
+    publish = broadcast.publish
+
+    @functools.wraps(publish)
+    async def wrapper(channel: str, message: Any) -> None:
+        await publish(channel=channel, message=message)
+        broadcast_published.inc(channel=channel.split(":", 1)[0])
+
+    broadcast.publish = wrapper
+    return broadcast
+
+
+def track_database_pool(database: databases.Database) -> None:
+    """
+    Expose the connection pool utilisation of a database.
+
+    Only the asyncpg backend has a pool, the gauges are empty for the other ones.
+
+    Args:
+    ----
+        database (databases.Database): The database.
+    """
+
+    def get_pool_stats() -> dict[str, int]:
+        pool = getattr(getattr(database, "_backend", None), "_pool", None)
+        if pool is None:
+            return {}
+        return {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "max": pool.get_max_size(),
+        }
+
+    db_pool_connections.function = get_pool_stats
+
+
+def track_hub(hub: SubscriptionHub) -> None:
+    """
+    Expose the deliveries and the subscribers of a subscription hub.
+
+    Args:
+    ----
+        hub (SubscriptionHub): The hub.
+    """
+    broadcast_received.function = lambda: hub.received
+    broadcast_delivered.function = lambda: hub.delivered
+    hub_subscribers.function = lambda: sum(
+        len(queues) for queues in hub.stats().values()
+    )
+
+
+def track_password_hasher(hasher: PasswordHasher) -> None:
+    """
+    Expose the queue of a password hasher.
+
+    Args:
+    ----
+        hasher (PasswordHasher): The password hasher.
+    """
+    password_hasher_queue_depth.function = lambda: hasher.queue_depth
+    password_hasher_rejected.function = lambda: hasher.rejected
+
+
+def time_job(
+    name: str,
+) -> Callable[[Callable[[], Awaitable[Any]]], Callable[[], Awaitable[Any]]]:
+    """
+    Measure the duration of a cron job.
+
+    Args:
+    ----
+        name (str): The job name.
+
+    Returns:
+    -------
+        Callable: The decorator of the job coroutine function.
+    """
+
+    def decorator(job: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        @functools.wraps(job)
+        async def wrapper() -> Any:
+            with job_duration.time(job=name):
+                return await job()
+
+        return wrapper
+
+    return decorator
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", r"\\").replace("\n", r"\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _render_sample(name: str, labels: dict[str, str], value: float) -> str:
+    if not labels:
+        return f"{name} {_format_value(value)}"
+    rendered = ",".join(
+        '{}="{}"'.format(
+            label,
+            str(label_value)
+            .replace("\\", r"\\")
+            .replace('"', r"\"")
+            .replace("\n", r"\n"),
+        )
+        for label, label_value in labels.items()
+    )
+    return f"{name}{{{rendered}}} {_format_value(value)}"
+
+
+def _render_histogram(
+    name: str,
+    labels: dict[str, str],
+    buckets: list[float],
+    value: dict,
+) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets, value["buckets"]):
+        cumulative += count
+        lines.append(
+            _render_sample(
+                f"{name}_bucket",
+                {**labels, "le": _format_value(bound)},
+                cumulative,
+            ),
+        )
+    lines.append(
+        _render_sample(f"{name}_bucket", {**labels, "le": "+Inf"}, value["count"]),
+    )
+    lines.append(_render_sample(f"{name}_sum", labels, value["sum"]))
+    lines.append(_render_sample(f"{name}_count", labels, value["count"]))
+    return lines
+
+
+metrics_registry = MetricsRegistry()
+metrics_publisher = MetricsPublisher()
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Latency of the HTTP requests by route template.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Number of the HTTP requests being handled.",
+)
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Connections of the database pool by state.",
+    ("state",),
+)
+redis_command_duration = Histogram(
+    "redis_command_duration_seconds",
+    "Latency of the Redis commands.",
+    ("command",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+websocket_connections = Gauge(
+    "websocket_connections",
+    "Open websocket connections of the worker by endpoint.",
+    ("endpoint",),
+)
+broadcast_published = Counter(
+    "broadcast_published_total",
+    "Messages published on the broadcast by channel prefix.",
+    ("channel",),
+)
+broadcast_received = Counter(
+    "broadcast_received_total",
+    "Messages received from the broadcast by the subscription hub.",
+    function=lambda: 0,
+)
+broadcast_delivered = Counter(
+    "broadcast_delivered_total",
+    "Messages queued for the local websocket connections by the subscription hub.",
+    function=lambda: 0,
+)
+hub_subscribers = Gauge(
+    "hub_subscribers",
+    "Local websocket connections subscribed to the subscription hub.",
+    function=lambda: 0,
+)
+password_hasher_queue_depth = Gauge(
+    "password_hasher_queue_depth",
+    "Password hashing operations waiting for a worker thread.",
+    function=lambda: 0,
+)
+password_hasher_rejected = Counter(
+    "password_hasher_rejected_total",
+    "Password hashing operations rejected because the queue was full.",
+    function=lambda: 0,
+)
+job_duration = Histogram(
+    "cron_job_duration_seconds",
+    "Duration of the cron jobs.",
+    ("job",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
@@ -1,42 +1,166 @@
-"""Middleware for the FastAPI application."""
+"""
+Middleware for the FastAPI application.
+
+The middlewares are plain ASGI applications instead of `@app.middleware("http")` functions.
+Starlette wraps the latter in BaseHTTPMiddleware, which runs every request in a task group
+and pipes the response body through a memory stream, so each layer costs an extra task
+and buffering of streaming responses.
+"""
+from __future__ import annotations
+
 import http
 import time
+from typing import TYPE_CHECKING
 
-from fastapi import Request, Response
+from fastapi import HTTPException
+from jose import JWTError
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
 
+from sharkservers.auth.dependencies import get_access_token_service
+from sharkservers.auth.services.auth import AuthService
+from sharkservers.instrumentation import collect_queries
 from sharkservers.logger import logger
+from sharkservers.metrics import http_request_duration, http_requests_in_flight
+from sharkservers.settings import get_settings
+from sharkservers.users.services import PresenceService
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class LogRequestMiddleware:
+    """Middleware will log all requests."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the LogRequestMiddleware."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI connection."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        logger.debug("middleware: log_request_middleware")
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.perf_counter()
+        await self.app(scope, receive, send_with_status)
+        process_time = (time.perf_counter() - start_time) * 1000
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        url = f"{scope['path']}?{query_string}" if query_string else scope["path"]
+        host, port = scope.get("client") or (None, None)
+        try:
+            status_phrase = http.HTTPStatus(status_code).phrase
+        except ValueError:
+            status_phrase = ""
+        logger.info(
+            f'{host}:{port} - "{scope["method"]} {url}" {status_code} {status_phrase} {process_time:.2f}ms',
+        )
+
+
+class UserLastOnlineMiddleware:
+    """Middleware will mark the user of every authenticated request as online."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the UserLastOnlineMiddleware."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI connection."""
+        await self.app(scope, receive, send)
+        if scope["type"] != "http" or "authorization" not in Headers(scope=scope):
+            return
+        settings = get_settings()
+        request = Request(scope)
+        try:
+            access_token_service = await get_access_token_service(settings=settings)
+            jwt_token = await AuthService.oauth2_scheme(request=request)
+            token_data = access_token_service.decode_token(jwt_token)
+            presence_service = PresenceService(
+                redis=request.app.state.redis,
+                online_window=settings.USERS_ONLINE_WINDOW,
+            )
+            await presence_service.touch(token_data.user_id.uuid)
+        except (JWTError, HTTPException):
+            return
 
 
-async def log_request_middleware(request: Request, call_next) -> Response:  # noqa: ANN001
+class QueryInstrumentationMiddleware:
     """
-    Middleware will log all requests.
+    Middleware will count and time the database queries of every request.
+
+    The totals are sent in the `Server-Timing` header and logged with the slowest
+    statements. Statements run at least `n_plus_one_threshold` times are logged
+    as a warning.
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5) -> None:
+        """Initialize the QueryInstrumentationMiddleware."""
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI connection."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with collect_queries(self.n_plus_one_threshold) as stats:
+
+            async def send_with_server_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.get_server_timing())
+                await send(message)
+
+            await self.app(scope, receive, send_with_server_timing)
+        request = f'"{scope["method"]} {scope["path"]}"'
+        logger.debug(f"{request} {stats.get_report()}")
+        for shape, count in stats.get_n_plus_one().items():
+            logger.warning(f"Possible N+1 in {request}: {count}x {shape}")
 
-    Args:
-    ----
-        request: The request object.
-        call_next: The next function.
 
-    Returns:
-    -------
-        The response object.
+class MetricsMiddleware:
     """
-    logger.debug("middleware: log_request_middleware")
-    url = (
-        f"{request.url.path}?{request.query_params}"
-        if request.query_params
-        else request.url.path
-    )
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = (time.time() - start_time) * 1000
-    formatted_process_time = f"{process_time:.2f}"
-    host = getattr(getattr(request, "client", None), "host", None)
-    port = getattr(getattr(request, "client", None), "port", None)
-    try:
-        status_phrase = http.HTTPStatus(response.status_code).phrase
-    except ValueError:
-        status_phrase = ""
-    logger.info(
-        f'{host}:{port} - "{request.method} {url}" {response.status_code} {status_phrase} {formatted_process_time}ms',
-    )
-    return response
+    Middleware will measure the latency and the number of in-flight requests.
+
+    The latency is labelled with the route template, e.g. `/v1/forum/threads/{thread_id}`,
+    so the path parameters do not create a series per resource.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the MetricsMiddleware."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI connection."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.perf_counter()
+        with http_requests_in_flight.track():
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # the router stores the matched route in the shared scope
+                route = scope.get("route")
+                http_request_duration.observe(
+                    time.perf_counter() - start_time,
+                    method=scope["method"],
+                    route=getattr(route, "path", "<unmatched>"),
+                    status=status_code,
+                )
@@ -1,12 +1,16 @@
-"""Player services."""
+"""
+Player services.
+
+steam and requests are imported when a player is created, they are not needed to serve
+the players already saved.
+"""
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import httpx
 from fastapi import HTTPException
-from steam.steamid import SteamID
-from steam.webapi import WebAPI
 
-from requests import HTTPError
 from sharkservers.db import BaseService
 from sharkservers.logger import logger
 from sharkservers.players.exceptions import (
@@ -14,9 +18,9 @@ from sharkservers.players.exceptions import (
 )
 from sharkservers.players.models import Player, SteamRepProfile
 from sharkservers.players.schemas import SteamPlayer
-from sharkservers.settings import get_settings
 
-settings = get_settings()
+if TYPE_CHECKING:
+    from steam.webapi import WebAPI
 
 
 class SteamRepService(BaseService):
@@ -135,6 +139,10 @@ class PlayerService(BaseService):
         -------
             SteamPlayer: The Steam player information.
         """
+        from requests import HTTPError
+        from steam.steamid import SteamID
+        from steam.webapi import WebAPI
+
         try:
             steam_api = WebAPI(self.steam_api_key)
             results = steam_api.call(
@@ -182,6 +190,8 @@ class PlayerService(BaseService):
         """
         if await self.Meta.model.objects.filter(steamid64=steamid64).exists():
             raise HTTPException(detail="Player already exists", status_code=401)
+        from requests import HTTPError
+
         try:
             player_info = self.get_steam_player_info(steamid64)
             steamrep_profile = await self.steamrep_service.create_profile(steamid64)
@@ -0,0 +1,394 @@
+"""
+Fast JSON responses.
+
+FastAPI validates the value returned by an endpoint against its response model and then
+encodes the validated model with `jsonable_encoder`. For the ormar models of a page that
+means building every output schema, nested authors and categories included, only to turn
+them back into dicts.
+
+The schema encoders here are compiled once per output schema from its pydantic fields and
+read the values straight from the ormar models, so the data loaded from the database is
+not validated again. Only the fields of the schema are emitted, hence the excluded fields
+such as `author__password` stay out of the response. The result is serialized to bytes
+with orjson.
+
+Classes:
+- FastJSONResponse: JSON response serialized with orjson.
+- SchemaEncoder: Encoder of the values of an output schema.
+
+Functions:
+- dumps: Serialize a value to JSON bytes.
+- get_encoder: Get the cached encoder of an output schema.
+- compile_field: Compile the encoder of a pydantic field.
+- add_fast_json_responses: Serve the response models of the routes with the schema encoders.
+"""
+from __future__ import annotations
+
+import inspect
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable
+from uuid import UUID
+
+import orjson
+import ormar
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute, request_response
+from fastapi_pagination.api import set_page
+from fastapi_pagination.bases import AbstractPage
+from pydantic import BaseModel
+from pydantic.fields import (
+    SHAPE_DEQUE,
+    SHAPE_FROZENSET,
+    SHAPE_ITERABLE,
+    SHAPE_LIST,
+    SHAPE_SEQUENCE,
+    SHAPE_SET,
+    SHAPE_SINGLETON,
+    SHAPE_TUPLE_ELLIPSIS,
+    ModelField,
+)
+from pydantic.utils import lenient_issubclass
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from uuidbase62 import UUIDBase62, base62
+from uuidbase62.types import to_uuidbase62
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+Encoder = Callable[[Any], Any]
+
+SEQUENCE_SHAPES = {
+    SHAPE_LIST,
+    SHAPE_SET,
+    SHAPE_FROZENSET,
+    SHAPE_SEQUENCE,
+    SHAPE_TUPLE_ELLIPSIS,
+    SHAPE_ITERABLE,
+    SHAPE_DEQUE,
+}
+RESPONSE_PARAM_NAME = "fast_json_response"
+
+
+def _default(value: Any) -> Any:
+    """Encode a value orjson does not know."""
+    if isinstance(value, BaseModel) and not isinstance(value, ormar.Model):
+        return get_encoder(type(value)).encode(value)
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize a value to JSON bytes.
+
+    orjson handles the datetimes, UUIDs and enums itself. Instances of the output schemas
+    are encoded with their schema encoders, anything else orjson does not know goes
+    through `jsonable_encoder`.
+
+    Args:
+    ----
+        content (Any): The value.
+
+    Returns:
+    -------
+        bytes: The JSON document.
+    """
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content."""
+        return dumps(content)
+
+
+def _encode_uuidbase62(prefix: str | None) -> Encoder:
+    """Compile the encoder of a UUIDBase62 field with the given prefix."""
+
+    def encode(value: Any) -> str:
+        if isinstance(value, UUID):
+            return (
+                f"{prefix}_{base62.encode(value)}" if prefix else base62.encode(value)
+            )
+        return str(to_uuidbase62(value, prefix))
+
+    return encode
+
+
+def _get_generic_origin(schema: type[BaseModel]) -> type[BaseModel]:
+    """Get `Page` of `Page[ThreadOut]`, or the schema itself if it is not parametrized."""
+    if getattr(schema, "__concrete__", False) and schema.__bases__:
+        return schema.__bases__[0]
+    return schema
+
+
+class SchemaEncoder:
+    """
+    Encoder of the values of an output schema.
+
+    The values are ormar models, instances of the schema or dicts. The encoded value
+    contains only JSON types, datetimes, UUIDs and enums, which orjson serializes.
+
+    Attributes
+    ----------
+        schema (type[BaseModel]): The output schema.
+        fields (list[tuple[str, Any, Encoder | None]]): The alias, default value and encoder
+            of every field, None when the value is emitted as it is.
+    """
+
+    def __init__(self, schema: type[BaseModel]) -> None:
+        """Initialize the SchemaEncoder."""
+        self.schema = schema
+        self.fields: list[tuple[str, Any, Encoder | None]] = []
+
+    def compile(self) -> None:
+        """Compile the encoders of the fields."""
+        self.fields = [
+            (field.alias, field.get_default(), compile_field(field))
+            for field in self.schema.__fields__.values()
+        ]
+
+    def encode(self, value: Any) -> dict[str, Any]:
+        """
+        Encode a value of the schema.
+
+        Args:
+        ----
+            value (Any): The ormar model, instance of the schema or dict.
+
+        Returns:
+        -------
+            dict[str, Any]: The fields of the schema by alias.
+        """
+        get = dict.get if isinstance(value, dict) else getattr
+        data = {}
+        for alias, default, encode in self.fields:
+            field_value = get(value, alias, default)
+            if field_value is None or encode is None:
+                data[alias] = field_value
+                continue
+            try:
+                data[alias] = encode(field_value)
+            except ReferenceError:
+                # the related model was garbage collected, ormar dicts it as None too
+                data[alias] = None
+        return data
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        Serialize a value of the schema to JSON bytes.
+
+        Args:
+        ----
+            value (Any): The ormar model, instance of the schema or dict.
+
+        Returns:
+        -------
+            bytes: The JSON document.
+        """
+        return dumps(self.encode(value))
+
+
+_encoders: dict[type[BaseModel], SchemaEncoder] = {}
+
+
+def get_encoder(schema: type[BaseModel]) -> SchemaEncoder:
+    """
+    Get the cached encoder of an output schema.
+
+    Args:
+    ----
+        schema (type[BaseModel]): The output schema.
+
+    Returns:
+    -------
+        SchemaEncoder: The encoder.
+    """
+    encoder = _encoders.get(schema)
+    if encoder is None:
+        # registered before the fields are compiled so recursive schemas find it
+        encoder = _encoders[schema] = SchemaEncoder(schema)
+        encoder.compile()
+    return encoder
+
+
+def _compile_type(type_: Any) -> Encoder | None:
+    """Compile the encoder of a single value, None when it is emitted as it is."""
+    if lenient_issubclass(type_, UUIDBase62):
+        return _encode_uuidbase62(getattr(type_, "prefix", None))
+    if lenient_issubclass(type_, BaseModel):
+        return get_encoder(type_).encode
+    return None
+
+
+def _compile_union(fields: list[ModelField]) -> Encoder | None:
+    """
+    Compile the encoder of a union.
+
+    A value is encoded with the first member it is an instance of, e.g. a `Page` with
+    `Page[ThreadOut]` of `CursorPage[ThreadOut] | Page[ThreadOut]`. An ormar model is not an
+    instance of any output schema, it is encoded with the first member in ORM mode like
+    pydantic would validate it.
+    """
+    members = [
+        (_get_generic_origin(field.type_), field.type_, compile_field(field))
+        for field in fields
+        if lenient_issubclass(field.type_, BaseModel)
+    ]
+    if not members:
+        return None
+    fallback = next(
+        (encode for _, type_, encode in members if type_.__config__.orm_mode),
+        members[0][2],
+    )
+
+    def encode(value: Any) -> Any:
+        for origin, _, member_encode in members:
+            if isinstance(value, origin):
+                return member_encode(value)
+        return fallback(value)
+
+    return encode
+
+
+def _encode_items(encode_item: Encoder, value: Any) -> list:
+    """Encode the items of a sequence, without the garbage collected related models."""
+    items = []
+    for element in value:
+        try:
+            items.append(None if element is None else encode_item(element))
+        except ReferenceError:  # noqa: PERF203
+            # a reverse relation keeps weak proxies, ormar skips the dead ones
+            continue
+    return items
+
+
+def compile_field(field: ModelField) -> Encoder | None:
+    """
+    Compile the encoder of a pydantic field.
+
+    Args:
+    ----
+        field (ModelField): The field, e.g. the response field of a route.
+
+    Returns:
+    -------
+        Encoder | None: The encoder of the non-null values, None when they are emitted
+            as they are.
+    """
+    if field.shape in SEQUENCE_SHAPES:
+        item = field.sub_fields[0] if field.sub_fields else None
+        encode_item = compile_field(item) if item else _compile_type(field.type_)
+        if encode_item is None:
+            return list
+        return lambda value: _encode_items(encode_item, value)
+    if field.shape != SHAPE_SINGLETON:
+        return jsonable_encoder
+    if field.sub_fields and not lenient_issubclass(field.type_, BaseModel):
+        return _compile_union(field.sub_fields)
+    return _compile_type(field.type_)
+
+
+def _get_response_class(route: APIRoute) -> type[Response]:
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        return response_class.value
+    return response_class
+
+
+def _uses_fast_json(route: APIRoute) -> bool:
+    """Whether the route returns its response model as it is, so it can be encoded."""
+    return (
+        route.response_field is not None
+        and lenient_issubclass(_get_response_class(route), JSONResponse)
+        and route.response_model_include is None
+        and route.response_model_exclude is None
+        and route.response_model_by_alias
+        and not route.response_model_exclude_unset
+        and not route.response_model_exclude_defaults
+        and not route.response_model_exclude_none
+    )
+
+
+def _wrap_endpoint(route: APIRoute) -> None:
+    """
+    Encode the values returned by the endpoint of the route with the schema encoders.
+
+    The endpoint returns a response, so FastAPI skips the validation of the response model.
+    Its own handling of a returned response would drop the headers and status code set on
+    the `Response` parameter by the dependencies, they are copied from it here instead.
+    Values that are not models, e.g. dicts, are still validated by FastAPI.
+    """
+    dependant = route.dependant
+    call = dependant.call
+    encode = compile_field(route.response_field) or jsonable_encoder
+    response_class = _get_response_class(route)
+    # the items of a page are validated against the output schema when it is created
+    raw_page = (
+        _get_generic_origin(route.response_model)
+        if lenient_issubclass(route.response_model, AbstractPage)
+        else None
+    )
+    response_param_name = dependant.response_param_name
+    if response_param_name is None:
+        dependant.response_param_name = RESPONSE_PARAM_NAME
+    is_coroutine = inspect.iscoroutinefunction(call)
+
+    async def endpoint(**kwargs: Any) -> Any:
+        sub_response = (
+            kwargs[response_param_name]
+            if response_param_name
+            else kwargs.pop(RESPONSE_PARAM_NAME)
+        )
+        with set_page(raw_page) if raw_page else nullcontext():
+            if is_coroutine:
+                value = await call(**kwargs)
+            else:
+                value = await run_in_threadpool(call, **kwargs)
+        if not isinstance(value, BaseModel) and not (
+            isinstance(value, list)
+            and all(isinstance(item, BaseModel) for item in value)
+        ):
+            return value
+        response = response_class(
+            encode(value),
+            status_code=sub_response.status_code or route.status_code or 200,
+        )
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    endpoint.__fast_json__ = True
+    dependant.call = endpoint
+
+
+def add_fast_json_responses(_app: FastAPI) -> FastAPI:
+    """
+    Serve the response models of the routes with the schema encoders.
+
+    The encoders of the response models are compiled here, at startup. Call it after
+    `add_pagination`, which rebuilds the handlers of the paginated routes.
+
+    Args:
+    ----
+        _app (FastAPI): The application with its routes.
+
+    Returns:
+    -------
+        FastAPI: The same application.
+    """
+    for route in _app.routes:
+        if (
+            isinstance(route, APIRoute)
+            and not hasattr(route.dependant.call, "__fast_json__")
+            and _uses_fast_json(route)
+        ):
+            _wrap_endpoint(route)
+            route.app = request_response(route.get_route_handler())
+    return _app
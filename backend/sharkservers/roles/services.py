@@ -33,6 +33,7 @@ class RoleService(BaseService):
 
         model = Role
         not_found_exception = role_not_found_exception
+        cache_ttl = 300
 
     async def create_default_roles(self, scopes_service: ScopeService) -> None:
         """
@@ -48,21 +49,30 @@ class RoleService(BaseService):
             (ProtectedDefaultRolesTagEnum.BANNED.value, "Banned", "#000000"),
             (ProtectedDefaultRolesTagEnum.VIP.value, "VIP", "#ffda83"),
         ]
+        existing = set(
+            await self.Meta.model.objects.values_list("tag", flatten=True),
+        )
+        roles_to_create = [role for role in roles_to_create if role[0] not in existing]
         for role in roles_to_create:
             logger_with_filename(filename=self.__class__.__name__, data=role)
-            if not await self.Meta.model.objects.filter(tag=role[0]).exists():
-                default_role = await self.Meta.model.objects.create(
-                    tag=role[0],
-                    name=role[1],
-                    color=role[2],
-                    is_staff=role[0] == ProtectedDefaultRolesTagEnum.ADMIN.value,
-                )
-                scopes = await scopes_service.get_default_scopes_for_role(
-                    role_tag=default_role.tag,
-                )
-                if role[0] != ProtectedDefaultRolesTagEnum.BANNED.value:
-                    for scope in scopes:
-                        await default_role.scopes.add(scope)
+        default_roles = await self.bulk_create(
+            [
+                {
+                    "tag": tag,
+                    "name": name,
+                    "color": color,
+                    "is_staff": tag == ProtectedDefaultRolesTagEnum.ADMIN.value,
+                }
+                for tag, name, color in roles_to_create
+            ],
+        )
+        for default_role in default_roles:
+            if default_role.tag == ProtectedDefaultRolesTagEnum.BANNED.value:
+                continue
+            scopes = await scopes_service.get_default_scopes_for_role(
+                role_tag=default_role.tag,
+            )
+            await self.add_many(default_role, "scopes", scopes)
 
     async def get_staff_roles(self, params: Params) -> Page[Role]:
         """
@@ -108,6 +118,5 @@ class RoleService(BaseService):
             ).all()
         role = await self.create(**role_data_dict)
         if scopes:
-            for scope in scopes:
-                await role.scopes.add(scope)
+            await self.add_many(role, "scopes", scopes)
         return role
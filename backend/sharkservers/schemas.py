@@ -8,15 +8,24 @@ It includes the following classes:
 - HTTPError400Schema: Represents the schema for a 400 Bad Request error response.
 - HTTPError401Schema: Represents the schema for a 401 Unauthorized error response.
 - OrderQuery: Represents the schema for the order query parameter.
+- CursorParams: Represents the parameters for keyset (cursor) pagination.
+- CursorPage: Represents a page of results fetched with keyset (cursor) pagination.
+- Projection: Represents a sparse fieldset of a list endpoint.
 """
 from __future__ import annotations
 
+from typing import Any, Generic, Sequence, TypeVar
+
 from fastapi import Query
-from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field, root_validator
+from pydantic.generics import GenericModel
 from starlette import status
 
 from sharkservers.enums import OrderEnum
 
+T = TypeVar("T")
+
 
 class CreateAdmin(BaseModel):
     """
@@ -80,3 +89,118 @@ class OrderQuery(BaseModel):
         description="Order by",
         enum=OrderEnum,
     )
+
+
+class CursorParams(BaseModel):
+    """
+    Represents the parameters for keyset (cursor) pagination.
+
+    Attributes
+    ----------
+        cursor (str | None): The opaque cursor returned as `next_cursor` by the previous page.
+        size (int): The page size.
+    """
+
+    cursor: str | None = Field(None, description="Cursor for the next page")
+    size: int = Field(50, ge=1, le=100, description="Page size")
+
+
+class CursorPage(GenericModel, Generic[T]):
+    """
+    Represents a page of results fetched with keyset (cursor) pagination.
+
+    Attributes
+    ----------
+        items (Sequence[T]): The items of the page.
+        next_cursor (str | None): The cursor for the next page, None on the last page.
+    """
+
+    items: Sequence[T]
+    next_cursor: str | None = None
+
+    @root_validator(pre=True)
+    def reject_unknown_fields(cls, values: dict[str, Any]) -> dict[str, Any]:  # noqa: N805
+        """
+        Reject offset pages before their items are validated.
+
+        Endpoints return `CursorPage[T] | Page[T]`, so an offset page has to fail here cheaply
+        instead of after validating every item.
+        """
+        unknown = set(values) - set(cls.__fields__)
+        if unknown:
+            msg = f"Unexpected fields: {', '.join(sorted(unknown))}"
+            raise ValueError(msg)
+        return values
+
+
+class Projection(BaseModel):
+    """
+    Represents a sparse fieldset of a list endpoint.
+
+    Attributes
+    ----------
+        fields (list[str] | None): The own columns to return, None for all of them.
+        exclude_fields (list[str] | None): The own columns to leave out.
+        include (list[str]): The relations to return.
+        related (list[str]): The relations to join, i.e. the included ones with the
+            nested relations their output schema needs.
+    """
+
+    fields: list[str] | None = None
+    exclude_fields: list[str] | None = None
+    include: list[str] = []
+    related: list[str] = []
+
+    def get_output_fields(
+        self,
+        schema: type[BaseModel],
+        relations: list[str],
+    ) -> set[str]:
+        """
+        Get the top-level fields of the output schema to return.
+
+        Args:
+        ----
+            schema (type[BaseModel]): The slim output schema.
+            relations (list[str]): The relations of the endpoint.
+
+        Returns:
+        -------
+            set[str]: The field names.
+        """
+        columns = set(schema.__fields__) - set(relations)
+        if self.fields is not None:
+            columns &= {"id", *self.fields}
+        columns -= set(self.exclude_fields or [])
+        return columns | set(self.include)
+
+    def apply(
+        self,
+        page: BaseModel,
+        schema: type[BaseModel],
+        relations: list[str],
+    ) -> dict[str, Any]:
+        """
+        Serialize a page returning only the requested fields of its items.
+
+        Args:
+        ----
+            page (BaseModel): The page of ormar models.
+            schema (type[BaseModel]): The slim output schema with optional fields.
+            relations (list[str]): The relations of the endpoint.
+
+        Returns:
+        -------
+            dict[str, Any]: The JSON compatible page.
+        """
+        output_fields = self.get_output_fields(schema, relations)
+        items = [
+            jsonable_encoder(
+                schema.parse_obj(
+                    {field: getattr(item, field) for field in output_fields},
+                ),
+                exclude_unset=True,
+            )
+            for item in page.items
+        ]
+        return {**jsonable_encoder(page, exclude={"items"}), "items": items}
@@ -53,6 +53,7 @@ class ScopeService(BaseService):
 
         model = Scope
         not_found_exception = scope_not_found_exception
+        cache_ttl = 300
 
     def add_default_scopes(self, apps: list[str]) -> ScopeService:
         """
@@ -141,23 +142,7 @@ class ScopeService(BaseService):
         None
 
         """
-        for scope_enum in ScopeEnum:
-            scope, created = await self.Meta.model.objects.get_or_create(
-                app_name=app_name,
-                value=scope_enum.value,
-                description=f"{scope_enum.value} {app_name}s".capitalize(),
-                protected=True,
-            )
-        for scope in additional_scopes:
-            _app_name, value, description = scope
-            (
-                additional_scope,
-                additional_scope_created,
-            ) = await self.Meta.model.objects.get_or_create(
-                app_name=_app_name,
-                value=value,
-                description=description,
-            )
+        await self.create_default_scopes([app_name], additional_scopes)
 
     async def create_default_scopes(
         self,
@@ -167,6 +152,9 @@ class ScopeService(BaseService):
         """
         Create default scopes for applications.
 
+        The existing scopes are read with one query and the missing ones are created with
+        one bulk insert.
+
         Parameters
         ----------
         applications : list
@@ -179,9 +167,27 @@ class ScopeService(BaseService):
         None
 
         """
+        scopes = {}
         for app in applications:
-            # Code for creating default scopes goes here
-            await self.create_scopes_for_app(app, additional)
+            for scope_enum in ScopeEnum:
+                scopes.setdefault(
+                    (app, scope_enum.value),
+                    {
+                        "app_name": app,
+                        "value": scope_enum.value,
+                        "description": f"{scope_enum.value} {app}s".capitalize(),
+                        "protected": True,
+                    },
+                )
+        for _app_name, value, description in additional or []:
+            scopes.setdefault(
+                (_app_name, value),
+                {"app_name": _app_name, "value": value, "description": description},
+            )
+        existing = await self.Meta.model.objects.values_list(["app_name", "value"])
+        for key in existing:
+            scopes.pop(tuple(key), None)
+        await self.bulk_create(list(scopes.values()))
 
     @staticmethod
     async def get_scopes_list(roles: list[Role]) -> list[str]:
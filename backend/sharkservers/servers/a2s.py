@@ -0,0 +1,174 @@
+"""
+Asyncio implementation of the Source engine A2S_INFO query.
+
+Functions:
+- a2s_info: Query the server information.
+"""
+from __future__ import annotations
+
+import asyncio
+import struct
+
+A2S_HEADER = b"\xff\xff\xff\xff"
+A2S_SPLIT_HEADER = b"\xfe\xff\xff\xff"
+A2S_INFO_REQUEST = A2S_HEADER + b"TSource Engine Query\x00"
+A2S_CHALLENGE_RESPONSE = 0x41
+A2S_INFO_RESPONSE = 0x49
+
+
+class A2SError(Exception):
+    """Raised when a server sends an invalid response."""
+
+
+class A2SProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol collecting the received packets in a queue."""
+
+    def __init__(self) -> None:
+        """Initialize the protocol."""
+        self.packets: asyncio.Queue[bytes | Exception] = asyncio.Queue()
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:  # noqa: ARG002
+        """Queue the received packet."""
+        self.packets.put_nowait(data)
+
+    def error_received(self, exc: Exception) -> None:
+        """Queue the error, e.g. ConnectionRefusedError for a closed port."""
+        self.packets.put_nowait(exc)
+
+
+class A2SReader:
+    """Reader for the little endian fields of an A2S response."""
+
+    def __init__(self, data: bytes) -> None:
+        """Initialize the reader."""
+        self.data = data
+        self.offset = 0
+
+    def read(self, fmt: str) -> int | float:
+        """Read a single struct field."""
+        try:
+            (value,) = struct.unpack_from(f"<{fmt}", self.data, self.offset)
+        except struct.error as err:
+            msg = "Truncated response"
+            raise A2SError(msg) from err
+        self.offset += struct.calcsize(f"<{fmt}")
+        return value
+
+    def read_string(self) -> str:
+        """Read a null terminated string."""
+        end = self.data.find(b"\x00", self.offset)
+        if end == -1:
+            msg = "Truncated response"
+            raise A2SError(msg)
+        value = self.data[self.offset : end].decode("utf-8", errors="replace")
+        self.offset = end + 1
+        return value
+
+
+async def _receive(protocol: A2SProtocol) -> bytes:
+    packet = await protocol.packets.get()
+    if isinstance(packet, Exception):
+        raise packet
+    if packet.startswith(A2S_HEADER):
+        return packet[4:]
+    if not packet.startswith(A2S_SPLIT_HEADER):
+        msg = "Invalid packet header"
+        raise A2SError(msg)
+    # Source engine split packet: id (long), total (byte), number (byte), size (short)
+    parts: dict[int, bytes] = {}
+    total = 0
+    while True:
+        request_id, total, number = struct.unpack_from("<lBB", packet, 4)
+        if request_id < 0:
+            msg = "Compressed responses are not supported"
+            raise A2SError(msg)
+        parts[number] = packet[12:]
+        if len(parts) == total:
+            break
+        packet = await protocol.packets.get()
+        if isinstance(packet, Exception):
+            raise packet
+    payload = b"".join(parts[number] for number in range(total))
+    if not payload.startswith(A2S_HEADER):
+        msg = "Invalid packet header"
+        raise A2SError(msg)
+    return payload[4:]
+
+
+async def _request(
+    address: tuple[str, int],
+    request: bytes,
+    timeout: float,
+) -> bytes:
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        A2SProtocol,
+        remote_addr=address,
+    )
+    try:
+        async with asyncio.timeout(timeout):
+            transport.sendto(request)
+            response = await _receive(protocol)
+            if response and response[0] == A2S_CHALLENGE_RESPONSE:
+                transport.sendto(request + response[1:5])
+                response = await _receive(protocol)
+            return response
+    finally:
+        transport.close()
+
+
+async def _query(
+    address: tuple[str, int],
+    request: bytes,
+    timeout: float,
+    retries: int,
+) -> bytes:
+    for attempt in range(retries + 1):
+        try:
+            return await _request(address, request, timeout)
+        except TimeoutError:  # noqa: PERF203
+            if attempt == retries:
+                raise
+    raise AssertionError  # pragma: no cover
+
+
+async def a2s_info(
+    address: tuple[str, int],
+    timeout: float = 2.0,
+    retries: int = 1,
+) -> dict:
+    """
+    Query the server information.
+
+    Args:
+    ----
+        address (tuple[str, int]): The server IP and port.
+        timeout (float, optional): The timeout of a single attempt in seconds. Defaults to 2.0.
+        retries (int, optional): The number of retries after a timeout. Defaults to 1.
+
+    Returns:
+    -------
+        dict: The server information.
+
+    Raises:
+    ------
+        TimeoutError: If the server did not respond in any attempt.
+        OSError: If the server is unreachable.
+        A2SError: If the response is invalid.
+    """
+    response = await _query(address, A2S_INFO_REQUEST, timeout, retries)
+    if not response or response[0] != A2S_INFO_RESPONSE:
+        msg = "Invalid A2S_INFO response"
+        raise A2SError(msg)
+    reader = A2SReader(response[1:])
+    return {
+        "protocol": reader.read("B"),
+        "name": reader.read_string(),
+        "map": reader.read_string(),
+        "folder": reader.read_string(),
+        "game": reader.read_string(),
+        "app_id": reader.read("H"),
+        "players": reader.read("B"),
+        "max_players": reader.read("B"),
+        "bots": reader.read("B"),
+    }
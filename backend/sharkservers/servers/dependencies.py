@@ -1,10 +1,14 @@
 """Dependencies for the servers module."""
 from fastapi import Depends
 from ormar import Model
+from redis import asyncio as aioredis
 from uuidbase62 import UUIDBase62, get_validated_uuidbase62_by_model
 
+from sharkservers.db import get_redis
+from sharkservers.servers.poller import ServerStatusPoller
 from sharkservers.servers.schemas import ServerOut
 from sharkservers.servers.services import ServerService
+from sharkservers.settings import Settings, get_settings
 
 
 async def get_servers_service() -> ServerService:
@@ -38,3 +42,30 @@ async def get_valid_server(
 
     """
     return await servers_service.get_one(id=server_id.uuid, related=["admin_role"])
+
+
+async def get_server_status_poller(
+    redis: aioredis.Redis = Depends(get_redis),
+    servers_service: ServerService = Depends(get_servers_service),
+    settings: Settings = Depends(get_settings),
+) -> ServerStatusPoller:
+    """
+    Retrieve the server status poller reading the stored snapshot.
+
+    Args:
+    ----
+        redis (aioredis.Redis): The Redis instance.
+        servers_service (ServerService): The server service dependency.
+        settings (Settings): The application settings.
+
+    Returns:
+    -------
+        ServerStatusPoller: The server status poller instance.
+    """
+    return ServerStatusPoller(
+        redis=redis,
+        servers_service=servers_service,
+        interval=settings.SERVER_STATUS_POLL_INTERVAL,
+        timeout=settings.SERVER_QUERY_TIMEOUT,
+        retries=settings.SERVER_QUERY_RETRIES,
+    )
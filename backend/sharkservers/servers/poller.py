@@ -0,0 +1,169 @@
+"""
+Background poller of the game servers status.
+
+One worker, elected through a Redis lock, queries the servers on an interval, stores the
+snapshot in Redis and publishes it on the broadcast channel when it changes.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from typing import TYPE_CHECKING
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+
+from sharkservers.logger import logger
+from sharkservers.servers.schemas import ServerStatusSchema
+
+if TYPE_CHECKING:
+    from broadcaster import Broadcast
+    from redis import asyncio as aioredis
+
+    from sharkservers.servers.services import ServerService
+
+# the lock is renewed or released only by the worker holding it
+RENEW_LOCK = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class ServerStatusPoller:
+    """
+    Poller of the game servers status.
+
+    Attributes
+    ----------
+        redis (aioredis.Redis): Redis instance for the snapshot and the leader lock.
+        servers_service (ServerService): The server service.
+        broadcast (Broadcast): The broadcast used to publish the changes.
+        interval (float): The polling interval in seconds.
+        timeout (float): The timeout of a single server query attempt in seconds.
+        retries (int): The number of retries of a timed out server query.
+
+    Methods
+    -------
+        get_snapshot: Get the last stored status of the servers.
+        poll: Query the servers and store the snapshot, publishing it when it changed.
+        acquire_leadership: Acquire or renew the leader lock.
+        run: Poll the servers until cancelled while being the leader.
+    """
+
+    snapshot_key = "servers:status"
+    leader_key = "servers:status:leader"
+    channel = "servers:status"
+
+    def __init__(  # noqa: PLR0913
+        self,
+        redis: aioredis.Redis,
+        servers_service: ServerService,
+        broadcast: Broadcast | None = None,
+        interval: float = 30.0,
+        timeout: float = 2.0,
+        retries: int = 1,
+    ) -> None:
+        """Initialize the ServerStatusPoller."""
+        self.redis = redis
+        self.servers_service = servers_service
+        self.broadcast = broadcast
+        self.interval = interval
+        self.timeout = timeout
+        self.retries = retries
+        self.token = uuid.uuid4().hex
+        self._renew_lock = redis.register_script(RENEW_LOCK)
+        self._release_lock = redis.register_script(RELEASE_LOCK)
+
+    @property
+    def ttl(self) -> int:
+        """
+        Return the expiry of the snapshot and the leader lock.
+
+        Returns
+        -------
+            int: Three polling intervals in milliseconds.
+        """
+        return int(self.interval * 3 * 1000)
+
+    async def get_snapshot(self) -> list[ServerStatusSchema] | None:
+        """
+        Get the last stored status of the servers.
+
+        Returns
+        -------
+            list[ServerStatusSchema] | None: The server statuses or None if nothing was polled yet.
+        """
+        payload = await self.redis.get(self.snapshot_key)
+        if payload is None:
+            return None
+        return parse_obj_as(list[ServerStatusSchema], json.loads(payload))
+
+    async def poll(self) -> bool:
+        """
+        Query the servers and store the snapshot, publishing it when it changed.
+
+        The snapshot expires after three intervals, so the clients do not get a stale
+        status once no worker polls anymore.
+
+        Returns
+        -------
+            bool: True if the snapshot changed.
+        """
+        statuses = await self.servers_service.get_status(
+            timeout=self.timeout,
+            retries=self.retries,
+        )
+        payload = json.dumps(jsonable_encoder(statuses))
+        previous = await self.redis.set(
+            self.snapshot_key,
+            payload,
+            px=self.ttl,
+            get=True,
+        )
+        if isinstance(previous, bytes):
+            previous = previous.decode()
+        if previous == payload:
+            return False
+        if self.broadcast is not None:
+            await self.broadcast.publish(channel=self.channel, message=payload)
+        return True
+
+    async def acquire_leadership(self) -> bool:
+        """
+        Acquire or renew the leader lock.
+
+        The lock expires after three intervals, so another worker takes over when the
+        leader dies. The renewal checks and extends the lock in one script, so it never
+        extends the lock another worker acquired meanwhile.
+
+        Returns
+        -------
+            bool: True if this poller is the leader.
+        """
+        if await self.redis.set(self.leader_key, self.token, nx=True, px=self.ttl):
+            return True
+        return bool(
+            await self._renew_lock(keys=[self.leader_key], args=[self.token, self.ttl]),
+        )
+
+    async def run(self) -> None:
+        """Poll the servers until cancelled while being the leader."""
+        try:
+            while True:
+                try:
+                    if await self.acquire_leadership():
+                        await self.poll()
+                except Exception as e:  # noqa: BLE001
+                    logger.error(f"Server status poll failed -> {e!r}")
+                await asyncio.sleep(self.interval)
+        finally:
+            await self._release_lock(keys=[self.leader_key], args=[self.token])
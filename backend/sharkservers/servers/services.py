@@ -1,9 +1,11 @@
 """Services for servers app."""
 from __future__ import annotations
 
-from steam import game_servers as gs
+import asyncio
 
 from sharkservers.db import BaseService
+from sharkservers.logger import logger
+from sharkservers.servers.a2s import A2SError, a2s_info
 from sharkservers.servers.exceptions import (
     server_not_found_exception,
 )
@@ -26,47 +28,82 @@ class ServerService(BaseService):
 
         model = Server
         not_found_exception = server_not_found_exception
+        cache_ttl = 60
 
-    async def get_status(self) -> list[ServerStatusSchema]:
+    async def get_status(
+        self,
+        timeout: float = 2.0,
+        retries: int = 1,
+    ) -> list[ServerStatusSchema]:
         """
         Retrieve the status of all servers.
 
-        Returns
+        The servers are queried concurrently, so the total latency is bounded by the
+        slowest server instead of the sum of all of them.
+
+        Args:
+        ----
+            timeout (float, optional): The timeout of a single query attempt in seconds. Defaults to 2.0.
+            retries (int, optional): The number of retries after a timeout. Defaults to 1.
+
+        Returns:
         -------
             list: A list of server status objects.
         """
-        servers_with_status: list[ServerStatusSchema] = []
         servers_from_db = await self.Meta.model.objects.all()
+        return list(
+            await asyncio.gather(
+                *[
+                    self.get_server_status(server, timeout=timeout, retries=retries)
+                    for server in servers_from_db
+                ],
+            ),
+        )
+
+    @staticmethod
+    async def get_server_status(
+        server: Server,
+        timeout: float = 2.0,
+        retries: int = 1,
+    ) -> ServerStatusSchema:
+        """
+        Retrieve the status of a single server.
+
+        Args:
+        ----
+            server (Server): The server.
+            timeout (float, optional): The timeout of a single query attempt in seconds. Defaults to 2.0.
+            retries (int, optional): The number of retries after a timeout. Defaults to 1.
+
+        Returns:
+        -------
+            ServerStatusSchema: The server status, empty if the server is unreachable.
+        """
         try:
-            for server in servers_from_db:
-                server_status = gs.a2s_info((server.ip, server.port))
-                name = server_status.get("name", "invalid name")
-                players = server_status.get("players", 0)
-                max_players = server_status.get("max_players", 0)
-                map = server_status.get("map", "invalid_map")  # noqa: A001
-                server_status_schema = ServerStatusSchema(
-                    id=server.id,
-                    name=name,
-                    ip=server.ip,
-                    port=server.port,
-                    players=players,
-                    max_players=max_players,
-                    map=map,
-                    game="tf2",
-                )
-                servers_with_status.append(server_status_schema)
-        except ConnectionRefusedError:
-            servers_with_status.append(
-                ServerStatusSchema(
-                    id=server.id,
-                    name=server.name,
-                    ip=server.ip,
-                    port=server.port,
-                    players=0,
-                    max_players=0,
-                    map="invalid_map",
-                    game="tf2",
-                ),
+            server_status = await a2s_info(
+                (server.ip, server.port),
+                timeout=timeout,
+                retries=retries,
             )
-
-        return servers_with_status
+        except (TimeoutError, OSError, A2SError) as e:
+            logger.warning(f"Server {server.ip}:{server.port} status failed -> {e!r}")
+            return ServerStatusSchema(
+                id=server.id,
+                name=server.name,
+                ip=server.ip,
+                port=server.port,
+                players=0,
+                max_players=0,
+                map="invalid_map",
+                game="tf2",
+            )
+        return ServerStatusSchema(
+            id=server.id,
+            name=server_status.get("name", "invalid name"),
+            ip=server.ip,
+            port=server.port,
+            players=server_status.get("players", 0),
+            max_players=server_status.get("max_players", 0),
+            map=server_status.get("map", "invalid_map"),
+            game="tf2",
+        )
@@ -6,14 +6,17 @@ from fastapi_pagination import Page, Params
 from ormar import Model
 
 from sharkservers.servers.dependencies import (
+    get_server_status_poller,
     get_servers_service,
     get_valid_server,
 )
+from sharkservers.servers.poller import ServerStatusPoller
 from sharkservers.servers.schemas import (
     ServerOut,
     ServerStatusSchema,
 )
 from sharkservers.servers.services import ServerService
+from sharkservers.settings import Settings, get_settings
 
 router = APIRouter()
 
@@ -47,24 +50,33 @@ async def get_servers(
 
 @router.get("/status")
 async def get_servers_status(
+    poller: ServerStatusPoller = Depends(get_server_status_poller),
     servers_service: ServerService = Depends(get_servers_service),
+    settings: Settings = Depends(get_settings),
 ) -> list[ServerStatusSchema]:
     """
     Retrieve the status of servers.
 
+    The status is read from the snapshot stored by the background poller. The servers are
+    queried live only until the first snapshot is stored.
+
     Args:
     ----
+        poller (ServerStatusPoller): The server status poller holding the snapshot.
         servers_service (ServerService): The server service instance used to retrieve server status.
+        settings (Settings): The application settings.
 
     Returns:
     -------
         list[ServerStatusSchema]: A list of server status objects.
-
-    Raises:
-    ------
-        ConnectionRefusedError: If there is an error retrieving the server status.
     """
-    return await servers_service.get_status()
+    snapshot = await poller.get_snapshot()
+    if snapshot is not None:
+        return snapshot
+    return await servers_service.get_status(
+        timeout=settings.SERVER_QUERY_TIMEOUT,
+        retries=settings.SERVER_QUERY_RETRIES,
+    )
 
 
 @router.get("/{server_id}")
@@ -1,14 +1,14 @@
 """Services module."""
+from __future__ import annotations
 
 import json
 import os
 import uuid
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import httpx
 from fastapi import HTTPException, UploadFile
-from fastapi_mail.email_utils import DefaultChecker
-from PIL import Image, UnidentifiedImageError
 from pydantic import EmailStr
 from starlette import status
 
@@ -20,6 +20,8 @@ from sharkservers.scopes.services import ScopeService
 from sharkservers.settings import Settings
 from sharkservers.users.models import User
 
+if TYPE_CHECKING:
+    from fastapi_mail.email_utils import DefaultChecker
 
 
 class EmailService:
@@ -218,6 +220,9 @@ class UploadService:
             f.write(file_content)
 
     def resize_image(self, file_path: Path, width: int = None, height: int = None):
+        # Pillow is only needed by the avatar uploads
+        from PIL import Image, UnidentifiedImageError
+
         try:
             if not width:
                 width = self.settings.AVATAR_WIDTH
@@ -5,6 +5,8 @@ from functools import lru_cache
 
 from pydantic import BaseSettings, EmailStr
 
+from sharkservers.enums import OverflowPolicyEnum
+
 
 class Settings(BaseSettings):
     """
@@ -17,6 +19,7 @@ class Settings(BaseSettings):
     POSTGRES_USER (str): The username for connecting to the PostgreSQL database.
     POSTGRES_PASSWORD (str): The password for connecting to the PostgreSQL database.
     TESTING (bool): Flag indicating whether the application is running in testing mode. Default is False.
+    FAKE_REDIS (bool): Flag indicating whether fakeredis replaces the Redis server, like in testing mode. Default is False.
     SECRET_KEY (str): The secret key used for cryptographic operations.
     REFRESH_SECRET_KEY (str): The secret key used for refreshing access tokens.
     ALGORITHM (str): The algorithm used for token generation. Default is "HS256".
@@ -41,6 +44,25 @@ class Settings(BaseSettings):
     STRIPE_API_KEY (str): The API key for accessing the Stripe API.
     STRIPE_WEBHOOK_SECRET (str): The secret key for verifying Stripe webhook events.
     SITE_URL (str): The base URL of the site. Default is "http://localhost:8080".
+    USERS_ONLINE_WINDOW (int): Minutes a user is considered online after the last activity. Default is 15.
+    PRINCIPAL_CACHE_TTL (int): Seconds an authenticated user is cached in Redis. Default is 60.
+    PRINCIPAL_CACHE_LOCAL_TTL (float): Seconds an authenticated user is cached in process. Default is 5.
+    PRINCIPAL_CACHE_SIZE (int): The maximum number of users cached in process. Default is 1024.
+    SERVICE_CACHE_LOCAL_TTL (float): Seconds a cached service query is kept in process. Default is 5.
+    SERVICE_CACHE_LOCAL_SIZE (int): The maximum number of service queries cached in process. Default is 1024.
+    PASSWORD_HASHER_WORKERS (int): The number of threads hashing passwords. Default is 4.
+    PASSWORD_HASHER_QUEUE_SIZE (int): The maximum number of waiting password hashes. Default is 64.
+    SERVER_QUERY_TIMEOUT (float): Seconds to wait for a game server A2S response. Default is 2.
+    SERVER_QUERY_RETRIES (int): The number of retries of a timed out A2S query. Default is 1.
+    SERVER_STATUS_POLL_INTERVAL (float): Seconds between the background server status polls. Default is 30.
+    CHAT_HISTORY_SIZE (int): The number of recent chat messages sent as the history. Default is 10.
+    CHAT_STREAM_MAXLEN (int): The approximate maximum length of the chat Redis Stream. Default is 1000.
+    WEBSOCKET_QUEUE_SIZE (int): The maximum number of messages queued for a websocket. Default is 100.
+    WEBSOCKET_OVERFLOW_POLICY (OverflowPolicyEnum): What happens when a websocket queue is full. Default is drop_oldest.
+    QUERY_INSTRUMENTATION (bool): Whether the database queries of every request are counted and timed. Default is False.
+    QUERY_N_PLUS_ONE_THRESHOLD (int): The number of runs of the same statement in a request reported as N+1. Default is 5.
+    METRICS_PUBLISH_INTERVAL (float): Seconds between the publications of the worker metrics to Redis. Default is 15.
+    METRICS_TOKEN (str): The bearer token required by the /metrics endpoint, which is disabled when empty.
 
     Methods
     -------
@@ -54,6 +76,7 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = ""
     POSTGRES_PASSWORD: str = ""
     TESTING: bool = False
+    FAKE_REDIS: bool = False
     SECRET_KEY: str = ""
     REFRESH_SECRET_KEY: str = ""
     ALGORITHM: str = "HS256"
@@ -79,6 +102,25 @@ class Settings(BaseSettings):
     STRIPE_WEBHOOK_SECRET: str = ""
     SITE_URL: str = "http://localhost:8080"
     RESEND_API_KEY: str = ""
+    USERS_ONLINE_WINDOW: int = 15
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_LOCAL_TTL: float = 5.0
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    SERVICE_CACHE_LOCAL_TTL: float = 5.0
+    SERVICE_CACHE_LOCAL_SIZE: int = 1024
+    PASSWORD_HASHER_WORKERS: int = 4
+    PASSWORD_HASHER_QUEUE_SIZE: int = 64
+    SERVER_QUERY_TIMEOUT: float = 2.0
+    SERVER_QUERY_RETRIES: int = 1
+    SERVER_STATUS_POLL_INTERVAL: float = 30.0
+    CHAT_HISTORY_SIZE: int = 10
+    CHAT_STREAM_MAXLEN: int = 1000
+    WEBSOCKET_QUEUE_SIZE: int = 100
+    WEBSOCKET_OVERFLOW_POLICY: OverflowPolicyEnum = OverflowPolicyEnum.DROP_OLDEST
+    QUERY_INSTRUMENTATION: bool = False
+    QUERY_N_PLUS_ONE_THRESHOLD: int = 5
+    METRICS_PUBLISH_INTERVAL: float = 15.0
+    METRICS_TOKEN: str = ""
 
     class Config:
         """The Config class represents the configuration settings for the Settings class."""
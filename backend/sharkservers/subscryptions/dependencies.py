@@ -1,4 +1,3 @@
-import stripe
 from fastapi import Depends
 
 from sharkservers.settings import Settings, get_settings
@@ -6,6 +5,9 @@ from sharkservers.subscryptions.services import UserSubscryptionService
 
 
 def get_stripe(settings: Settings = Depends(get_settings)):
+    # stripe takes longer to import than the rest of the application
+    import stripe
+
     stripe.api_key = settings.STRIPE_API_KEY
     return stripe
 
@@ -1,10 +1,9 @@
 import datetime
+from typing import TYPE_CHECKING
 from venv import logger
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Security
 from ormar import NoMatch
-from stripe import Subscription
-from stripe.error import SignatureVerificationError
 
 from sharkservers.auth.dependencies import get_current_active_user
 from sharkservers.logger import logger
@@ -18,6 +17,9 @@ from sharkservers.users.dependencies import get_users_service
 from sharkservers.users.models import User
 from sharkservers.users.services import UserService
 
+if TYPE_CHECKING:
+    from stripe import Subscription
+
 router = APIRouter()
 
 
@@ -118,7 +120,7 @@ async def get_webhook(
         logger.info(e)
         raise HTTPException(status=400)
 
-    except SignatureVerificationError as e:
+    except _stripe.error.SignatureVerificationError as e:
         logger.info(e)
         # Invalid signature
         raise HTTPException(400, "Cannot validate signature")
@@ -151,7 +153,7 @@ async def get_webhook(
                 pk=ProtectedDefaultRolesEnum.USER.value,
             )
 
-        await user.update(display_role=vip_role)
+        await user.update(_columns=["display_role"], display_role=vip_role)
         new_user_subscryption = await user_subscryption_service.create(
             user=user,
             stripe_subscription_id=subscryption.get("id"),
@@ -193,7 +195,7 @@ async def get_webhook(
         if old_display_role.id == ProtectedDefaultRolesEnum.VIP.value:
             await user.load("roles")
             old_display_role = user.roles.all()[0]
-        await user.update(display_role=old_display_role)
+        await user.update(_columns=["display_role"], display_role=old_display_role)
         await user_subscryption.update(stripe_subscription_id=None)
         logger.info(session)
         logger.info("User skonczyl subscrybcje")
@@ -9,17 +9,25 @@ Functions:
 - get_valid_user: Validates a user ID and returns the corresponding user model.
 - get_users_sessions_service: Returns an instance of the UserSessionService class.
 - get_valid_user_session: Validates a user session ID and returns the corresponding user session model.
+- get_presence_service: Returns an instance of the PresenceService class.
 """
 from uuid import UUID
 
 from fastapi import Depends
 from ormar import Model, NoMatch
+from redis import asyncio as aioredis
 from uuidbase62 import UUIDBase62, get_validated_uuidbase62_by_model
 
+from sharkservers.db import get_redis
+from sharkservers.settings import Settings, get_settings
 from sharkservers.users.exceptions import user_not_found_exception
 from sharkservers.users.models import UserSession
 from sharkservers.users.schemas import UserOut
-from sharkservers.users.services import UserService, UserSessionService
+from sharkservers.users.services import (
+    PresenceService,
+    UserService,
+    UserSessionService,
+)
 
 
 async def get_users_service() -> UserService:
@@ -101,3 +109,22 @@ async def get_valid_user_session(
         )
     except NoMatch:
         raise user_not_found_exception from None
+
+
+async def get_presence_service(
+    redis: aioredis.Redis = Depends(get_redis),
+    settings: Settings = Depends(get_settings),
+) -> PresenceService:
+    """
+    Get the PresenceService instance.
+
+    Args:
+    ----
+        redis (aioredis.Redis): The Redis instance.
+        settings (Settings): The application settings.
+
+    Returns:
+    -------
+        PresenceService: The PresenceService instance.
+    """
+    return PresenceService(redis=redis, online_window=settings.USERS_ONLINE_WINDOW)
@@ -17,7 +17,7 @@ from typing import TYPE_CHECKING
 import ormar
 
 from sharkservers.auth.utils import now_datetime
-from sharkservers.db import BaseMeta, DateFieldsMixins
+from sharkservers.db import BaseMeta, DateFieldsMixins, uuid7
 from sharkservers.players.models import Player
 from sharkservers.roles.models import Role
 
@@ -43,7 +43,7 @@ class UserSession(ormar.Model, DateFieldsMixins):
 
         tablename = "user_sessions"
 
-    id: str = ormar.UUID(primary_key=True, default=uuid.uuid4)
+    id: str = ormar.UUID(primary_key=True, default=uuid7)
     user_ip: str = ormar.String(max_length=255)
     user_agent: str = ormar.String(max_length=255)
 
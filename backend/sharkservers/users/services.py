@@ -4,24 +4,32 @@ Module contains the services for managing user-related operations.
 It includes the following classes:
 - UserService: Provides methods for managing user data, such as changing username, password, and display role.
 - UserSessionService: Provides methods for managing user session data.
+- PresenceService: Tracks the online users in Redis and flushes their last online time to the database.
 
 """
+from __future__ import annotations
 
 import json
-from datetime import timedelta
+import uuid
+from datetime import datetime, timedelta
 from sqlite3 import IntegrityError as SQLIntegrityError
 
+import sqlalchemy
 from asyncpg import UniqueViolationError
 from fastapi import HTTPException, Request, UploadFile
 from fastapi_pagination import Page, Params
 from psycopg2 import IntegrityError
 from pydantic import EmailStr
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
 
 from sharkservers.auth.exceptions import invalid_activation_code_exception
 from sharkservers.auth.services.code import CodeService
-from sharkservers.auth.utils import get_password_hash, now_datetime, verify_password
-from sharkservers.db import BaseService
-from sharkservers.forum.services import PostService, ThreadService
+from sharkservers.auth.services.hasher import password_hasher
+from sharkservers.auth.utils import now_datetime
+from sharkservers.counters import CounterReconciler
+from sharkservers.db import BaseService, database
+from sharkservers.forum.counters import USER_COUNTERS
 from sharkservers.logger import logger
 from sharkservers.services import UploadService
 from sharkservers.settings import Settings
@@ -41,6 +49,139 @@ from sharkservers.users.schemas import (
 )
 
 
+class PresenceService:
+    """
+    Service class for tracking the online users in Redis sorted sets.
+
+    Every authenticated request only touches the `online` set, the last online time
+    is written to the database in batches by `flush`.
+
+    Attributes
+    ----------
+        redis (aioredis.Redis): Redis instance for presence storage.
+        online_window (timedelta): How long a user is considered online after the last activity.
+    """
+
+    online_key = "users:online"
+    dirty_key = "users:online:dirty"
+    flush_batch_size = 500
+
+    def __init__(self, redis: aioredis.Redis, online_window: int = 15) -> None:
+        """
+        Initialize the PresenceService.
+
+        Args:
+        ----
+            redis (aioredis.Redis): Redis instance for presence storage.
+            online_window (int, optional): The online window in minutes. Defaults to 15.
+        """
+        self.redis = redis
+        self.online_window = timedelta(minutes=online_window)
+
+    async def touch(self, user_id: uuid.UUID) -> None:
+        """
+        Record the activity of a user.
+
+        Args:
+        ----
+            user_id (uuid.UUID): The ID of the user.
+        """
+        score = now_datetime().timestamp()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self.online_key, {str(user_id): score})
+            pipe.zadd(self.dirty_key, {str(user_id): score})
+            await pipe.execute()
+
+    async def get_online_user_ids(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[uuid.UUID], int]:
+        """
+        Get the IDs of the online users, most recently active first.
+
+        Args:
+        ----
+            offset (int, optional): The number of users to skip. Defaults to 0.
+            limit (int, optional): The maximum number of users to return. Defaults to None.
+
+        Returns:
+        -------
+            tuple[list[uuid.UUID], int]: The user IDs and the total number of online users.
+        """
+        min_score = f"({(now_datetime() - self.online_window).timestamp()}"
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcount(self.online_key, min_score, "+inf")
+            pipe.zrevrangebyscore(
+                self.online_key,
+                "+inf",
+                min_score,
+                start=offset if limit is not None else None,
+                num=limit,
+            )
+            total, members = await pipe.execute()
+        return [uuid.UUID(self._decode(member)) for member in members], total
+
+    async def flush(self) -> int:
+        """
+        Write the last online time of the recently active users to the database.
+
+        The pending entries are moved to a unique key first, so activity recorded
+        during the flush is left for the next one. When the database write fails they
+        are merged back into the pending entries and the error is raised.
+
+        Returns
+        -------
+            int: The number of flushed users.
+        """
+        flushing_key = f"{self.dirty_key}:{uuid.uuid4().hex}"
+        try:
+            await self.redis.rename(self.dirty_key, flushing_key)
+        except ResponseError:
+            # Nothing to flush
+            return 0
+        try:
+            entries = await self.redis.zrange(flushing_key, 0, -1, withscores=True)
+            table = User.Meta.table
+            for i in range(0, len(entries), self.flush_batch_size):
+                last_online = {
+                    uuid.UUID(self._decode(member)): datetime.fromtimestamp(score)  # noqa: DTZ006
+                    for member, score in entries[i : i + self.flush_batch_size]
+                }
+                await database.execute(
+                    table.update()
+                    .where(table.c.id.in_(last_online))
+                    .values(
+                        last_online=sqlalchemy.case(
+                            *[
+                                (table.c.id == user_id, value)
+                                for user_id, value in last_online.items()
+                            ],
+                        ),
+                    ),
+                )
+        except Exception:
+            # keep the entries for the next flush, with the newest activity of a user
+            await self.redis.zunionstore(
+                self.dirty_key,
+                [self.dirty_key, flushing_key],
+                aggregate="MAX",
+            )
+            await self.redis.delete(flushing_key)
+            raise
+        await self.redis.delete(flushing_key)
+        await self.redis.zremrangebyscore(
+            self.online_key,
+            "-inf",
+            (now_datetime() - self.online_window).timestamp(),
+        )
+        return len(entries)
+
+    @staticmethod
+    def _decode(member: str | bytes) -> str:
+        return member.decode() if isinstance(member, bytes) else member
+
+
 class UserService(BaseService):
     """Service class for managing user-related operations."""
 
@@ -50,24 +191,43 @@ class UserService(BaseService):
         model = User
         not_found_exception = user_not_found_exception
 
-    async def get_last_online_users(self, params: Params) -> Page[UserOut]:
+    async def get_last_online_users(
+        self,
+        params: Params,
+        presence_service: PresenceService,
+    ) -> Page[UserOut]:
         """
         Get the last online users.
 
         Args:
         ----
             params (Params): Pagination parameters.
+            presence_service (PresenceService): The presence service.
 
         Returns:
         -------
             Page[UserOut]: A paginated list of UserOut objects.
 
         """
-        filter_after = now_datetime() - timedelta(minutes=15)
-        return await self.get_all(
-            params=params,
-            related=["display_role", "player", "player__steamrep_profile"],
-            last_online__gt=filter_after,
+        raw_params = params.to_raw_params()
+        user_ids, total = await presence_service.get_online_user_ids(
+            offset=raw_params.offset,
+            limit=raw_params.limit,
+        )
+        users = []
+        if user_ids:
+            users = (
+                await self.Meta.model.objects.select_related(
+                    ["display_role", "player", "player__steamrep_profile"],
+                )
+                .filter(id__in=user_ids)
+                .all()
+            )
+        users_by_id = {user.id: user for user in users}
+        return Page.create(
+            [users_by_id[user_id] for user_id in user_ids if user_id in users_by_id],
+            params,
+            total=total,
         )
 
     @staticmethod
@@ -93,7 +253,10 @@ class UserService(BaseService):
 
         """
         try:
-            await user.update(username=change_username_data.username)
+            await user.update(
+                _columns=["username"],
+                username=change_username_data.username,
+            )
         except (UniqueViolationError, IntegrityError, SQLIntegrityError) as err:
             raise username_not_available_exception from err
         else:
@@ -121,10 +284,15 @@ class UserService(BaseService):
             invalid_current_password_exception: If the current password is invalid.
 
         """
-        if not verify_password(change_password_data.current_password, user.password):
+        # the cached principal does not hold the password hash
+        stored = await User.objects.get(id=user.id)
+        if not await password_hasher.verify(
+            change_password_data.current_password,
+            stored.password,
+        ):
             raise invalid_current_password_exception
-        new_password = get_password_hash(change_password_data.new_password)
-        await user.update(password=new_password)
+        new_password = await password_hasher.hash(change_password_data.new_password)
+        await user.update(_columns=["password"], password=new_password)
         return user
 
     @staticmethod
@@ -157,7 +325,10 @@ class UserService(BaseService):
                 break
         if not display_role_exists_in_user_roles:
             raise cannot_change_display_role_exception
-        await user.update(display_role=change_display_role_data.role_id)
+        await user.update(
+            _columns=["display_role"],
+            display_role=change_display_role_data.role_id,
+        )
         return user, old_user_display_role
 
     @staticmethod
@@ -224,7 +395,7 @@ class UserService(BaseService):
         user_id = int(user_id)
 
         user = await self.get_one(id=user_id, related=["display_role", "roles"])
-        await user.update(email=new_email)
+        await user.update(_columns=["email"], email=new_email)
         await code_service.delete(code)
         return user
 
@@ -265,7 +436,7 @@ class UserService(BaseService):
             )
             avatar_url = request.url_for("static", path=f"uploads/avatars/{file_name}")
             old_avatar_url = user.avatar
-            await user.update(avatar=str(avatar_url))
+            await user.update(_columns=["avatar"], avatar=str(avatar_url))
             if old_avatar_url != default_avatar_url:
                 old_avatar_filename = old_avatar_url.split("/")[-1]
                 upload_service.delete_avatar(old_avatar_filename)
@@ -280,39 +451,13 @@ class UserService(BaseService):
         except HTTPException:  # noqa: TRY302
             raise
 
-    async def sync_counters(
-        self,
-        threads_service: ThreadService,
-        posts_service: PostService,
-    ) -> None:
-        """
-        Synchronize the thread and post counters for all users.
-
-        Args:
-        ----
-            threads_service (ThreadService): The thread service object.
-            posts_service (PostService): The post service object.
-
-        """
+    async def sync_counters(self) -> None:
+        """Synchronize the thread, post and like counters for all users."""
         try:
-            users = await self.Meta.model.objects.select_related(
-                ["user_threads", "user_posts", "user_reputation"],
-            ).all()
-            for user in users:
-                threads_count = (
-                    await threads_service.Meta.model.objects.select_related("posts")
-                    .filter(author=user)
-                    .count()
-                )
-                posts_count = (
-                    await posts_service.Meta.model.objects.select_related("likes")
-                    .filter(author=user)
-                    .count()
-                )
-                await user.update(threads_count=threads_count, posts_count=posts_count)
-            logger.info(f"Finished sync counters to users -> {len(users)}")
+            report = await CounterReconciler(USER_COUNTERS).reconcile()
+            logger.info(f"Finished sync counters to users -> {report}")
         except Exception as e:  # noqa: BLE001
-            logger.error(e.message)
+            logger.error(e)
 
 
 class UserSessionService(BaseService):
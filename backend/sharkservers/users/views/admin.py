@@ -19,7 +19,7 @@ from fastapi_pagination import Page, Params
 from sharkservers.auth.dependencies import get_admin_user, get_auth_service
 from sharkservers.auth.schemas import RegisterUserSchema
 from sharkservers.auth.services.auth import AuthService
-from sharkservers.auth.utils import get_password_hash
+from sharkservers.auth.services.hasher import password_hasher
 from sharkservers.roles.dependencies import get_roles_service
 from sharkservers.roles.services import RoleService
 from sharkservers.settings import Settings, get_settings
@@ -177,7 +177,7 @@ async def admin_update_user(
     update_user_data_dict.update(filtered)
     password = update_user_data_dict.pop("password", None)
     if password:
-        password_hash = get_password_hash(password)
+        password_hash = await password_hasher.hash(password)
         update_user_data_dict.update(password=password_hash)
     roles_ids: list[int] | None = update_user_data_dict.pop("roles", None)
     display_role_id: int | None = update_user_data_dict.pop("display_role", None)
@@ -193,6 +193,9 @@ async def admin_update_user(
             await validate_user.roles.add(role)
     if display_role_id:
         display_role = await roles_service.get_one(id=display_role_id)
-        await validate_user.update(display_role=display_role)
-    await validate_user.update(**update_user_data_dict)
+        await validate_user.update(_columns=["display_role"], display_role=display_role)
+    await validate_user.update(
+        _columns=list(update_user_data_dict),
+        **update_user_data_dict,
+    )
     return validate_user
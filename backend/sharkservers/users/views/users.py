@@ -9,20 +9,27 @@ Endpoints:
 - GET /users/{user_id}/posts: Retrieves a paginated list of posts made by a specific user.
 - GET /users/{user_id}/threads: Retrieves a paginated list of threads created by a specific user.
 """
+from __future__ import annotations
+
 from fastapi import APIRouter, Depends
 from fastapi_pagination import Page, Params
 
+from sharkservers.dependencies import get_pagination_params
 from sharkservers.forum.dependencies import get_posts_service, get_threads_service
 from sharkservers.forum.schemas import PostOut, ThreadOut
 from sharkservers.forum.services import PostService, ThreadService
 from sharkservers.roles.dependencies import get_roles_service
 from sharkservers.roles.schemas import StaffRolesSchema
 from sharkservers.roles.services import RoleService
-from sharkservers.schemas import OrderQuery
-from sharkservers.users.dependencies import get_users_service, get_valid_user
+from sharkservers.schemas import CursorPage, CursorParams, OrderQuery
+from sharkservers.users.dependencies import (
+    get_presence_service,
+    get_users_service,
+    get_valid_user,
+)
 from sharkservers.users.models import User
 from sharkservers.users.schemas import UserOut, UserQuery
-from sharkservers.users.services import UserService
+from sharkservers.users.services import PresenceService, UserService
 
 router = APIRouter()
 
@@ -83,6 +90,7 @@ async def get_staff_users(
 async def get_last_online_users(
     params: Params = Depends(),
     users_service: UserService = Depends(get_users_service),
+    presence_service: PresenceService = Depends(get_presence_service),
 ) -> Page[UserOut]:
     """
     Retrieve the last online users based on the provided parameters.
@@ -91,12 +99,16 @@ async def get_last_online_users(
     ----
         params (Params): The parameters for filtering the users.
         users_service (UserService): The service for retrieving user data.
+        presence_service (PresenceService): The service for retrieving the online users.
 
     Returns:
     -------
         Page[UserOut]: A paginated list of UserOut objects representing the last online users.
     """
-    return await users_service.get_last_online_users(params=params)
+    return await users_service.get_last_online_users(
+        params=params,
+        presence_service=presence_service,
+    )
 
 
 @router.get("/{user_id}", response_model=UserOut)
@@ -118,24 +130,24 @@ async def get_user(user: User = Depends(get_valid_user)) -> UserOut:
 
 @router.get("/{user_id}/posts")
 async def get_user_posts(
-    params: Params = Depends(),
+    params: Params | CursorParams = Depends(get_pagination_params),
     queries: OrderQuery = Depends(),
     user: User = Depends(get_valid_user),
     posts_service: PostService = Depends(get_posts_service),
-) -> Page[PostOut]:
+) -> CursorPage[PostOut] | Page[PostOut]:
     """
     Retrieve all posts authored by a specific user.
 
     Args:
     ----
-        params (Params, optional): The parameters for pagination and filtering. Defaults to Depends().
+        params (Params | CursorParams, optional): The parameters for pagination. Defaults to Depends(get_pagination_params).
         queries (OrderQuery, optional): The query parameters for ordering. Defaults to Depends().
         user (User, optional): The authenticated user. Defaults to Depends(get_valid_user).
         posts_service (PostService, optional): The service for retrieving posts. Defaults to Depends(get_posts_service).
 
     Returns:
     -------
-        Page[PostOut]: A paginated list of PostOut objects.
+        CursorPage[PostOut] | Page[PostOut]: A paginated list of PostOut objects.
 
     """
     return await posts_service.get_all(
@@ -9,21 +9,46 @@ Functions:
 - disconnect_db: Disconnects from the database and closes the Redis connection.
 - connect_broadcast: Connects to the broadcast service.
 - disconnect_broadcast: Disconnects from the broadcast service.
+- start_server_status_poller: Starts the background server status poller.
+- stop_server_status_poller: Stops the background server status poller.
+- start_metrics_publisher: Starts publishing the worker metrics.
+- stop_metrics_publisher: Stops publishing the worker metrics.
 
 Context Managers:
 - app_lifespan: Manages the lifespan of the FastAPI application.
 """
+import asyncio
+import contextlib
 import os
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
-from broadcaster import Broadcast
 from fastapi import APIRouter, FastAPI
 from fastapi_limiter import FastAPILimiter
 
+from .auth.services.hasher import password_hasher
+from .auth.services.principal import principal_cache
+from .cache import service_cache
+from .chat.history import chat_history
 from .db import REDIS_URL, create_redis_pool, database
-
-broadcast = Broadcast(REDIS_URL)
+from .hub import LazyBroadcast, SubscriptionHub
+from .metrics import (
+    instrument_broadcast,
+    metrics_publisher,
+    track_database_pool,
+    track_hub,
+    track_password_hasher,
+)
+from .servers.poller import ServerStatusPoller
+from .servers.services import ServerService
+from .settings import get_settings
+
+broadcast = instrument_broadcast(LazyBroadcast(REDIS_URL))
+hub = SubscriptionHub(
+    broadcast,
+    queue_size=get_settings().WEBSOCKET_QUEUE_SIZE,
+    policy=get_settings().WEBSOCKET_OVERFLOW_POLICY,
+)
 
 script_dir = os.path.dirname(__file__)  # noqa: PTH120
 st_abs_file_path = os.path.join(script_dir, "../static/")  # noqa: PTH118
@@ -95,6 +120,25 @@ async def connect_db(_app: FastAPI) -> FastAPI:
         await database.connect()
     _app.state.redis = await create_redis_pool()
     await FastAPILimiter.init(_app.state.redis)
+    settings = get_settings()
+    principal_cache.init(
+        _app.state.redis,
+        ttl=settings.PRINCIPAL_CACHE_TTL,
+        local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+        max_size=settings.PRINCIPAL_CACHE_SIZE,
+    )
+    await principal_cache.subscribe()
+    chat_history.init(
+        _app.state.redis,
+        size=settings.CHAT_HISTORY_SIZE,
+        maxlen=settings.CHAT_STREAM_MAXLEN,
+    )
+    service_cache.init(
+        _app.state.redis,
+        local_ttl=settings.SERVICE_CACHE_LOCAL_TTL,
+        max_size=settings.SERVICE_CACHE_LOCAL_SIZE,
+    )
+    await service_cache.subscribe()
     return _app
 
 
@@ -109,6 +153,11 @@ async def disconnect_db(_app: FastAPI) -> None:
     database_ = _app.state.database
     if database_.is_connected:
         await database_.disconnect()
+    await principal_cache.unsubscribe()
+    principal_cache.close()
+    chat_history.close()
+    await service_cache.unsubscribe()
+    service_cache.close()
     await _app.state.redis.close()
 
 
@@ -125,6 +174,7 @@ async def connect_broadcast(_app: FastAPI) -> FastAPI:
         FastAPI: The updated FastAPI application.
     """
     _app.state.broadcast = broadcast
+    _app.state.hub = hub
     await broadcast.connect()
     return _app
 
@@ -137,10 +187,90 @@ async def disconnect_broadcast(_app: FastAPI) -> None:
     ----
         _app (FastAPI): The FastAPI application.
     """
+    await hub.close()
     broadcast_ = _app.state.broadcast
     await broadcast_.disconnect()
 
 
+async def start_server_status_poller(_app: FastAPI) -> FastAPI:
+    """
+    Start the background server status poller.
+
+    Every worker runs the poller, but only the one holding the leader lock queries the servers.
+
+    Args:
+    ----
+        _app (FastAPI): The FastAPI application.
+
+    Returns:
+    -------
+        FastAPI: The updated FastAPI application.
+    """
+    settings = get_settings()
+    poller = ServerStatusPoller(
+        redis=_app.state.redis,
+        servers_service=ServerService(),
+        broadcast=_app.state.broadcast,
+        interval=settings.SERVER_STATUS_POLL_INTERVAL,
+        timeout=settings.SERVER_QUERY_TIMEOUT,
+        retries=settings.SERVER_QUERY_RETRIES,
+    )
+    _app.state.server_status_poller = asyncio.create_task(poller.run())
+    return _app
+
+
+async def stop_server_status_poller(_app: FastAPI) -> None:
+    """
+    Stop the background server status poller.
+
+    Args:
+    ----
+        _app (FastAPI): The FastAPI application.
+    """
+    task = _app.state.server_status_poller
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+async def start_metrics_publisher(_app: FastAPI) -> FastAPI:
+    """
+    Start publishing the worker metrics, so `/metrics` on any worker returns all of them.
+
+    Args:
+    ----
+        _app (FastAPI): The FastAPI application.
+
+    Returns:
+    -------
+        FastAPI: The updated FastAPI application.
+    """
+    track_database_pool(database)
+    track_hub(hub)
+    track_password_hasher(password_hasher)
+    metrics_publisher.init(
+        _app.state.redis,
+        interval=get_settings().METRICS_PUBLISH_INTERVAL,
+    )
+    _app.state.metrics_publisher = asyncio.create_task(metrics_publisher.run())
+    return _app
+
+
+async def stop_metrics_publisher(_app: FastAPI) -> None:
+    """
+    Stop publishing the worker metrics.
+
+    Args:
+    ----
+        _app (FastAPI): The FastAPI application.
+    """
+    task = _app.state.metrics_publisher
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    metrics_publisher.close()
+
+
 @asynccontextmanager
 async def app_lifespan(_app: FastAPI) -> AsyncIterator[None]:
     """
@@ -157,7 +287,11 @@ async def app_lifespan(_app: FastAPI) -> AsyncIterator[None]:
     await connect_db(_app)
     await connect_broadcast(_app)
     await init_limiter(_app)
+    await start_server_status_poller(_app)
+    await start_metrics_publisher(_app)
     yield
+    await stop_metrics_publisher(_app)
+    await stop_server_status_poller(_app)
     await disconnect_db(_app)
     await disconnect_broadcast(_app)
     await close_limiter(_app)
@@ -1,34 +1,24 @@
 """
 Module containing the API routes for the SharkServers application.
 
-Includes routes for installation, generating OpenAPI documentation,
-and generating random data.
+Includes routes for installation and generating OpenAPI documentation, the synthetic
+dataset is generated by the `generate-data` command of `sharkservers.cli`.
 
 Routes:
 - /install: POST route for installing the application.
 - /generate-openapi: GET route for generating the OpenAPI documentation.
-- /generate-random-data: GET route for generating random data for testing purposes.
 """
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends
-from fastapi_events.dispatcher import dispatch
 
 from sharkservers.auth.dependencies import get_auth_service
 from sharkservers.auth.schemas import RegisterUserSchema
 from sharkservers.auth.services.auth import AuthService
-from sharkservers.forum.dependencies import (
-    get_categories_service,
-    get_posts_service,
-    get_threads_service,
-)
-from sharkservers.forum.services import CategoryService, PostService, ThreadService
 from sharkservers.roles.dependencies import get_roles_service
 from sharkservers.roles.services import RoleService
 from sharkservers.scopes.dependencies import get_scopes_service
 from sharkservers.scopes.services import ScopeService
-from sharkservers.servers.dependencies import get_servers_service
-from sharkservers.servers.services import ServerService
 from sharkservers.services import MainService
 from sharkservers.settings import Settings, get_settings
 from sharkservers.utils import installed_file_path
@@ -81,42 +71,3 @@ async def generate_openapi() -> dict[str, str]:
     """
     await MainService.generate_openapi_file()
     return {"msg": "Done"}
-
-
-@router.get("/generate-random-data")
-async def generate_random_data(  # noqa: PLR0913, D417
-    auth_service: AuthService = Depends(get_auth_service),
-    roles_service: RoleService = Depends(get_roles_service),
-    categories_service: CategoryService = Depends(get_categories_service),
-    threads_service: ThreadService = Depends(get_threads_service),
-    posts_service: PostService = Depends(get_posts_service),
-    servers_service: ServerService = Depends(get_servers_service),
-) -> dict[str, str]:
-    """
-    Endpoint for generating random data for testing purposes.
-
-    Args:
-    ----
-    - auth_service: Service for authentication.
-    - roles_service: Service for managing roles.
-    - categories_service: Service for managing categories.
-    - threads_service: Service for managing threads.
-    - posts_service: Service for managing posts.
-    - servers_service: Service for managing servers.
-
-    Returns:
-    -------
-    - A dictionary with a "msg" key indicating the success of the generation.
-    """
-    dispatch(
-        event_name="GENERATE_RANDOM_DATA",
-        payload={
-            "auth_service": auth_service,
-            "roles_service": roles_service,
-            "categories_service": categories_service,
-            "threads_service": threads_service,
-            "posts_service": posts_service,
-            "servers_service": servers_service,
-        },
-    )
-    return {"msg": "Done"}
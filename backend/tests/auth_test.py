@@ -1,15 +1,22 @@
 import asyncio
 import datetime
+import json
 from unittest import mock
 
 import pytest
+from fastapi import HTTPException
 
 from sharkservers.auth.enums import AuthExceptionsDetailEnum
 from sharkservers.auth.schemas import RegisterUserSchema
+from sharkservers.auth.services.hasher import PasswordHasher, password_hasher
+from sharkservers.auth.services.principal import PrincipalCache, principal_cache
+from sharkservers.counters import increment_counters
+from sharkservers.main import app
 from sharkservers.roles.enums import ProtectedDefaultRolesEnum
 from sharkservers.settings import get_settings
+from sharkservers.users.dependencies import get_users_service
 from sharkservers.users.models import User
-from tests.conftest import _get_auth_service
+from tests.conftest import TEST_USER, _get_auth_service
 
 TEST_REGISTER_USER = {
     "username": "Test",
@@ -266,3 +273,122 @@ async def test_auth_exception_not_logged_client(client):
 async def test_auth_logout(logged_client):
     r = await logged_client.post(LOGOUT_ENDPOINT)
     assert r.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_auth_principal_cache(logged_client):
+    principal_cache.init(app.state.redis)
+    try:
+        r = await logged_client.get("/v1/users/me")
+        assert r.status_code == 200
+        # Changes bypassing the ormar signals are not visible while the user is cached
+        await User.objects.filter(username=r.json()["username"]).update(
+            username="Cached"
+        )
+        r = await logged_client.get("/v1/users/me")
+        assert r.status_code == 200
+        assert r.json()["username"] != "Cached"
+        # Updates through the service send the update signal
+        users_service = await get_users_service()
+        user = await users_service.get_one(username="Cached")
+        await users_service.update({"username": "Serviced"}, id=user.id)
+        r = await logged_client.get("/v1/users/me")
+        assert r.status_code == 200
+        assert r.json()["username"] == "Serviced"
+        # Updates through ormar invalidate the cached user
+        user = await User.objects.get(username="Serviced")
+        await user.update(username="Updated")
+        r = await logged_client.get("/v1/users/me")
+        assert r.status_code == 200
+        assert r.json()["username"] == "Updated"
+
+        r = await logged_client.post(LOGOUT_ENDPOINT)
+        assert r.status_code == 200
+        r = await logged_client.get("/v1/users/me")
+        assert r.status_code == 401
+    finally:
+        principal_cache.close()
+
+
+@pytest.mark.anyio
+async def test_cached_principal_updates_only_its_columns(logged_client):
+    principal_cache.init(app.state.redis)
+    try:
+        r = await logged_client.get("/v1/users/me")
+        assert r.status_code == 200
+        user = await User.objects.get(username=r.json()["username"])
+        # the secrets are not cached
+        payloads = await app.state.redis.hgetall(principal_cache.get_redis_key(user.id))
+        assert list(payloads) == [user.secret_salt.encode()]
+        cached = json.loads(next(iter(payloads.values())))
+        assert "password" not in cached
+        assert "secret_salt" not in cached
+        # counters written while the principal is cached are kept
+        await increment_counters(user, posts_count=3)
+        r = await logged_client.post(
+            "/v1/users/me/password",
+            json={
+                "current_password": TEST_USER["password"],
+                "new_password": "newpassword123",
+                "new_password2": "newpassword123",
+            },
+        )
+        assert r.status_code == 200
+        user = await User.objects.get(id=user.id)
+        assert user.posts_count == 3
+        assert await password_hasher.verify("newpassword123", user.password)
+    finally:
+        principal_cache.close()
+
+
+@pytest.mark.anyio
+async def test_principal_cache_invalidated_by_other_worker(logged_client):
+    worker, other_worker = PrincipalCache(), PrincipalCache()
+    for cache in (worker, other_worker):
+        cache.init(app.state.redis)
+        await cache.subscribe()
+    try:
+        user = await User.objects.select_related(
+            ["roles", "display_role", "roles__scopes"]
+        ).first()
+        await worker.set(user)
+        # only the in-process entry of the worker is left
+        await app.state.redis.delete(worker.get_redis_key(user.id))
+        assert await worker.get(user.id, user.secret_salt) is not None
+        await other_worker.invalidate(user.id)
+        for _ in range(100):
+            if await worker.get(user.id, user.secret_salt) is None:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            pytest.fail("The invalidation was not received")
+        await worker.set(user)
+        await app.state.redis.delete(worker.get_redis_key(user.id))
+        await other_worker.invalidate_all()
+        for _ in range(100):
+            if await worker.get(user.id, user.secret_salt) is None:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            pytest.fail("The invalidation of all users was not received")
+    finally:
+        for cache in (worker, other_worker):
+            await cache.unsubscribe()
+            cache.close()
+
+
+@pytest.mark.anyio
+async def test_password_hasher():
+    hasher = PasswordHasher(workers=1, queue_size=1)
+    password_hash = await hasher.hash("test123456")
+    assert await hasher.verify("test123456", password_hash)
+    assert not await hasher.verify("wrong", password_hash)
+
+    results = await asyncio.gather(
+        *[hasher.hash("test123456") for _ in range(3)],
+        return_exceptions=True,
+    )
+    assert [isinstance(r, HTTPException) for r in results] == [False, False, True]
+    assert results[2].status_code == 503
+    assert hasher.rejected == 1
+    assert hasher.in_flight == 0
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from fastapi_pagination import Params
+
+from sharkservers.cache import LocalCache, ServiceCache, service_cache
+from sharkservers.counters import increment_counters
+from sharkservers.db import create_redis_pool, database
+from sharkservers.forum.dependencies import get_categories_service
+from sharkservers.forum.models import Category
+from sharkservers.roles.dependencies import get_roles_service
+from sharkservers.roles.models import Role
+from sharkservers.scopes.dependencies import get_scopes_service
+
+
+@pytest.fixture
+async def enabled_cache():
+    service_cache.init(await create_redis_pool())
+    yield service_cache
+    service_cache.close()
+
+
+async def rename_category_bypassing_signals(category, name):
+    await database.execute(
+        Category.Meta.table.update()
+        .values(name=name)
+        .where(Category.Meta.table.c.id == category.id)
+    )
+
+
+@pytest.mark.anyio
+async def test_service_cache_get_one(enabled_cache):
+    categories_service = await get_categories_service()
+    category = await categories_service.create(name="Cached")
+
+    cached = await categories_service.get_one(id=category.id)
+    await rename_category_bypassing_signals(category, "Stale")
+    assert (await categories_service.get_one(id=category.id)).name == "Cached"
+
+    # the signals of the model invalidate the cached entries
+    await cached.update(name="Updated")
+    assert (await categories_service.get_one(id=category.id)).name == "Updated"
+
+    # so do the services and the counters which bypass them
+    await categories_service.update({"name": "Service"}, id=category.id)
+    await increment_counters(cached, threads_count=2)
+    category = await categories_service.get_one(id=category.id)
+    assert category.name == "Service"
+    assert category.threads_count == 2
+
+
+@pytest.mark.anyio
+async def test_service_cache_get_all_related(enabled_cache):
+    roles_service = await get_roles_service()
+    scopes_service = await get_scopes_service()
+    role = await roles_service.create(name="Cached", tag="cached", color="#fff")
+    scope = await scopes_service.create(app_name="cached", value="read", description="Read")
+    await role.scopes.add(scope)
+
+    params = Params(page=1, size=50)
+    page = await roles_service.get_all(params, related="scopes", name="Cached")
+    assert page.total == 1
+    assert [scope.value for scope in page.items[0].scopes] == ["read"]
+
+    # a change of a related table invalidates the entries which selected it
+    await scope.update(value="write")
+    page = await roles_service.get_all(params, related="scopes", name="Cached")
+    assert [scope.value for scope in page.items[0].scopes] == ["write"]
+    await page.items[0].scopes.remove(page.items[0].scopes[0])
+    page = await roles_service.get_all(params, related="scopes", name="Cached")
+    assert page.items[0].scopes == []
+
+
+@pytest.mark.anyio
+async def test_service_cache_loads_cold_key_once(enabled_cache, monkeypatch):
+    categories_service = await get_categories_service()
+    category = await categories_service.create(name="Cold")
+    loads = 0
+    get_one = categories_service._get_one
+
+    async def counting_get_one(related, **kwargs):
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        return await get_one(related, **kwargs)
+
+    monkeypatch.setattr(categories_service, "_get_one", counting_get_one)
+    results = await asyncio.gather(
+        *[categories_service.get_one(id=category.id) for _ in range(10)]
+    )
+    assert loads == 1
+    assert {result.name for result in results} == {"Cold"}
+    # every caller gets its own instance
+    assert len({id(result) for result in results}) == 10
+
+
+@pytest.mark.anyio
+async def test_service_cache_local_level(enabled_cache, monkeypatch):
+    await enabled_cache.subscribe()
+    categories_service = await get_categories_service()
+    category = await categories_service.create(name="Local")
+    await categories_service.get_one(id=category.id)
+
+    async def no_round_trip(*args, **kwargs):
+        raise AssertionError("Redis was called")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(enabled_cache.redis, "get", no_round_trip)
+        patch.setattr(enabled_cache.redis, "mget", no_round_trip)
+        first = await categories_service.get_one(id=category.id)
+        second = await categories_service.get_one(id=category.id)
+    assert first.name == second.name == "Local"
+    assert first is not second
+    await enabled_cache.unsubscribe()
+
+
+@pytest.mark.anyio
+async def test_service_cache_invalidated_by_other_worker(enabled_cache):
+    await enabled_cache.subscribe()
+    other_worker = ServiceCache()
+    other_worker.init(enabled_cache.redis)
+    categories_service = await get_categories_service()
+    category = await categories_service.create(name="Shared")
+    await categories_service.get_one(id=category.id)
+
+    await rename_category_bypassing_signals(category, "Renamed")
+    assert (await categories_service.get_one(id=category.id)).name == "Shared"
+    assert Category.Meta.tablename in enabled_cache._versions
+    await other_worker.invalidate(Category.Meta.tablename)
+    for _ in range(100):
+        if Category.Meta.tablename not in enabled_cache._versions:
+            break
+        await asyncio.sleep(0.01)
+    else:
+        pytest.fail("The invalidation was not received")
+    assert (await categories_service.get_one(id=category.id)).name == "Renamed"
+    await enabled_cache.unsubscribe()
+    assert not enabled_cache.subscribed
+
+
+@pytest.mark.anyio
+async def test_service_cache_sees_write_before_read(enabled_cache):
+    watched_tables = {model.Meta.tablename for model in enabled_cache._watched}
+    assert {"forum_categories", "roles", "roles_scopes", "scopes"} <= watched_tables
+    version_key = enabled_cache.get_version_key(Role.Meta.tablename)
+    version = int(await enabled_cache.redis.get(version_key) or 0)
+    # a fresh worker writes before any cached read
+    await Role.objects.create(name="Written first", tag="written-first")
+    assert int(await enabled_cache.redis.get(version_key)) == version + 1
+
+
+def test_local_cache_evicts_and_expires(monkeypatch):
+    local_cache = LocalCache(ttl=5.0, max_size=2)
+    local_cache.set("a", 1)
+    local_cache.set("b", 2)
+    assert local_cache.get("a") == 1
+    # "b" is the least recently used
+    local_cache.set("c", 3)
+    assert local_cache.get("b") is None
+    assert local_cache.get("a") == 1
+    local_cache.pop("a")
+    assert local_cache.get("a") is None
+    monkeypatch.setattr("sharkservers.cache.time.monotonic", lambda: 10**9)
+    assert local_cache.get("c") is None
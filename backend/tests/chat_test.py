@@ -0,0 +1,221 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from broadcaster import Broadcast
+from fastapi import WebSocketException
+from uuidbase62.types import to_uuidbase62
+
+from sharkservers.chat import websocket as chat_websocket
+from sharkservers.chat.enums import WebsocketEventEnum
+from sharkservers.chat.dependencies import ws_get_valid_room
+from sharkservers.chat.history import chat_history
+from sharkservers.chat.rooms import GLOBAL_ROOM, STAFF_ROOM, get_room_channel
+from sharkservers.chat.services import ChatService
+from sharkservers.hub import SubscriptionHub
+from sharkservers.main import app
+from sharkservers.roles.models import Role
+from sharkservers.servers.dependencies import get_servers_service
+from sharkservers.servers.models import Server
+from sharkservers.users.models import User
+from tests.conftest import TEST_ADMIN_USER, create_fake_users
+
+
+class FakeWebSocket:
+    def __init__(self, received=()):
+        self.sent = asyncio.Queue()
+        self.received = received
+
+    async def iter_json(self):
+        for message in self.received:
+            yield message
+
+    async def send_text(self, data):
+        await self.sent.put(data)
+
+
+@pytest.fixture
+def history(client):
+    chat_history.init(app.state.redis, size=2)
+    yield chat_history
+    chat_history.close()
+
+
+@pytest.mark.anyio
+async def test_encode_last_messages(client):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    await chat_service.create(author=author, message="Hello")
+
+    payload = json.loads(await chat_websocket.encode_last_messages(chat_service))
+    assert payload["event"] == WebsocketEventEnum.GET_MESSAGES
+    assert payload["data"]["items"][0]["message"] == "Hello"
+    assert payload["data"]["items"][0]["author"]["username"] == author.username
+
+
+@pytest.mark.anyio
+async def test_chatroom_ws_sender_forwards_payload(monkeypatch):
+    broadcast = Broadcast("memory://")
+    await broadcast.connect()
+    hub = SubscriptionHub(broadcast)
+    monkeypatch.setattr(chat_websocket, "hub", hub)
+    websockets = [FakeWebSocket() for _ in range(3)]
+    senders = [
+        asyncio.create_task(chat_websocket.chatroom_ws_sender(websocket))
+        for websocket in websockets
+    ]
+    channel = get_room_channel(GLOBAL_ROOM)
+    while hub.subscribers_count(channel) < len(websockets):
+        await asyncio.sleep(0)
+
+    payload = json.dumps({"event": WebsocketEventEnum.GET_MESSAGES, "data": {}})
+    await broadcast.publish(channel=channel, message=payload)
+    for websocket in websockets:
+        assert await asyncio.wait_for(websocket.sent.get(), 1) == payload
+
+    for sender in senders:
+        sender.cancel()
+    await asyncio.gather(*senders, return_exceptions=True)
+    await hub.close()
+    await broadcast.disconnect()
+
+
+@pytest.mark.anyio
+async def test_chatroom_ws_receiver_sends_messages_on_request(client):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    await chat_service.create(author=author, message="Hello")
+    websocket = FakeWebSocket(received=[{"event": WebsocketEventEnum.GET_MESSAGES}])
+
+    await chat_websocket.chatroom_ws_receiver(websocket, chat_service=chat_service)
+    payload = json.loads(websocket.sent.get_nowait())
+    assert payload["event"] == WebsocketEventEnum.GET_MESSAGES
+    assert payload["data"]["items"][0]["message"] == "Hello"
+
+
+@pytest.mark.anyio
+async def test_chat_history(history):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    ids = [
+        await history.append(
+            await chat_service.create(author=author, message=f"Message {i}")
+        )
+        for i in range(3)
+    ]
+
+    recent = await history.get_recent()
+    assert [stream_id for stream_id, _ in recent] == ids[1:]
+    assert [data["message"] for _, data in recent] == ["Message 1", "Message 2"]
+    assert recent[0][1]["author"]["username"] == author.username
+    assert "password" not in recent[0][1]["author"]
+
+    since = await history.get_since(ids[0])
+    assert [data["message"] for _, data in since] == ["Message 1", "Message 2"]
+    assert await history.get_since(ids[2]) == []
+    assert await history.get_since("0-1") is None
+    assert await history.get_since("invalid") is None
+
+
+@pytest.mark.anyio
+async def test_chat_history_backfill(history):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    await chat_service.create(author=author, message="Archived")
+
+    assert await history.get_recent() == []
+    recent = await history.get_recent(chat_service=chat_service)
+    assert [data["message"] for _, data in recent] == ["Archived"]
+    assert await history.get_total(chat_service=chat_service) == 1
+    await history.append(await chat_service.create(author=author, message="New"))
+    assert await history.get_total() == 2
+
+
+@pytest.mark.anyio
+async def test_chatroom_ws_receiver_resumes_history(history):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    first = await chat_websocket.create_message(chat_service, author, "First")
+    assert first.message == "First"
+    websocket = FakeWebSocket(received=[{"event": WebsocketEventEnum.GET_MESSAGES}])
+    await chat_websocket.chatroom_ws_receiver(websocket, chat_service=chat_service)
+    payload = json.loads(websocket.sent.get_nowait())
+    assert [item["message"] for item in payload["data"]["items"]] == ["First"]
+    assert payload["data"]["total"] == 1
+
+    await chat_websocket.create_message(chat_service, author, "Second")
+    websocket = FakeWebSocket(
+        received=[
+            {"event": WebsocketEventEnum.GET_MESSAGES, "last_id": payload["last_id"]}
+        ]
+    )
+    await chat_websocket.chatroom_ws_receiver(websocket, chat_service=chat_service)
+    payload = json.loads(websocket.sent.get_nowait())
+    assert [item["message"] for item in payload["data"]["items"]] == ["Second"]
+    # the page keeps counting all the messages of the room
+    assert payload["data"]["total"] == 2
+    assert payload["data"]["size"] == history.size
+
+
+@pytest.mark.anyio
+async def test_ws_get_valid_room(client):
+    servers_service = await get_servers_service()
+    user, server_admin = await create_fake_users(2)
+    user = await User.objects.select_related("roles").get(id=user.id)
+    admin = await User.objects.select_related("roles").get(
+        username=TEST_ADMIN_USER["username"]
+    )
+    admin_role = await Role.objects.create(tag="room_admin", name="Room admin")
+    await server_admin.roles.add(admin_role)
+    server_admin = await User.objects.select_related("roles").get(id=server_admin.id)
+    server = Server(
+        tag="room",
+        name="Room server",
+        ip="127.0.0.1",
+        port=27015,
+        api_url="",
+        admin_role=admin_role,
+    )
+    await Server.objects.bulk_create([server])
+    server_room = str(
+        to_uuidbase62((await Server.objects.get(tag="room")).id, "server")
+    )
+
+    async def get_room(room, author):
+        return await ws_get_valid_room(
+            room=room, author=author, servers_service=servers_service
+        )
+
+    assert await get_room(GLOBAL_ROOM, None) == GLOBAL_ROOM
+    assert await get_room(STAFF_ROOM, admin) == STAFF_ROOM
+    assert await get_room(server_room, server_admin) == server_room
+    assert await get_room(server_room, admin) == server_room
+    for room, author in [
+        (STAFF_ROOM, user),
+        (STAFF_ROOM, None),
+        # an outsider of the server
+        (server_room, user),
+        (server_room, None),
+        ("server_invalid!", user),
+        (str(to_uuidbase62(uuid.uuid4(), "server")), user),
+        ("unknown", user),
+    ]:
+        with pytest.raises(WebSocketException):
+            await get_room(room, author)
+
+
+@pytest.mark.anyio
+async def test_chat_rooms_are_separated(history):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    await chat_websocket.create_message(chat_service, author, "Global")
+    await chat_websocket.create_message(chat_service, author, "Staff", room=STAFF_ROOM)
+
+    for room, message in [(GLOBAL_ROOM, "Global"), (STAFF_ROOM, "Staff")]:
+        payload = json.loads(
+            await chat_websocket.encode_last_messages(chat_service, room=room)
+        )
+        assert [item["message"] for item in payload["data"]["items"]] == [message]
+        assert payload["data"]["items"][0]["room"] == room
+    assert await chat_service.get_one(room=STAFF_ROOM)
@@ -0,0 +1,49 @@
+from sharkservers.cli import main, measure_import, parse_importtime
+
+# generous for a CI runner, the import takes about 2.7 s on a development machine
+STARTUP_TIME_BUDGET = 6.0
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     stripe._error
+import time:      2000 |       2120 |   stripe
+import time:       500 |       2620 | sharkservers.subscryptions
+"""
+
+
+def test_parse_importtime():
+    imports = parse_importtime(IMPORTTIME_OUTPUT)
+    assert [(item.name, item.depth) for item in imports] == [
+        ("stripe._error", 2),
+        ("stripe", 1),
+        ("sharkservers.subscryptions", 0),
+    ]
+    assert imports[1].self_time == 0.002
+    assert imports[2].cumulative_time == 0.00262
+
+
+def test_startup_time_budget():
+    report = measure_import("sharkservers.main")
+    assert report.get_eager_modules() == []
+    assert report.total < STARTUP_TIME_BUDGET, report.render(10)
+
+
+def test_importtime_command(capsys):
+    assert (
+        main(["importtime", "--module", "sharkservers.settings", "--limit", "3"]) == 0
+    )
+    output = capsys.readouterr().out
+    assert output.startswith("sharkservers.settings imported in ")
+    assert "sharkservers.settings" in output.splitlines()[2]
+
+
+def test_generate_data_command(capsys):
+    args = ["--users", "5", "--threads", "4", "--posts", "20", "--likes", "10"]
+    assert main(["generate-data", *args, "--chats", "3", "--reset"]) == 0
+    counts = {
+        table: int(count)
+        for count, table in (
+            line.split() for line in capsys.readouterr().out.splitlines()[:-1]
+        )
+    }
+    assert counts["users"] == 5
+    assert counts["forum_posts"] == 20
@@ -240,34 +240,32 @@ async def create_fake_categories(
     number: int = 50, category_type: CategoryTypeEnum = CategoryTypeEnum.PUBLIC.value
 ):
     categories_service: CategoryService = await get_categories_service()
-    categories_list: list[Category] = []
-    for i in range(number):
-        category_name = "Category " + str(i)
-        category_description = "Category description " + str(i)
-        category = await categories_service.create(
-            name=category_name,
-            description=category_description,
-            type=category_type,
-        )
-        categories_list.append(category)
-    return categories_list
+    return await categories_service.bulk_create(
+        [
+            {
+                "name": "Category " + str(i),
+                "description": "Category description " + str(i),
+                "type": category_type,
+            }
+            for i in range(number)
+        ]
+    )
 
 
 async def create_fake_scopes(number: int, protected: bool = False) -> list[Scope]:
     scopes_service = await get_scopes_service()
-    scopes_list = []
     app_name = "test_app"
-    for i in range(number):
-        scope_value = f"{app_name}_scope_{i}"
-        scope_description = f"Scope description {i}"
-        scope = await scopes_service.create(
-            app_name=app_name,
-            value=scope_value,
-            description=scope_description,
-            protected=protected,
-        )
-        scopes_list.append(scope)
-    return scopes_list
+    return await scopes_service.bulk_create(
+        [
+            {
+                "app_name": app_name,
+                "value": f"{app_name}_scope_{i}",
+                "description": f"Scope description {i}",
+                "protected": protected,
+            }
+            for i in range(number)
+        ]
+    )
 
 
 async def create_fake_posts(number: int = 50, author: User = None, thread=None):
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from sharkservers.counters import (
+    CounterReconciler,
+    counter_batch,
+    increment_counters,
+)
+from sharkservers.forum.counters import FORUM_COUNTERS
+from sharkservers.forum.models import Category, Like, Post, Thread
+from sharkservers.users.models import User
+from tests.conftest import (
+    create_fake_categories,
+    create_fake_posts,
+    create_fake_threads,
+    create_fake_users,
+)
+
+
+@pytest.mark.anyio
+async def test_reconcile_counters():
+    author = (await create_fake_users(1))[0]
+    category = (await create_fake_categories(1))[0]
+    threads = await create_fake_threads(3, author=author, category=category)
+    posts = await create_fake_posts(4, author=author, thread=threads[0])
+    like = await Like.objects.create(author=author)
+    await posts[0].likes.add(like)
+
+    await Category.objects.filter(id=category.id).update(threads_count=99)
+    await Thread.objects.filter(id=threads[0].id).update(post_count=0)
+    await Thread.objects.filter(id=threads[1].id).update(post_count=7)
+    await Post.objects.filter(id=posts[0].id).update(likes_count=0)
+    await User.objects.filter(id=author.id).update(
+        threads_count=0,
+        posts_count=0,
+        likes_count=5,
+    )
+
+    report = await CounterReconciler(FORUM_COUNTERS).reconcile()
+
+    assert report == {
+        "categories.threads_count": 1,
+        "threads.post_count": 2,
+        "posts.likes_count": 1,
+        "users.threads_count": 1,
+        "users.posts_count": 1,
+        "users.likes_count": 1,
+    }
+    assert (await Category.objects.get(id=category.id)).threads_count == 3
+    assert (await Thread.objects.get(id=threads[0].id)).post_count == 4
+    assert (await Thread.objects.get(id=threads[1].id)).post_count == 0
+    assert (await Post.objects.get(id=posts[0].id)).likes_count == 1
+    user = await User.objects.get(id=author.id)
+    assert user.threads_count == 3
+    assert user.posts_count == 4
+    assert user.likes_count == 1
+
+    report = await CounterReconciler(FORUM_COUNTERS).reconcile()
+    assert sum(report.values()) == 0
+
+
+@pytest.mark.anyio
+async def test_increment_counters():
+    category = (await create_fake_categories(1))[0]
+
+    await asyncio.gather(
+        *[
+            increment_counters(Category(id=category.id, __pk_only__=True), threads_count=1)
+            for _ in range(10)
+        ]
+    )
+    assert (await Category.objects.get(id=category.id)).threads_count == 10
+
+    await increment_counters(category, threads_count=-15)
+    assert category.threads_count == 0
+    assert (await Category.objects.get(id=category.id)).threads_count == 0
+
+
+@pytest.mark.anyio
+async def test_counter_batch():
+    category = (await create_fake_categories(1))[0]
+
+    async with counter_batch():
+        await increment_counters(category, threads_count=3)
+        await increment_counters(category, threads_count=2)
+        assert (await Category.objects.get(id=category.id)).threads_count == 0
+    assert category.threads_count == 5
+    assert (await Category.objects.get(id=category.id)).threads_count == 5
+
+    with pytest.raises(RuntimeError):
+        async with counter_batch():
+            await increment_counters(category, threads_count=1)
+            raise RuntimeError
+    assert (await Category.objects.get(id=category.id)).threads_count == 5
+
+
+@pytest.mark.anyio
+async def test_like_updates_likes_counters():
+    author = (await create_fake_users(1))[0]
+    category = (await create_fake_categories(1))[0]
+    thread = (await create_fake_threads(1, author=author, category=category))[0]
+    post = (await create_fake_posts(1, author=author, thread=thread))[0]
+    like = await Like.objects.create(author=author)
+
+    async with counter_batch():
+        await post.likes.add(like)
+    assert (await Post.objects.get(id=post.id)).likes_count == 1
+    assert (await User.objects.get(id=author.id)).likes_count == 1
+    await post.likes.remove(like)
+    assert (await Post.objects.get(id=post.id)).likes_count == 0
+    assert (await User.objects.get(id=author.id)).likes_count == 0
@@ -0,0 +1,140 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from sharkservers.chat.services import ChatService
+from sharkservers.db import uuid7
+from sharkservers.forum.dependencies import (
+    get_categories_service,
+    get_thread_meta_service,
+    get_threads_service,
+)
+from sharkservers.forum.enums import CategoryTypeEnum
+from sharkservers.forum.models import Category, ThreadMeta
+from sharkservers.roles.dependencies import get_roles_service
+from sharkservers.roles.models import Role
+from sharkservers.scopes.dependencies import get_scopes_service
+from sharkservers.scopes.models import Scope
+from sharkservers.services import MainService
+from tests.conftest import create_fake_categories, create_fake_scopes, create_fake_users
+
+
+def test_uuid7():
+    keys = [uuid7() for _ in range(10000)]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    assert all(key.version == 7 for key in keys)
+    # the first 48 bits are the Unix time in milliseconds
+    assert abs((keys[0].int >> 80) - time.time() * 1000) < 1000
+    assert uuid7(1700000000000).int >> 80 == 1700000000000
+
+
+@pytest.mark.anyio
+async def test_uuid7_primary_keys_are_time_ordered(client):
+    chat_service = ChatService()
+    author = (await create_fake_users(1))[0]
+    messages = [
+        await chat_service.create(author=author, message=f"Message {i}")
+        for i in range(5)
+    ]
+    newest_first = await (await chat_service.get_all(order_by="-id")).all()
+    assert [message.id for message in newest_first] == [
+        message.id for message in reversed(messages)
+    ]
+
+
+@pytest.mark.anyio
+async def test_bulk_create_and_update():
+    categories_service = await get_categories_service()
+    # more rows than fit into one SQLite statement
+    categories = await categories_service.bulk_create(
+        [{"name": f"Bulk {i}", "description": "Old"} for i in range(400)]
+    )
+    assert await Category.objects.filter(name__startswith="Bulk").count() == 400
+
+    for category in categories[:3]:
+        category.description = f"New {category.name}"
+    await categories_service.bulk_update(categories[:3], ["description"])
+    updated = await Category.objects.filter(description__startswith="New").all()
+    assert {category.name for category in updated} == {"Bulk 0", "Bulk 1", "Bulk 2"}
+    assert all(
+        category.description == f"New {category.name}" for category in updated
+    )
+    assert await Category.objects.filter(description="Old").count() == 397
+
+
+@pytest.mark.anyio
+async def test_bulk_upsert():
+    categories_service = await get_categories_service()
+    await categories_service.bulk_create([{"name": "Upsert", "description": "Old"}])
+    await categories_service.bulk_upsert(
+        [
+            {"name": "Upsert", "description": "New"},
+            {"name": "Inserted", "description": "New"},
+        ],
+        conflict_columns=["name"],
+        update_columns=["description"],
+    )
+    assert (await Category.objects.get(name="Upsert")).description == "New"
+    assert (await Category.objects.get(name="Inserted")).description == "New"
+
+    await categories_service.bulk_upsert(
+        [{"name": "Upsert", "description": "Ignored"}],
+        conflict_columns=["name"],
+        update_columns=[],
+    )
+    assert (await Category.objects.get(name="Upsert")).description == "New"
+
+
+@pytest.mark.anyio
+async def test_add_many():
+    roles_service = await get_roles_service()
+    scopes = await create_fake_scopes(3)
+    role = await roles_service.create(name="Bulk", tag="bulk")
+    await roles_service.add_many(role, "scopes", scopes)
+    assert {scope.id for scope in role.scopes} == {scope.id for scope in scopes}
+    role = await Role.objects.select_related("scopes").get(id=role.id)
+    assert {scope.id for scope in role.scopes} == {scope.id for scope in scopes}
+
+
+@pytest.mark.anyio
+async def test_fill_meta():
+    users = await create_fake_users(1)
+    categories = await create_fake_categories(
+        1, category_type=CategoryTypeEnum.APPLICATION.value
+    )
+    threads_service = await get_threads_service()
+    thread_meta_service = await get_thread_meta_service()
+    thread = await threads_service.create(
+        title="Test title",
+        content="Test content",
+        category=categories[0],
+        author=users[0],
+    )
+    await thread_meta_service.fill_meta(
+        thread.id, {"question_age": "18", "question_reason": "Reason"}
+    )
+    metas = await ThreadMeta.objects.filter(thread_meta__id=thread.id).all()
+    assert {meta.name: meta.value for meta in metas} == {
+        "server_id": None,
+        "question_experience": None,
+        "question_age": "18",
+        "question_reason": "Reason",
+    }
+    with pytest.raises(HTTPException):
+        await thread_meta_service.fill_meta(thread.id, {"unknown": "value"})
+
+
+@pytest.mark.anyio
+async def test_create_defaults_when_installed():
+    roles_service = await get_roles_service()
+    scopes_service = await get_scopes_service()
+    roles_count = await Role.objects.count()
+    scopes_count = await Scope.objects.count()
+
+    # the test database is installed, so nothing is missing
+    await MainService.create_default_scopes(scopes_service)
+    await roles_service.create_default_roles(scopes_service)
+    assert await Role.objects.count() == roles_count
+    assert await Scope.objects.count() == scopes_count
@@ -0,0 +1,120 @@
+import datetime
+import random
+import uuid
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from sharkservers.counters import CounterReconciler
+from sharkservers.forum.counters import FORUM_COUNTERS
+from sharkservers.forum.models import Thread
+from sharkservers.generator import (
+    CopyWriter,
+    DatasetGenerator,
+    DatasetOptions,
+    PowerLaw,
+    generate_dataset,
+)
+from sharkservers.users.models import User
+
+UNTIL = datetime.datetime(2024, 1, 1)
+OPTIONS = {
+    "users": 50,
+    "categories": 3,
+    "threads": 40,
+    "posts": 300,
+    "likes": 500,
+    "chats": 20,
+    "batch_size": 100,
+    "until": UNTIL,
+}
+
+
+def generate_rows(**options):
+    generator = DatasetGenerator(
+        DatasetOptions(**{**OPTIONS, **options}), uuid.UUID(int=1), "hash"
+    )
+    rows = {}
+    for table, batch in generator.generate():
+        rows.setdefault(table.name, []).extend(batch)
+    return rows
+
+
+def test_dataset_generator_is_deterministic():
+    rows = generate_rows()
+    assert rows == generate_rows()
+    assert rows["forum_posts"] != generate_rows(seed=1)["forum_posts"]
+    assert {table: len(batch) for table, batch in rows.items()} == {
+        "users": 50,
+        "users_roles": 50,
+        "forum_categories": 3,
+        "forum_threads": 40,
+        "forum_posts": 300,
+        "threads_posts": 300,
+        "forum_reputation": 500,
+        "posts_likes": 500,
+        "chats": 20,
+    }
+    assert sum(user["posts_count"] for user in rows["users"]) == 300
+    assert sum(post["likes_count"] for post in rows["forum_posts"]) == 500
+    assert max(post["created_at"] for post in rows["forum_posts"]) <= UNTIL
+
+
+def test_dataset_generator_keys_follow_local_time():
+    generator = DatasetGenerator(DatasetOptions(**OPTIONS), uuid.UUID(int=1), "hash")
+    created_at = datetime.datetime(2024, 1, 1, 12)
+    # 12:00 in Warsaw is 11:00 UTC
+    utc = datetime.datetime(2024, 1, 1, 11, tzinfo=datetime.timezone.utc)
+    assert generator._to_uuid7(created_at).int >> 80 == int(utc.timestamp() * 1000)
+
+
+class FakeCursor:
+    def copy_expert(self, statement, buffer):
+        self.statement = statement
+        self.data = buffer.read()
+
+    def close(self):
+        pass
+
+
+def test_copy_writer_sends_none_as_null():
+    cursor = FakeCursor()
+    connection = SimpleNamespace(
+        dialect=postgresql.dialect(),
+        connection=SimpleNamespace(cursor=lambda: cursor),
+    )
+    writer = CopyWriter(connection)
+    writer.write(
+        User.Meta.table,
+        [
+            {"username": 'say "hi"', "email": None, "posts_count": 1},
+            {"username": "", "email": "a,b", "posts_count": 2},
+        ],
+    )
+    assert cursor.statement.endswith("FROM STDIN WITH (FORMAT csv)")
+    assert cursor.data.splitlines() == ['"say ""hi""",,"1"', '"","a,b","2"']
+    assert writer.counts["users"] == 2
+
+
+def test_power_law_skews_the_samples():
+    power_law = PowerLaw(1000, 1.5, random.Random(0))
+    counts = Counter(power_law.sample() for _ in range(10_000))
+    assert counts[power_law.index(0)] > 1000
+    assert counts.most_common(1)[0][0] == power_law.index(0)
+    uniform = PowerLaw(1000, 0, random.Random(0))
+    assert max(Counter(uniform.sample() for _ in range(10_000)).values()) < 50
+
+
+@pytest.mark.anyio
+async def test_generate_dataset():
+    counts = await generate_dataset(DatasetOptions(**OPTIONS))
+    assert counts["forum_posts"] == 300
+    assert counts["chats"] == 20
+    # the counters are written with the rows
+    assert set((await CounterReconciler(FORUM_COUNTERS).reconcile()).values()) == {0}
+    user = await User.objects.select_related("roles").get(username="fake_user_0")
+    assert user.is_activated
+    assert len(user.roles) == 1
+    assert await Thread.objects.count() == 40
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from broadcaster import Broadcast
+
+from sharkservers.enums import OverflowPolicyEnum
+from sharkservers.hub import (
+    ConnectionQueue,
+    HubMessage,
+    SlowConsumerError,
+    SubscriptionClosedError,
+    SubscriptionHub,
+)
+from sharkservers.manager import ConnectionManager, manager
+from sharkservers.settings import get_settings
+
+
+@pytest.fixture
+async def memory_broadcast():
+    broadcast = Broadcast("memory://")
+    await broadcast.connect()
+    yield broadcast
+    await broadcast.disconnect()
+
+
+@pytest.mark.anyio
+async def test_hub_fan_out(memory_broadcast):
+    hub = SubscriptionHub(memory_broadcast)
+    async with hub.subscribe("chat") as first, hub.subscribe("chat") as second:
+        assert hub.subscribers_count("chat") == 2
+        # one broadcast subscription per channel, shared by the local subscribers
+        assert len(memory_broadcast._subscribers["chat"]) == 1
+
+        await memory_broadcast.publish(channel="chat", message=json.dumps({"a": 1}))
+        message = await asyncio.wait_for(first.get(), 1)
+        assert await asyncio.wait_for(second.get(), 1) is message
+        assert message.data == {"a": 1}
+
+    assert hub.subscribers_count("chat") == 0
+    assert "chat" not in memory_broadcast._subscribers
+    await hub.close()
+
+
+@pytest.mark.anyio
+async def test_hub_channels_are_separated(memory_broadcast):
+    hub = SubscriptionHub(memory_broadcast)
+    async with hub.subscribe("chat") as chat, hub.subscribe("servers") as servers:
+        await memory_broadcast.publish(channel="servers", message="[]")
+        assert (await asyncio.wait_for(servers.get(), 1)).text == "[]"
+        assert chat.empty()
+    await hub.close()
+
+
+class FailingBroadcast:
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        yield FailingSubscriber()
+
+
+class FailingSubscriber:
+    async def get(self):
+        await asyncio.sleep(0.01)
+        raise ConnectionError
+
+
+@pytest.mark.anyio
+async def test_hub_closes_queues_when_subscription_fails():
+    hub = SubscriptionHub(FailingBroadcast())
+    async with hub.subscribe("chat") as first, hub.subscribe("chat") as second:
+        for queue in (first, second):
+            with pytest.raises(SubscriptionClosedError):
+                await asyncio.wait_for(queue.get(), 1)
+    assert hub.subscribers_count("chat") == 0
+    assert not hub._listeners
+
+
+@pytest.mark.anyio
+async def test_hub_close_ends_subscribers(memory_broadcast):
+    hub = SubscriptionHub(memory_broadcast)
+    async with hub.subscribe("chat") as queue:
+        await hub.close()
+        # the listener left the broadcast subscription
+        assert "chat" not in memory_broadcast._subscribers
+        with pytest.raises(SubscriptionClosedError):
+            await asyncio.wait_for(queue.get(), 1)
+
+
+def test_connection_queue_drop_oldest():
+    queue = ConnectionQueue(maxsize=2, policy=OverflowPolicyEnum.DROP_OLDEST)
+    for i in range(3):
+        queue.put(HubMessage("chat", str(i)))
+    assert [queue.get_nowait().text for _ in range(2)] == ["1", "2"]
+    assert queue.stats()["dropped"] == 1
+    assert queue.stats()["max_lag"] == 2
+
+
+def test_connection_queue_coalesce():
+    queue = ConnectionQueue(maxsize=10, policy=OverflowPolicyEnum.COALESCE)
+    queue.put(HubMessage("servers", "old"))
+    queue.put(HubMessage("chat", "message"))
+    queue.put(HubMessage("servers", "new"))
+    assert [queue.get_nowait().text for _ in range(2)] == ["message", "new"]
+    assert queue.dropped == 1
+
+
+@pytest.mark.anyio
+async def test_connection_queue_disconnect():
+    queue = ConnectionQueue(maxsize=2, policy=OverflowPolicyEnum.DISCONNECT)
+    for i in range(3):
+        queue.put(HubMessage("chat", str(i)))
+    assert queue.overflowed
+    with pytest.raises(SlowConsumerError):
+        await queue.get()
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+
+@pytest.mark.anyio
+async def test_connection_manager_slow_connection():
+    manager = ConnectionManager(queue_size=2)
+    fast, slow = FakeWebSocket(), FakeWebSocket(delay=10)
+    await manager.connect(fast)
+    await manager.connect(slow)
+
+    for i in range(5):
+        await manager.broadcast({"event": "get_message", "data": i})
+        await asyncio.sleep(0.001)
+    assert [json.loads(data)["data"] for data in fast.sent] == list(range(5))
+    slow_stats = manager.stats()[1]
+    assert slow_stats["lag"] == 2
+    assert slow_stats["dropped"] == 2
+
+    manager.disconnect(fast)
+    manager.disconnect(slow)
+
+
+def test_connection_manager_settings():
+    assert manager.queue_size == get_settings().WEBSOCKET_QUEUE_SIZE
+    assert manager.policy == get_settings().WEBSOCKET_OVERFLOW_POLICY
@@ -0,0 +1,59 @@
+import pytest
+from fastapi import FastAPI
+from fastapi_pagination import Params
+from httpx import AsyncClient
+
+from sharkservers.forum.dependencies import get_categories_service
+from sharkservers.instrumentation import collect_queries
+from sharkservers.logger import logger
+from sharkservers.middleware import QueryInstrumentationMiddleware
+from tests.conftest import create_fake_categories
+
+
+@pytest.mark.anyio
+async def test_collect_queries_detects_n_plus_one():
+    categories_service = await get_categories_service()
+    categories = await create_fake_categories(6)
+
+    with collect_queries(n_plus_one_threshold=5) as stats:
+        await categories_service.get_all(Params(page=1, size=50))
+    assert stats.count == 2
+    assert stats.get_n_plus_one() == {}
+
+    with collect_queries(n_plus_one_threshold=5) as stats:
+        for category in categories:
+            await categories_service.get_one(id=category.id)
+    assert stats.count == 6
+    assert list(stats.get_n_plus_one().values()) == [6]
+    assert len(stats.slowest) == 3
+    assert stats.slowest[0][0] >= stats.slowest[-1][0]
+
+    # the queries outside of the block are not recorded
+    await categories_service.get_one(id=categories[0].id)
+    assert stats.count == 6
+
+
+@pytest.mark.anyio
+async def test_query_instrumentation_middleware(monkeypatch):
+    categories = await create_fake_categories(5)
+    warnings = []
+    monkeypatch.setattr(logger, "warning", warnings.append)
+    app = FastAPI()
+    app.add_middleware(QueryInstrumentationMiddleware, n_plus_one_threshold=5)
+
+    @app.get("/categories")
+    async def get_categories():
+        categories_service = await get_categories_service()
+        return [
+            (await categories_service.get_one(id=category.id)).name
+            for category in categories
+        ]
+
+    async with AsyncClient(app=app, base_url="http://localhost") as client:
+        response = await client.get("/categories")
+    assert response.status_code == 200
+    server_timing = response.headers["Server-Timing"]
+    assert server_timing.startswith("db;dur=")
+    assert server_timing.endswith('desc="5 queries"')
+    assert len(warnings) == 1
+    assert 'Possible N+1 in "GET /categories": 5x SELECT' in warnings[0]
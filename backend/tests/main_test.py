@@ -36,3 +36,15 @@ async def test_install_when_is_already_installed(client):
     assert r.status_code == 400
     if not install_file_exists:
         os.remove(installed_file_path)
+
+
+def test_middlewares_are_pure_asgi():
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from sharkservers.main import app
+
+    assert app.user_middleware
+    assert not any(
+        issubclass(middleware.cls, BaseHTTPMiddleware)
+        for middleware in app.user_middleware
+    )
@@ -0,0 +1,97 @@
+import pytest
+
+from sharkservers.db import create_redis_pool
+from sharkservers.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsPublisher,
+    MetricsRegistry,
+    metrics_publisher,
+)
+from sharkservers.settings import get_settings
+from tests.conftest import create_fake_categories
+
+CATEGORIES_ENDPOINT = "/v1/forum/categories"
+
+
+def test_metrics_registry_render():
+    registry = MetricsRegistry()
+    requests = Counter("requests_total", "Requests.", ("method",), registry=registry)
+    connections = Gauge("connections", "Connections.", registry=registry)
+    queue_depth = Gauge("queue_depth", "Queue.", registry=registry, function=lambda: 3)
+    latency = Histogram(
+        "latency_seconds", "Latency.", registry=registry, buckets=(0.1, 1.0)
+    )
+    requests.inc(method="GET")
+    requests.inc(2, method="GET")
+    with connections.track():
+        assert connections.collect() == [((), 1.0)]
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    lines = registry.render({"w1": registry.collect()}).splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{worker="w1",method="GET"} 3.0' in lines
+    assert 'connections{worker="w1"} 0.0' in lines
+    assert 'queue_depth{worker="w1"} 3.0' in lines
+    assert 'latency_seconds_bucket{worker="w1",le="0.1"} 1.0' in lines
+    assert 'latency_seconds_bucket{worker="w1",le="1.0"} 2.0' in lines
+    assert 'latency_seconds_bucket{worker="w1",le="+Inf"} 3.0' in lines
+    assert 'latency_seconds_count{worker="w1"} 3.0' in lines
+
+    with pytest.raises(ValueError):
+        Counter("requests_total", "Requests.", registry=registry)
+
+
+@pytest.mark.anyio
+async def test_metrics_publisher_merges_workers():
+    redis = await create_redis_pool()
+    first_registry, second_registry = MetricsRegistry(), MetricsRegistry()
+    Counter("jobs_total", "Jobs.", registry=first_registry).inc()
+    Counter("jobs_total", "Jobs.", registry=second_registry).inc(2)
+    first = MetricsPublisher(registry=first_registry, worker="first")
+    second = MetricsPublisher(registry=second_registry, worker="second")
+    first.init(redis)
+    second.init(redis)
+
+    await second.publish()
+    lines = (await first.render()).splitlines()
+    assert lines.count("# TYPE jobs_total counter") == 1
+    assert 'jobs_total{worker="first"} 1.0' in lines
+    assert 'jobs_total{worker="second"} 2.0' in lines
+    # a scrape does not publish, the workers are read from the registered set
+    assert await redis.get(f"{MetricsPublisher.key}:first") is None
+    assert await redis.zscore(MetricsPublisher.workers_key, "first") is None
+
+    # the worker whose registration expired is left out
+    await redis.zadd(MetricsPublisher.workers_key, {"second": 0})
+    assert 'jobs_total{worker="second"} 2.0' not in await first.render()
+    assert await redis.zscore(MetricsPublisher.workers_key, "second") is None
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(client, monkeypatch):
+    categories = await create_fake_categories(1)
+    await client.get(CATEGORIES_ENDPOINT)
+    await client.get(f"{CATEGORIES_ENDPOINT}/{categories[0].id}")
+
+    # disabled without a token
+    assert (await client.get("/metrics")).status_code == 404
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", "secret")
+    r = await client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert r.status_code == 401
+
+    r = await client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    worker = metrics_publisher.worker
+    # the latency is labelled with the route template instead of the path
+    for route in (CATEGORIES_ENDPOINT, CATEGORIES_ENDPOINT + "/{category_id}"):
+        assert (
+            f'http_request_duration_seconds_count{{worker="{worker}",method="GET",'
+            f'route="{route}",status="200"}}'
+        ) in r.text
+    assert f'http_requests_in_flight{{worker="{worker}"}} 1.0' in r.text
+    assert "# TYPE redis_command_duration_seconds histogram" in r.text
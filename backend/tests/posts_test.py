@@ -1,4 +1,5 @@
 import pytest
+from uuidbase62.types import to_uuidbase62
 
 from sharkservers.auth.schemas import RegisterUserSchema
 from sharkservers.forum.dependencies import get_threads_service
@@ -12,6 +13,13 @@ from tests.conftest import (
 )
 
 POSTS_ENDPOINT = "/v1/forum/posts"
+THREADS_ENDPOINT = "/v1/forum/threads"
+
+
+async def get_public_thread_id(client, thread):
+    r = await client.get(f"{THREADS_ENDPOINT}/{thread.id}")
+    assert r.json()["id"].startswith("thread_")
+    return r.json()["id"]
 
 
 @pytest.mark.anyio
@@ -76,7 +84,11 @@ async def test_create_post_in_closed_thread(logged_client):
     threads = await create_fake_threads(1, author, categories[0])
     await threads[0].update(is_closed=True)
     r = await logged_client.post(
-        POSTS_ENDPOINT, json={"thread_id": threads[0].id, "content": "test"}
+        POSTS_ENDPOINT,
+        json={
+            "thread_id": await get_public_thread_id(logged_client, threads[0]),
+            "content": "test",
+        },
     )
 
     assert r.status_code == 400
@@ -90,11 +102,15 @@ async def test_create_post(logged_client):
     threads = await create_fake_threads(1, author, categories[0])
     threads_service = await get_threads_service()
     r = await logged_client.post(
-        POSTS_ENDPOINT, json={"thread_id": threads[0].id, "content": "test"}
+        POSTS_ENDPOINT,
+        json={
+            "thread_id": await get_public_thread_id(logged_client, threads[0]),
+            "content": "test",
+        },
     )
     assert r.status_code == 200
     assert r.json()["content"] == "test"
-    assert r.json()["author"]["id"] == author.id
+    assert r.json()["author"]["id"] == str(to_uuidbase62(author.id, "user"))
     thread = await threads_service.get_one(id=threads[0].id, related=["posts"])
     assert len(thread.posts) == 1
     assert thread.posts[0].content == "test"
@@ -162,7 +178,11 @@ async def test_create_post_when_thread_is_closed(logged_client):
     threads = await create_fake_threads(1, author, categories[0])
     await threads[0].update(is_closed=True)
     r = await logged_client.post(
-        POSTS_ENDPOINT, json={"thread_id": threads[0].id, "content": "test"}
+        POSTS_ENDPOINT,
+        json={
+            "thread_id": await get_public_thread_id(logged_client, threads[0]),
+            "content": "test",
+        },
     )
     assert r.status_code == 400
 
@@ -0,0 +1,127 @@
+import gc
+import json
+import weakref
+
+import orjson
+import pytest
+from fastapi import Depends, FastAPI, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi_pagination import Page, Params, add_pagination
+from httpx import AsyncClient
+from pydantic import BaseModel, parse_obj_as
+
+from sharkservers.forum.dependencies import get_threads_service
+from sharkservers.forum.schemas import ThreadOut
+from sharkservers.forum.views.threads import thread_relations
+from sharkservers.responses import (
+    FastJSONResponse,
+    add_fast_json_responses,
+    get_encoder,
+)
+from sharkservers.users.dependencies import get_users_service
+from tests.conftest import TEST_USER, create_fake_categories, create_fake_threads
+
+RELATED = [path for paths in thread_relations.values() for path in paths]
+
+
+@pytest.mark.anyio
+async def test_schema_encoder_matches_pydantic(logged_client):
+    users_service = await get_users_service()
+    threads_service = await get_threads_service()
+    author = await users_service.get_one(username=TEST_USER.get("username"))
+    categories = await create_fake_categories(1)
+    await create_fake_threads(3, author=author, category=categories[0])
+    page = await threads_service.get_all(Params(page=1, size=50), related=RELATED)
+
+    data = orjson.loads(get_encoder(Page[ThreadOut]).dumps(page))
+    expected = json.loads(
+        json.dumps(jsonable_encoder(parse_obj_as(Page[ThreadOut], page)))
+    )
+    assert data == expected
+    assert data["items"][0]["id"].startswith("thread_")
+    assert "password" not in data["items"][0]["author"]
+
+
+@pytest.mark.anyio
+async def test_fast_json_responses(logged_client):
+    users_service = await get_users_service()
+    author = await users_service.get_one(username=TEST_USER.get("username"))
+    categories = await create_fake_categories(1)
+    threads = await create_fake_threads(2, author=author, category=categories[0])
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    def set_header(response: Response) -> None:
+        response.headers["X-Test"] = "test"
+        response.status_code = 203
+
+    @app.get("/threads", dependencies=[Depends(set_header)])
+    async def get_threads() -> Page[ThreadOut]:
+        threads_service = await get_threads_service()
+        page = await threads_service.get_all(Params(page=1, size=50), related=RELATED)
+        # the items are not validated against ThreadOut when the page is created
+        assert not isinstance(page.items[0], ThreadOut)
+        return page
+
+    @app.get("/threads/{title}")
+    async def get_thread(title: str) -> ThreadOut | dict:
+        if title == "missing":
+            return {"detail": "missing"}
+        threads_service = await get_threads_service()
+        return await threads_service.get_one(title=title, related=RELATED)
+
+    @app.post("/threads", status_code=201)
+    async def create_thread() -> ThreadOut:
+        threads_service = await get_threads_service()
+        return await threads_service.get_one(id=threads[0].id, related=RELATED)
+
+    @app.put("/threads", status_code=201, dependencies=[Depends(set_header)])
+    async def replace_thread() -> ThreadOut:
+        threads_service = await get_threads_service()
+        return await threads_service.get_one(id=threads[0].id, related=RELATED)
+
+    add_pagination(app)
+    add_fast_json_responses(app)
+    add_fast_json_responses(app)
+    async with AsyncClient(app=app, base_url="http://localhost") as client:
+        r = await client.get("/threads")
+        assert r.status_code == 203
+        assert r.headers["X-Test"] == "test"
+        assert r.json()["total"] == 2
+        assert r.json()["items"][0]["author"]["username"] == author.username
+        r = await client.get(f"/threads/{threads[0].title}")
+        assert r.status_code == 200
+        assert r.json()["title"] == threads[0].title
+        r = await client.get("/threads/missing")
+        assert r.json() == {"detail": "missing"}
+        assert (await client.post("/threads")).status_code == 201
+        # the status set by a dependency overrides the route status
+        r = await client.put("/threads")
+        assert r.status_code == 203
+        assert r.json()["title"] == threads[0].title
+
+
+class Item:
+    def __init__(self, name):
+        self.name = name
+
+
+class ItemOut(BaseModel):
+    name: str
+
+
+class ItemsOut(BaseModel):
+    item: ItemOut | None
+    items: list[ItemOut]
+
+
+def test_schema_encoder_skips_garbage_collected_relations():
+    alive, dead = Item("alive"), Item("dead")
+    items = Item("items")
+    items.items = [weakref.proxy(alive), weakref.proxy(dead)]
+    items.item = weakref.proxy(dead)
+    del dead
+    gc.collect()
+    assert get_encoder(ItemsOut).encode(items) == {
+        "item": None,
+        "items": [{"name": "alive"}],
+    }
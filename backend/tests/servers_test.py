@@ -0,0 +1,182 @@
+import asyncio
+import struct
+import time
+
+import pytest
+
+from sharkservers.servers.a2s import (
+    A2S_HEADER,
+    A2S_INFO_REQUEST,
+    a2s_info,
+)
+from sharkservers.main import app
+from sharkservers.servers.dependencies import get_servers_service
+from sharkservers.servers.models import Server
+from sharkservers.servers.poller import ServerStatusPoller
+
+SERVERS_ENDPOINT = "/v1/servers"
+
+CHALLENGE = b"\x01\x02\x03\x04"
+
+
+class FakeA2SServer(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data.startswith(A2S_INFO_REQUEST):
+            return
+        response = self.info()
+        if data[len(A2S_INFO_REQUEST) :] != CHALLENGE:
+            response = b"A" + CHALLENGE
+        self.transport.sendto(A2S_HEADER + response, addr)
+
+    @staticmethod
+    def info():
+        return (
+            b"I\x11"
+            + b"Fake server\x00ctf_2fort\x00tf\x00Team Fortress\x00"
+            + struct.pack("<HBBB", 440, 2, 24, 0)
+            + b"dlw\x00\x01"
+        )
+
+
+async def create_servers(servers):
+    # bulk_create skips the post_save signal which provisions the server admin groups
+    await Server.objects.bulk_create(
+        [
+            Server(tag=f"server_{i}", name=name, ip=ip, port=port, api_url="")
+            for i, (name, ip, port) in enumerate(servers)
+        ]
+    )
+
+
+class FakeBroadcast:
+    def __init__(self):
+        self.messages = []
+
+    async def publish(self, channel, message):
+        self.messages.append((channel, message))
+
+
+@pytest.fixture
+async def a2s_server():
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        FakeA2SServer, local_addr=("127.0.0.1", 0)
+    )
+    yield transport.get_extra_info("sockname")
+    transport.close()
+
+
+@pytest.fixture
+async def silent_server():
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, local_addr=("127.0.0.1", 0)
+    )
+    yield transport.get_extra_info("sockname")
+    transport.close()
+
+
+@pytest.mark.anyio
+async def test_a2s_info(a2s_server):
+    info = await a2s_info(a2s_server, timeout=1)
+    assert info["name"] == "Fake server"
+    assert info["map"] == "ctf_2fort"
+    assert info["players"] == 2
+    assert info["max_players"] == 24
+
+
+@pytest.mark.anyio
+async def test_a2s_info_timeout(silent_server):
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        await a2s_info(silent_server, timeout=0.1, retries=2)
+    assert time.monotonic() - start >= 0.3
+
+
+@pytest.mark.anyio
+async def test_get_servers_status(client, a2s_server):
+    ip, port = a2s_server
+    await create_servers([("Test server", ip, port)])
+    r = await client.get(f"{SERVERS_ENDPOINT}/status")
+    assert r.status_code == 200
+    assert r.json()[0]["name"] == "Fake server"
+    assert r.json()[0]["players"] == 2
+
+
+@pytest.mark.anyio
+async def test_get_servers_status_concurrently(a2s_server, silent_server):
+    servers_service = await get_servers_service()
+    await create_servers(
+        [(f"Silent server {i}", *silent_server) for i in range(5)]
+        + [("Test server", *a2s_server)]
+    )
+
+    start = time.monotonic()
+    statuses = await servers_service.get_status(timeout=0.2, retries=1)
+    # 5 silent servers queried one by one would take at least 2 seconds
+    assert time.monotonic() - start < 1
+    assert sorted(status.name for status in statuses) == [
+        "Fake server",
+        *[f"Silent server {i}" for i in range(5)],
+    ]
+
+
+@pytest.mark.anyio
+async def test_server_status_poller(client, a2s_server):
+    await create_servers([("Test server", *a2s_server)])
+    broadcast = FakeBroadcast()
+    poller = ServerStatusPoller(
+        redis=app.state.redis,
+        servers_service=await get_servers_service(),
+        broadcast=broadcast,
+        timeout=1,
+    )
+    await app.state.redis.delete(poller.snapshot_key)
+    assert await poller.get_snapshot() is None
+
+    assert await poller.poll() is True
+    snapshot = await poller.get_snapshot()
+    assert [status.name for status in snapshot] == ["Fake server"]
+    assert len(broadcast.messages) == 1
+    assert broadcast.messages[0][0] == poller.channel
+
+    # unchanged snapshot is not published again
+    assert await poller.poll() is False
+    assert len(broadcast.messages) == 1
+    assert 0 < await app.state.redis.pttl(poller.snapshot_key) <= poller.ttl
+
+    r = await client.get(f"{SERVERS_ENDPOINT}/status")
+    assert r.status_code == 200
+    assert r.json()[0]["players"] == 2
+
+
+@pytest.mark.anyio
+async def test_server_status_poller_leadership(client):
+    servers_service = await get_servers_service()
+    leader = ServerStatusPoller(redis=app.state.redis, servers_service=servers_service)
+    follower = ServerStatusPoller(
+        redis=app.state.redis,
+        servers_service=servers_service,
+    )
+    await app.state.redis.delete(leader.leader_key)
+
+    assert await leader.acquire_leadership() is True
+    assert await follower.acquire_leadership() is False
+    # the leader renews its own lock
+    assert await leader.acquire_leadership() is True
+
+    await app.state.redis.delete(leader.leader_key)
+    assert await follower.acquire_leadership() is True
+    assert await leader.acquire_leadership() is False
+    # a stale leader neither renews nor releases the lock of the new one
+    await app.state.redis.pexpire(leader.leader_key, 1000)
+    assert await leader.acquire_leadership() is False
+    assert await app.state.redis.pttl(leader.leader_key) <= 1000
+    assert (
+        await leader._release_lock(keys=[leader.leader_key], args=[leader.token]) == 0
+    )
+    assert await follower.acquire_leadership() is True
+    assert await app.state.redis.pttl(leader.leader_key) > 1000
@@ -210,6 +210,78 @@ async def test_get_threads_with_category(logged_client):
     assert r2.json()["total"] == 5
 
 
+@pytest.mark.anyio
+async def test_get_threads_with_cursor(logged_client):
+    users_service = await get_users_service()
+    category = await create_fake_categories(1)
+    author = await users_service.get_one(username=TEST_USER.get("username"))
+    await create_fake_threads(15, author, category[0])
+
+    r = await logged_client.get(f"{THREADS_ENDPOINT}?cursor=&size=10")
+    assert r.status_code == 200
+    first_page = r.json()
+    assert len(first_page["items"]) == 10
+    assert first_page["next_cursor"] is not None
+
+    r2 = await logged_client.get(
+        f"{THREADS_ENDPOINT}?cursor={first_page['next_cursor']}&size=10"
+    )
+    assert r2.status_code == 200
+    second_page = r2.json()
+    assert len(second_page["items"]) == 5
+    assert second_page["next_cursor"] is None
+    first_ids = {thread["id"] for thread in first_page["items"]}
+    second_ids = {thread["id"] for thread in second_page["items"]}
+    assert first_ids.isdisjoint(second_ids)
+
+
+@pytest.mark.anyio
+async def test_get_threads_with_fields(logged_client):
+    users_service = await get_users_service()
+    category = await create_fake_categories(1)
+    author = await users_service.get_one(username=TEST_USER.get("username"))
+    await create_fake_threads(3, author, category[0])
+
+    r = await logged_client.get(f"{THREADS_ENDPOINT}?fields=title,post_count")
+    assert r.status_code == 200
+    assert r.json()["total"] == 3
+    for thread in r.json()["items"]:
+        assert set(thread) == {"id", "title", "post_count"}
+        assert thread["id"].startswith("thread_")
+
+    r = await logged_client.get(
+        f"{THREADS_ENDPOINT}?fields=-content&include=category,author&cursor="
+    )
+    assert r.status_code == 200
+    thread = r.json()["items"][0]
+    assert "content" not in thread
+    assert "server" not in thread
+    assert thread["category"]["name"] == category[0].name
+    assert thread["author"]["username"] == TEST_USER.get("username")
+    assert thread["author"]["display_role"] is not None
+
+    r = await logged_client.get(f"{THREADS_ENDPOINT}?fields=password&include=posts")
+    assert r.status_code == 422
+    assert r.json()["detail"] == "Unknown fields: password, posts"
+
+
+@pytest.mark.anyio
+async def test_get_threads_with_invalid_cursor(logged_client):
+    r = await logged_client.get(f"{THREADS_ENDPOINT}?cursor=invalid")
+    assert r.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_get_thread(logged_client):
+    users_service = await get_users_service()
+    author = await users_service.get_one(username=TEST_USER.get("username"))
+    categories = await create_fake_categories(1)
+    threads = await create_fake_threads(1, author, categories[0])
+    r = await logged_client.get(f"{THREADS_ENDPOINT}/{threads[0].id}")
+    assert r.status_code == 200
+    assert r.json()["title"] == threads[0].title
+
+
 @pytest.mark.anyio
 async def test_get_thread_not_found(logged_client):
     r = await logged_client.get(f"{THREADS_ENDPOINT}/9999")
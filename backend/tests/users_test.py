@@ -1,16 +1,19 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from unittest import mock
 
 import pytest
 from fastapi.security import OAuth2PasswordRequestForm
 
+from sharkservers.auth.utils import now_datetime
 from sharkservers.auth.dependencies import (
     get_access_token_service,
     get_refresh_token_service,
 )
 from sharkservers.roles.dependencies import get_roles_service
 from sharkservers.roles.enums import ProtectedDefaultRolesEnum
+from sharkservers.main import app
 from sharkservers.users.dependencies import get_users_service
+from sharkservers.users.services import PresenceService
 from tests.conftest import (
     create_fake_users,
     TEST_USER,
@@ -288,14 +291,21 @@ async def test_get_last_logged_users(client):
         jwt_access_token_service=await get_access_token_service(settings),
         jwt_refresh_token_service=await get_refresh_token_service(settings),
     )
+    # Any authenticated request marks the user as online
+    response = await client.get(
+        f"{USERS_ENDPOINT}/me",
+        headers={"Authorization": f"Bearer {token.access_token.token}"},
+    )
+    assert response.status_code == 200
     response = await client.get(f"{USERS_ENDPOINT}/online")
     assert response.status_code == 200
     # 1 because now user is logged in
     assert response.json()["total"] == 1
+    assert response.json()["items"][0]["username"] == user.username
     # Mock datetime to 16 minutes later, because this
     with mock.patch(
         "sharkservers.users.services.now_datetime",
-        return_value=datetime.now() + timedelta(minutes=16),
+        return_value=now_datetime() + timedelta(minutes=16),
     ):
         response = await client.get(f"{USERS_ENDPOINT}/online")
         assert response.status_code == 200
@@ -303,6 +313,40 @@ async def test_get_last_logged_users(client):
         assert response.json()["total"] == 0
 
 
+@pytest.mark.anyio
+async def test_flush_users_presence(client):
+    users_service = await get_users_service()
+    user = await users_service.get_one(username=TEST_ADMIN_USER.get("username"))
+    presence_service = PresenceService(redis=app.state.redis)
+    await presence_service.touch(user.id)
+
+    assert await presence_service.flush() == 1
+    user = await users_service.get_one(id=user.id)
+    assert user.last_online is not None
+    # Nothing changed since the last flush
+    assert await presence_service.flush() == 0
+
+
+@pytest.mark.anyio
+async def test_flush_users_presence_keeps_entries_on_failure(client):
+    users_service = await get_users_service()
+    user = await users_service.get_one(username=TEST_ADMIN_USER.get("username"))
+    presence_service = PresenceService(redis=app.state.redis)
+    await presence_service.touch(user.id)
+
+    with mock.patch(
+        "sharkservers.users.services.database.execute",
+        side_effect=RuntimeError("database is down"),
+    ), pytest.raises(RuntimeError):
+        await presence_service.flush()
+    user = await users_service.get_one(id=user.id)
+    assert user.last_online is None
+    # The pending entry is written by the next flush
+    assert await presence_service.flush() == 1
+    user = await users_service.get_one(id=user.id)
+    assert user.last_online is not None
+
+
 @pytest.mark.anyio
 async def test_not_found_user(client):
     response = await client.get(f"{USERS_ENDPOINT}/9999")